@@ -0,0 +1,119 @@
+"""
+Checkpoint storage benchmark: the stock SqliteSaver against DeltaSqliteSaver.
+
+Simulates one conversation thread of N graph steps, each adding a message
+(alternating tool calls and tool results of a few KB) and saving a
+checkpoint of the whole state, as LangGraph does after every step. Reports
+the write latency per step (mean, and over the last 10% of steps, where the
+history is longest), the latency of loading the latest checkpoint in a new
+process (cold) and in the one that wrote it, as on each new turn (warm), and
+the database size.
+
+Usage:
+    python benchmarks/checkpoints.py [--steps N] [--tool-output-bytes N] [--json]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import string
+import sys
+import tempfile
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.base.id import uuid6
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from forge.utils.checkpointer import DeltaSqliteSaver
+
+
+def _text(rng: random.Random, size: int) -> str:
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9))) for _ in range(200)]
+    out, length = [], 0
+    while length < size:
+        line = " ".join(rng.choices(words, k=12))
+        out.append(line)
+        length += len(line) + 1
+    return "\n".join(out)
+
+
+def _message(rng: random.Random, step: int, tool_output_bytes: int):
+    if step == 0:
+        return HumanMessage(content="Refactor the config loader and update its callers.")
+    if step % 2:
+        return AIMessage(
+            content="",
+            tool_calls=[{"name": "read_file", "args": {"file_path": f"src/module_{step}.py"}, "id": f"call_{step}"}],
+        )
+    return ToolMessage(content=_text(rng, tool_output_bytes), tool_call_id=f"call_{step - 1}", name="read_file")
+
+
+def _load_times(saver, messages: list, repeat: int = 10) -> float:
+    """Returns the median time to load the thread's latest checkpoint, checking it round-trips."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        loaded = saver.get_tuple({"configurable": {"thread_id": "bench"}})
+        times.append(time.perf_counter() - start)
+    assert loaded.checkpoint["channel_values"]["messages"] == messages, "state did not round-trip"
+    return statistics.median(times)
+
+
+def run(saver_class, db_path: str, steps: int, tool_output_bytes: int) -> dict:
+    rng = random.Random(0)
+    config = {"configurable": {"thread_id": "bench", "checkpoint_ns": ""}}
+    messages, put_times = [], []
+    with saver_class.from_conn_string(db_path) as saver:
+        for step in range(steps):
+            # Like LangGraph, each step gets a new list holding the same message objects plus the new one.
+            messages = messages + [_message(rng, step, tool_output_bytes)]
+            messages[-1].id = f"msg-{step}"
+            checkpoint = empty_checkpoint()
+            checkpoint["id"] = str(uuid6(clock_seq=step))
+            checkpoint["channel_values"] = {"messages": messages, "summary": ""}
+            checkpoint["channel_versions"] = {"messages": step + 1, "summary": 1}
+            start = time.perf_counter()
+            config = saver.put(config, checkpoint, {"source": "loop", "step": step}, {"messages": step + 1})
+            put_times.append(time.perf_counter() - start)
+
+        warm = _load_times(saver, messages)
+    with saver_class.from_conn_string(db_path) as saver:
+        cold = _load_times(saver, messages, repeat=1)
+
+    tail = put_times[-max(len(put_times) // 10, 1):]
+    return {
+        "put_ms_mean": round(statistics.mean(put_times) * 1000, 3),
+        "put_ms_last_10pct": round(statistics.mean(tail) * 1000, 3),
+        "get_ms_cold": round(cold * 1000, 3),
+        "get_ms_warm": round(warm * 1000, 3),
+        "db_mb": round(sum(os.path.getsize(p) for p in (db_path, db_path + "-wal") if os.path.exists(p)) / 2**20, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=200, help="Graph steps (checkpoints) in the thread.")
+    parser.add_argument("--tool-output-bytes", type=int, default=4000, help="Size of each simulated tool result.")
+    parser.add_argument("--json", action="store_true", help="Emit machine-readable JSON instead of a table.")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, saver_class in (("SqliteSaver", SqliteSaver), ("DeltaSqliteSaver", DeltaSqliteSaver)):
+            results[name] = run(saver_class, os.path.join(tmp, f"{name}.db"), args.steps, args.tool_output_bytes)
+
+    if args.json:
+        json.dump({"steps": args.steps, "tool_output_bytes": args.tool_output_bytes, **results}, sys.stdout, indent=2)
+        print()
+        return
+    metrics = list(next(iter(results.values())))
+    print(f"{'':<18}" + "".join(f"{m:>19}" for m in metrics))
+    for name, row in results.items():
+        print(f"{name:<18}" + "".join(f"{row[m]:>19}" for m in metrics))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+A deterministic chat model for driving the agent graph offline.
+
+ScriptedChatModel answers from a script instead of a provider: each entry
+is an AIMessage, or a function from the prompt messages to an AIMessage
+(to pick a tool call from what the graph sent). Entries are used in turn,
+cycling at the end. Responses carry usage metadata estimated at 4
+characters per token, stream word by word, and support the async API, so
+the graph, history budgeting and usage reporting all take their real paths.
+"""
+import json
+from typing import Any, Callable, Sequence
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+ScriptEntry = AIMessage | Callable[[list[BaseMessage]], AIMessage]
+
+
+def _chars(messages: Sequence[BaseMessage]) -> int:
+    return sum(len(m.content) if isinstance(m.content, str) else len(json.dumps(m.content)) for m in messages)
+
+
+class ScriptedChatModel(BaseChatModel):
+    script: list[Any]
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _respond(self, messages: list[BaseMessage]) -> AIMessage:
+        entry = self.script[self.calls % len(self.script)]
+        self.calls += 1
+        response = entry(messages) if callable(entry) else entry.model_copy()
+        text = response.content if isinstance(response.content, str) else json.dumps(response.content)
+        input_tokens, output_tokens = _chars(messages) // 4, (len(text) + len(json.dumps(response.tool_calls))) // 4
+        response.usage_metadata = {
+            "input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens,
+        }
+        return response
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        response = self._respond(messages)
+        words = response.content.split(" ") if isinstance(response.content, str) and response.content else []
+        for i, word in enumerate(words):
+            token = word if i == len(words) - 1 else word + " "
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token, id=response.id))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(
+            message=AIMessageChunk(
+                content="",
+                id=response.id,
+                usage_metadata=response.usage_metadata,
+                tool_call_chunks=[
+                    {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+                    for i, call in enumerate(response.tool_calls)
+                ],
+            )
+        )
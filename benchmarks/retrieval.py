@@ -0,0 +1,102 @@
+"""
+Offline benchmark for the automatic code retrieval injected into chat_node.
+
+For every documented function and class in a project, a stand-in user request
+is derived from it and the benchmark checks whether retrieval puts the chunk
+holding that definition into the prompt. Each hit is a lookup (a search_code,
+find_definition or read_file round trip) the model no longer needs to make.
+Reports recall@k, mean reciprocal rank and query latency.
+
+Requests come from the first line of the docstring (--query docstring, an
+optimistic bound since those words are in the chunk) or from the
+definition's name split into words (--query name, e.g. "find references").
+
+Usage:
+    python benchmarks/retrieval.py [PROJECT_DIR] [--query docstring|name] [--top-k N] [--limit N] [--json]
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from forge.utils.bm25_index import BM25Index, _CAMEL
+
+
+def collect_queries(index: BM25Index, mode: str, limit: int) -> list[dict]:
+    """Returns {query, path, line} for documented definitions of the indexed Python files."""
+    queries = []
+    for path, _, _ in index.project.iter_files():
+        if not path.endswith(".py"):
+            continue
+        try:
+            with open(os.path.join(index.root, path), "r", encoding="utf-8") as f:
+                tree = ast.parse(f.read())
+        except (OSError, SyntaxError, ValueError):
+            continue
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                doc = ast.get_docstring(node)
+                if not doc or len(doc.split()) < 4:
+                    continue
+                if mode == "docstring":
+                    query = doc.strip().splitlines()[0]
+                else:
+                    query = " ".join(p.lower() for piece in node.name.split("_") for p in _CAMEL.findall(piece))
+                if query:
+                    queries.append({"query": query, "path": path, "line": node.lineno})
+    return queries[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("project", nargs="?", default=".", help="Project to index (default: current directory).")
+    parser.add_argument("--query", choices=["docstring", "name"], default="docstring", help="How requests are derived.")
+    parser.add_argument("--top-k", type=int, default=6, help="Chunks retrieved per query (retrieval_top_k).")
+    parser.add_argument("--limit", type=int, default=500, help="Maximum number of queries.")
+    parser.add_argument("--json", action="store_true", help="Emit machine-readable JSON instead of a table.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        index = BM25Index(args.project, index_dir=index_dir)
+        start = time.perf_counter()
+        index.refresh()
+        build_s = time.perf_counter() - start
+
+        queries = collect_queries(index, args.query, args.limit)
+        hits, reciprocal_ranks, latencies = 0, [], []
+        for q in queries:
+            start = time.perf_counter()
+            chunks = index.search(q["query"], top_k=args.top_k)
+            latencies.append(time.perf_counter() - start)
+            rank = next(
+                (i for i, c in enumerate(chunks, 1) if c.path == q["path"] and c.start_line <= q["line"] <= c.end_line),
+                None,
+            )
+            hits += rank is not None
+            reciprocal_ranks.append(1 / rank if rank else 0.0)
+
+    results = {
+        "files": len(index._files),
+        "queries": len(queries),
+        "query_mode": args.query,
+        "top_k": args.top_k,
+        "build_s": round(build_s, 3),
+        "recall_at_k": round(hits / len(queries), 3) if queries else None,
+        "mrr": round(statistics.mean(reciprocal_ranks), 3) if queries else None,
+        "query_ms_p50": round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        "query_ms_max": round(max(latencies) * 1000, 2) if latencies else None,
+    }
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+        return
+    for key, value in results.items():
+        print(f"{key:<14} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Startup-time benchmark for the forge CLI.
+
+Runs each subcommand in a fresh interpreter with `-X importtime`, inside a
+scratch working directory, and reports wall time, total import time and the
+most expensive top-level imports. Provider SDKs that were imported are flagged,
+since commands that never call a model should not pay for them.
+
+Usage:
+    python benchmarks/startup.py [--repeat N] [--top N] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SUBCOMMANDS = {
+    "help": ["--help"],
+    "init --help": ["init", "--help"],
+    "clear-memory": ["clear-memory"],
+    "stop": ["stop"],
+}
+
+PROVIDER_SDKS = ("langchain_openai", "langchain_anthropic", "langchain_google_genai")
+
+
+def _parse_importtime(stderr: str) -> dict:
+    """Returns the cumulative import time (us) of each top-level module."""
+    costs = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        if name.startswith("  "):  # nested import, already counted by its parent
+            continue
+        costs[name.strip()] = int(cumulative_us)
+    return costs
+
+
+def run_subcommand(args: list[str], cwd: str) -> dict:
+    """Runs `forge <args>` once and returns wall time and per-module import costs."""
+    cmd = [sys.executable, "-X", "importtime", "-m", "forge.cli", *args]
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=cwd, capture_output=True, text=True, input="n\n")
+    wall = time.perf_counter() - start
+    return {"wall_s": wall, "imports": _parse_importtime(proc.stderr)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per subcommand (median is reported).")
+    parser.add_argument("--top", type=int, default=5, help="Number of most expensive imports to list.")
+    parser.add_argument("--json", action="store_true", help="Emit machine-readable JSON instead of a table.")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        for label, cmd_args in SUBCOMMANDS.items():
+            runs = [run_subcommand(cmd_args, scratch) for _ in range(args.repeat)]
+            imports = runs[-1]["imports"]
+            top = sorted(imports.items(), key=lambda kv: kv[1], reverse=True)[: args.top]
+            results[label] = {
+                "wall_ms": round(statistics.median(r["wall_s"] for r in runs) * 1000, 1),
+                "import_ms": round(sum(imports.values()) / 1000, 1),
+                "provider_sdks": sorted(m for m in imports if m in PROVIDER_SDKS),
+                "top_imports_ms": {name: round(us / 1000, 1) for name, us in top},
+            }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for label, r in results.items():
+        sdks = ", ".join(r["provider_sdks"]) or "none"
+        print(f"forge {label:<14} wall {r['wall_ms']:>8.1f} ms   imports {r['import_ms']:>8.1f} ms   provider SDKs: {sdks}")
+        for name, ms in r["top_imports_ms"].items():
+            print(f"    {ms:>8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
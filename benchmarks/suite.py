@@ -0,0 +1,391 @@
+"""
+Offline benchmark suite for the agent's hot paths, with no API key or network.
+
+Benchmarks (pick with --only):
+    graph        Turns of the real graph (create_graph) driven by ScriptedChatModel
+                 over a synthetic repo: each turn reads a file, searches the code
+                 and answers. Reports turn latency (async, as the REPL runs it, and
+                 sync), and from the trace spans the time per turn spent preparing
+                 prompts, in the (fake) model call and in tools; the rest is graph
+                 scheduling, streaming and checkpoint writes, which overlap the
+                 nodes and are also reported on their own.
+    checkpoints  DeltaSqliteSaver write and read latency as a thread grows
+                 (see checkpoints.py).
+    tree         generate_project_tree over a synthetic tree of empty files:
+                 first build, an unchanged refresh, and a refresh after a change.
+    dataset      summarize_dataset over a synthetic CSV, in full (no time budget).
+    diff         _show_diff on a large file with scattered edits, computed only
+                 and rendered (to a null console).
+
+Sizes come from --scale and can be overridden one by one. Results are written
+as a baseline (--output): flat metric names, each with a value, a unit and
+whether lower or higher is better. With --baseline, metrics are compared to
+an earlier run and any that got worse by more than --threshold are reported
+as regressions (exit status 1).
+
+Usage:
+    python benchmarks/suite.py [--scale small|medium|large] [--only graph,tree,...]
+        [--files N] [--turns N] [--steps N,N] [--tree-files N] [--dataset-mb N] [--diff-lines N]
+        [--output results.json] [--baseline previous.json] [--threshold 0.2] [--json]
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import string
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from fake_llm import ScriptedChatModel
+
+BASELINE_FORMAT = "forge-bench/1"
+
+SCALES = {
+    "small": {"files": 200, "turns": 10, "steps": [50, 200], "tree_files": 10_000, "dataset_mb": 16, "diff_lines": 20_000},
+    "medium": {"files": 2_000, "turns": 30, "steps": [100, 400, 1_000], "tree_files": 100_000, "dataset_mb": 512, "diff_lines": 200_000},
+    "large": {"files": 10_000, "turns": 50, "steps": [200, 1_000, 3_000], "tree_files": 1_000_000, "dataset_mb": 4_096, "diff_lines": 1_000_000},
+}
+BENCHMARKS = ("graph", "checkpoints", "tree", "dataset", "diff")
+
+
+def _metric(value: float, unit: str = "ms", better: str = "lower") -> dict:
+    return {"value": round(value, 3), "unit": unit, "better": better}
+
+
+@contextmanager
+def _workspace():
+    """A scratch project directory with a .forge folder, made the working directory."""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="forge-bench-") as root:
+        os.makedirs(os.path.join(root, ".forge"))
+        os.chdir(root)
+        try:
+            yield root
+        finally:
+            os.chdir(cwd)
+
+
+# --- Synthetic inputs ------------------------------------------------------------
+
+
+def make_repo(root: str, files: int, seed: int = 0) -> list[str]:
+    """Writes `files` Python modules of a few functions each, 50 per package; returns their paths."""
+    rng = random.Random(seed)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(500)]
+    paths = []
+    for i in range(files):
+        path = os.path.join(f"pkg{i // 50}", f"mod{i}.py")
+        os.makedirs(os.path.join(root, os.path.dirname(path)), exist_ok=True)
+        body = []
+        for j in range(5):
+            body.append(
+                f"def func_{i}_{j}({', '.join(rng.sample(words, 2))}):\n"
+                f'    """{" ".join(rng.choices(words, k=10)).capitalize()}."""\n'
+                + "".join(f"    {rng.choice(words)} = {rng.choice(words)}({rng.choice(words)})\n" for _ in range(8))
+                + f"    return {rng.choice(words)}\n"
+            )
+        with open(os.path.join(root, path), "w", encoding="utf-8") as f:
+            f.write("\n\n".join(body))
+        paths.append(path.replace(os.sep, "/"))
+    return paths
+
+
+def make_tree(root: str, files: int, per_dir: int = 100):
+    """Creates `files` empty files, `per_dir` to a directory, in two levels of directories."""
+    for i in range(0, files, per_dir):
+        directory = os.path.join(root, f"d{i // (per_dir * per_dir)}", f"s{(i // per_dir) % per_dir}")
+        os.makedirs(directory, exist_ok=True)
+        for j in range(i, min(i + per_dir, files)):
+            open(os.path.join(directory, f"f{j}.txt"), "w").close()
+
+
+def make_csv(path: str, megabytes: int, seed: int = 0):
+    """Writes a CSV of mixed column types of roughly the given size."""
+    rng = random.Random(seed)
+    categories = [f"cat_{i}" for i in range(50)]
+    target = megabytes * 2**20
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("id,amount,ratio,category,flag,label,date\n")
+        row = 0
+        while f.tell() < target:
+            lines = []
+            for _ in range(10_000):
+                lines.append(
+                    f"{row},{rng.randint(-10**6, 10**6)},{rng.random():.6f},{rng.choice(categories)},"
+                    f"{rng.random() < 0.5},{'' if rng.random() < 0.05 else 'item' + str(rng.randint(0, 99999))},"
+                    f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}\n"
+                )
+                row += 1
+            f.write("".join(lines))
+
+
+# --- Benchmarks -----------------------------------------------------------------
+
+
+def _turn_script(paths: list[str]):
+    """Each turn: read the file named in the request, search for a function in it, then answer."""
+
+    def step(messages):
+        last = messages[-1]
+        request = next(m for m in reversed(messages) if isinstance(m, HumanMessage)).content
+        turn = int(request.rsplit(" ", 1)[-1])
+        call_id = f"call_{turn}_{len(messages)}"
+        if isinstance(last, HumanMessage) or not isinstance(last, ToolMessage):
+            path = paths[turn % len(paths)]
+            return AIMessage(content="", tool_calls=[{"name": "read_file", "args": {"file_path": path}, "id": call_id}])
+        if last.name == "read_file":
+            module = int(paths[turn % len(paths)].rsplit("mod", 1)[-1][:-3])
+            return AIMessage(
+                content="", tool_calls=[{"name": "search_code", "args": {"query": f"func_{module}_3"}, "id": call_id}]
+            )
+        return AIMessage(content=f"Turn {turn}: the function is defined as shown above. " * 8)
+
+    return [step]
+
+
+def bench_graph(files: int, turns: int) -> dict:
+    from forge.agent.workflow import create_graph, refresh_indexes
+    from forge.utils.checkpointer import DeltaSqliteSaver
+    from forge.utils.tracing import TRACER, load_spans
+
+    metrics = {}
+    with _workspace() as root:
+        paths = make_repo(root, files)
+        start = time.perf_counter()
+        while refresh_indexes(max_seconds=5.0):
+            pass
+        metrics["graph.index_build_ms"] = _metric((time.perf_counter() - start) * 1000)
+
+        with DeltaSqliteSaver.from_conn_string(os.path.join(".forge", "memory.db")) as checkpointer:
+            start = time.perf_counter()
+            graph = create_graph(ScriptedChatModel(script=_turn_script(paths)), checkpointer)
+            metrics["graph.create_ms"] = _metric((time.perf_counter() - start) * 1000)
+
+            async def run_async() -> list[float]:
+                config = {"configurable": {"thread_id": "async"}}
+                times = []
+                for turn in range(turns):
+                    start = time.perf_counter()
+                    inputs = {"messages": [HumanMessage(content=f"Explain function {turn}")]}
+                    async for _ in graph.astream(inputs, config=config, stream_mode=["messages", "updates"]):
+                        pass
+                    times.append((time.perf_counter() - start) * 1000)
+                return times
+
+            async_times = asyncio.run(run_async())
+            sync_times = []
+            for turn in range(turns):
+                start = time.perf_counter()
+                graph.invoke({"messages": [HumanMessage(content=f"Explain function {turn}")]}, {"configurable": {"thread_id": "sync"}})
+                sync_times.append((time.perf_counter() - start) * 1000)
+        TRACER.configure(None)
+
+        # Where the async turns spent their time, from the spans create_graph traced.
+        totals = {"prepare": 0.0, "llm": 0.0, "tool": 0.0, "checkpoint": 0.0}
+        for span in load_spans(os.path.join(".forge", "traces.jsonl")):
+            if span.get("thread_id") == "async" and span["kind"] in totals:
+                totals[span["kind"]] += span["ms"]
+
+    metrics["graph.turn_ms.p50"] = _metric(statistics.median(async_times))
+    metrics["graph.turn_ms.p95"] = _metric(sorted(async_times)[max(0, -(-len(async_times) * 95 // 100) - 1)])
+    metrics["graph.turn_ms.last"] = _metric(async_times[-1])
+    metrics["graph.sync_turn_ms.p50"] = _metric(statistics.median(sync_times))
+    for kind, total in totals.items():
+        metrics[f"graph.{kind}_ms_per_turn"] = _metric(total / turns)
+    nodes = totals["prepare"] + totals["llm"] + totals["tool"]
+    metrics["graph.other_ms_per_turn"] = _metric(max(sum(async_times) - nodes, 0) / turns)
+    return metrics
+
+
+def bench_checkpoints(steps_list: list[int]) -> dict:
+    from checkpoints import run
+    from forge.utils.checkpointer import DeltaSqliteSaver
+
+    metrics = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for steps in steps_list:
+            result = run(DeltaSqliteSaver, os.path.join(tmp, f"{steps}.db"), steps, 4000)
+            for name in ("put_ms_mean", "put_ms_last_10pct", "get_ms_cold", "get_ms_warm"):
+                metrics[f"checkpoints.{steps}_steps.{name}"] = _metric(result[name])
+            metrics[f"checkpoints.{steps}_steps.db_mb"] = _metric(result["db_mb"], unit="MB")
+    return metrics
+
+
+def bench_tree(files: int) -> dict:
+    from forge.utils.utils import generate_project_tree
+
+    with _workspace() as root:
+        make_tree(root, files)
+        timings = {}
+        for label in ("cold", "warm"):
+            start = time.perf_counter()
+            generate_project_tree(".", max_depth=5)
+            timings[label] = time.perf_counter() - start
+        open(os.path.join(root, "d0", "s0", "new.txt"), "w").close()
+        start = time.perf_counter()
+        generate_project_tree(".", max_depth=5)
+        timings["changed"] = time.perf_counter() - start
+    return {f"tree.{label}_ms": _metric(seconds * 1000) for label, seconds in timings.items()}
+
+
+def bench_dataset(megabytes: int) -> dict:
+    from forge.tools.tools import summarize_dataset
+
+    with _workspace() as root:
+        path = os.path.join(root, "data.csv")
+        make_csv(path, megabytes)
+        size_mb = os.path.getsize(path) / 2**20
+        start = time.perf_counter()
+        summary = summarize_dataset.invoke({"file_path": path, "max_seconds": 24 * 3600})
+        elapsed = time.perf_counter() - start
+    assert not summary.startswith("[ToolError"), summary
+    return {
+        "dataset.summarize_ms": _metric(elapsed * 1000),
+        "dataset.throughput_mb_s": _metric(size_mb / elapsed, unit="MB/s", better="higher"),
+    }
+
+
+def bench_diff(lines: int, repeat: int) -> dict:
+    from rich.console import Console
+    from forge.tools import tool_utils
+
+    rng = random.Random(0)
+    old_lines = [f"    value_{i} = compute({rng.randint(0, 10**6)})  # {'x' * rng.randint(0, 40)}\n" for i in range(lines)]
+    new_lines = list(old_lines)
+    for i in range(0, lines, 1000):
+        new_lines[i] = new_lines[i].replace("compute", "recompute")
+    old, new = "".join(old_lines), "".join(new_lines)
+
+    def timed(show: bool) -> float:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            tool_utils._show_diff(old, new, filename="big.py", show=show)
+            times.append(time.perf_counter() - start)
+        return statistics.median(times) * 1000
+
+    console = tool_utils.console
+    tool_utils.console = Console(file=io.StringIO(), width=120, force_terminal=True)
+    try:
+        return {"diff.compute_ms": _metric(timed(False)), "diff.render_ms": _metric(timed(True))}
+    finally:
+        tool_utils.console = console
+
+
+# --- Baselines -------------------------------------------------------------------
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: dict, metrics: dict, threshold: float) -> list[dict]:
+    """Returns the change of every metric present in both runs, flagging those worse by more than `threshold`."""
+    rows = []
+    for name, metric in metrics.items():
+        old = baseline.get("metrics", {}).get(name)
+        if old is None or not old["value"]:
+            continue
+        change = (metric["value"] - old["value"]) / old["value"]
+        worse = change if metric["better"] == "lower" else -change
+        rows.append({"metric": name, "baseline": old["value"], "value": metric["value"], "change": change, "regression": worse > threshold})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=SCALES, default="small", help="Preset input sizes.")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help="Comma-separated benchmarks to run.")
+    parser.add_argument("--files", type=int, help="Modules in the synthetic repo (graph).")
+    parser.add_argument("--turns", type=int, help="Turns per thread (graph).")
+    parser.add_argument("--steps", help="Comma-separated thread lengths in checkpoints (checkpoints).")
+    parser.add_argument("--tree-files", type=int, help="Files in the synthetic tree (tree).")
+    parser.add_argument("--dataset-mb", type=int, help="Size of the synthetic CSV (dataset).")
+    parser.add_argument("--diff-lines", type=int, help="Lines in the diffed file (diff).")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs of the quick benchmarks (median is reported).")
+    parser.add_argument("--output", help="Write the results to this baseline file.")
+    parser.add_argument("--baseline", help="Compare with this baseline file; exit 1 on a regression.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative change counted as a regression.")
+    parser.add_argument("--json", action="store_true", help="Emit machine-readable JSON instead of a table.")
+    args = parser.parse_args()
+
+    params = dict(SCALES[args.scale])
+    for name in ("files", "turns", "tree_files", "dataset_mb", "diff_lines"):
+        if getattr(args, name) is not None:
+            params[name] = getattr(args, name)
+    if args.steps:
+        params["steps"] = [int(s) for s in args.steps.split(",")]
+    selected = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark(s) {sorted(unknown)}; choose from {list(BENCHMARKS)}")
+
+    runners = {
+        "graph": lambda: bench_graph(params["files"], params["turns"]),
+        "checkpoints": lambda: bench_checkpoints(params["steps"]),
+        "tree": lambda: bench_tree(params["tree_files"]),
+        "dataset": lambda: bench_dataset(params["dataset_mb"]),
+        "diff": lambda: bench_diff(params["diff_lines"], args.repeat),
+    }
+    metrics = {}
+    for name in selected:
+        start = time.perf_counter()
+        metrics.update(runners[name]())
+        print(f"[{name}] done in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    result = {
+        "format": BASELINE_FORMAT,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": args.scale,
+        "params": params,
+        "metrics": metrics,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    comparison = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("format") != BASELINE_FORMAT:
+            parser.error(f"{args.baseline} is not a {BASELINE_FORMAT} baseline")
+        if baseline.get("params") != params:
+            print(f"warning: {args.baseline} was run with different sizes; changes may not be comparable", file=sys.stderr)
+        comparison = compare(baseline, metrics, args.threshold)
+        result["comparison"] = comparison
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        rows = {row["metric"]: row for row in comparison}
+        for name, metric in metrics.items():
+            line = f"{name:<44} {metric['value']:>12,.3f} {metric['unit']:<5}"
+            if name in rows:
+                row = rows[name]
+                line += f" {row['change']:>+8.1%} vs {row['baseline']:,.3f}" + ("  REGRESSION" if row["regression"] else "")
+            print(line)
+    return 1 if any(row["regression"] for row in comparison) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
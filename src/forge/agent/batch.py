@@ -0,0 +1,196 @@
+"""
+Headless runs of many agent tasks, for pipelines rather than a terminal.
+
+Each task is one prompt run to completion in its own conversation thread.
+Tasks run concurrently up to a limit, model requests are spread out by a
+client-side rate limiter, and approval-gated tools follow a policy instead
+of prompting (see tools/tool_utils.py). One result line per task is
+written to the output as soon as the task finishes.
+"""
+import re
+import json
+import time
+import asyncio
+from dataclasses import dataclass, asdict, field
+from datetime import datetime, timezone
+from typing import IO, Callable, Iterable
+
+from langchain_core.messages import HumanMessage, ToolMessage
+
+from .prompt_cache import cache_usage
+from .workflow import settle_cancelled_turn
+from .tool_runner import with_cancel_event
+from ..utils.tracing import TRACER
+
+_PATCH_RESULT = re.compile(r"saved as patch (.+?), not (?:applied|written)$")
+
+
+@dataclass
+class BatchTask:
+    id: str
+    prompt: str
+    thread_id: str
+
+
+@dataclass
+class TaskResult:
+    id: str
+    thread_id: str | None
+    status: str  # "ok", "error" or "timeout"
+    response: str = ""
+    tool_calls: list[str] = field(default_factory=list)
+    patches: list[str] = field(default_factory=list)
+    usage: dict = field(default_factory=dict)
+    started_at: str = ""
+    queued_s: float = 0.0
+    ttft_s: float | None = None
+    seconds: float = 0.0
+    error: str | None = None
+
+
+def read_tasks(lines: Iterable[str], run_id: str) -> Iterable[BatchTask | TaskResult]:
+    """
+    Parses a tasks JSONL stream. Each line is an object with a "prompt" and
+    optionally an "id" and a "thread_id" (to continue a conversation); a bare
+    JSON string is a prompt. Malformed lines, and ids used before, yield an
+    error TaskResult.
+    """
+    seen = set()
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        task_id = str(number)
+        try:
+            obj = json.loads(line)
+            if isinstance(obj, str):
+                obj = {"prompt": obj}
+            if not isinstance(obj, dict) or not isinstance(obj.get("prompt"), str) or not obj["prompt"].strip():
+                raise ValueError('expected an object with a non-empty "prompt"')
+            task_id = str(obj.get("id", task_id))
+            if task_id in seen:
+                raise ValueError(f"duplicate id {task_id!r}")
+            seen.add(task_id)
+            yield BatchTask(task_id, obj["prompt"], str(obj.get("thread_id") or f"batch-{run_id}-{task_id}"))
+        except ValueError as e:
+            yield TaskResult(id=task_id, thread_id=None, status="error", error=f"line {number}: {e}")
+
+
+def _text(content) -> str:
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") if isinstance(block, dict) else str(block) for block in content)
+
+
+async def run_task(graph, task: BatchTask, config: dict, timeout_s: float = 0, queued_s: float = 0.0) -> TaskResult:
+    """Runs one task to completion and summarizes it; never raises except on cancellation."""
+    config = with_cancel_event({**config, "configurable": {**config.get("configurable", {}), "thread_id": task.thread_id}})
+    result = TaskResult(
+        id=task.id, thread_id=task.thread_id, status="ok",
+        started_at=datetime.now(timezone.utc).isoformat(timespec="seconds"), queued_s=round(queued_s, 3),
+    )
+    messages = []
+    start = time.perf_counter()
+
+    async def consume():
+        async for mode, payload in graph.astream(
+            {"messages": [HumanMessage(content=task.prompt)]}, config=config, stream_mode=["messages", "updates"]
+        ):
+            if mode == "messages":
+                if result.ttft_s is None and _text(payload[0].content) and payload[1].get("langgraph_node") == "chat_node":
+                    result.ttft_s = round(time.perf_counter() - start, 3)
+                continue
+            for update in payload.values():
+                if isinstance(update, dict):
+                    messages.extend(update.get("messages", []))
+
+    with TRACER.span("turn", "batch", config, task=task.id) as span:
+        try:
+            if timeout_s > 0:
+                await asyncio.wait_for(consume(), timeout_s)
+            else:
+                await consume()
+        except asyncio.TimeoutError:
+            result.status, result.error = "timeout", f"Timed out after {timeout_s:g}s."
+            await settle_cancelled_turn(graph, config)
+        except Exception as e:
+            result.status, result.error = "error", f"{type(e).__name__}: {e}"
+        span.update(status=result.status, ttft_ms=None if result.ttft_s is None else result.ttft_s * 1000)
+
+    ai_messages = [m for m in messages if m.type == "ai"]
+    if ai_messages:
+        result.response = _text(ai_messages[-1].content)
+    result.tool_calls = [call["name"] for m in ai_messages for call in (m.tool_calls or [])]
+    result.patches = [
+        match.group(1)
+        for m in messages
+        if isinstance(m, ToolMessage) and isinstance(m.content, str) and (match := _PATCH_RESULT.search(m.content))
+    ]
+    result.usage = cache_usage(ai_messages)
+    result.seconds = round(time.perf_counter() - start, 3)
+    return result
+
+
+async def run_batch(
+    graph,
+    tasks: Iterable[BatchTask | TaskResult],
+    output: IO[str],
+    concurrency: int = 4,
+    approval: str = "reject",
+    patch_dir: str | None = None,
+    timeout_s: float = 0,
+    on_result: Callable[[TaskResult], None] | None = None,
+) -> list[TaskResult]:
+    """
+    Runs tasks with at most `concurrency` at a time, writing each result to
+    `output` as a JSON line when its task finishes (so in completion order).
+    Tasks that share a thread share its checkpoints and patch folder, so
+    they run one after another, in the order they were read.
+
+    Returns:
+        The results, in completion order.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    results = []
+    config = {"configurable": {"approval": approval, "patch_dir": patch_dir}}
+    # thread id -> (lock, tasks holding or waiting for it); dropped when the last one is done.
+    threads: dict[str, list] = {}
+
+    def emit(result: TaskResult):
+        results.append(result)
+        output.write(json.dumps(asdict(result), ensure_ascii=False) + "\n")
+        output.flush()
+        if on_result:
+            on_result(result)
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            task, queued_at = item
+            entry = threads.setdefault(task.thread_id, [asyncio.Lock(), 0])
+            entry[1] += 1
+            try:
+                async with entry[0]:
+                    result = await run_task(graph, task, config, timeout_s, time.perf_counter() - queued_at)
+            finally:
+                entry[1] -= 1
+                if not entry[1]:
+                    del threads[task.thread_id]
+            emit(result)
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(concurrency, 1))]
+    try:
+        # The task list is read lazily, so a long file is never held in memory whole.
+        for task in tasks:
+            if isinstance(task, TaskResult):
+                emit(task)
+            else:
+                await queue.put((task, time.perf_counter()))
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        for w in workers:
+            w.cancel()
+    return results
@@ -0,0 +1,213 @@
+import json
+from typing import Callable
+
+from langchain_core.messages import (
+    BaseMessage, HumanMessage, SystemMessage, ToolMessage, RemoveMessage,
+)
+
+from .prompt import HISTORY_SUMMARY_PROMPT
+from .tool_cache import content_hash
+
+# Fixed per-message overhead (role, separators) added by chat formats.
+MESSAGE_OVERHEAD_TOKENS = 4
+# Tool results shorter than this are never replaced by a reference to a later identical one.
+DEDUP_MIN_CHARS = 200
+
+
+def _message_text(message: BaseMessage) -> str:
+    """Flattens a message's content and tool calls into plain text."""
+    content = message.content
+    if not isinstance(content, str):
+        content = "".join(
+            block.get("text", "") if isinstance(block, dict) else str(block) for block in content
+        )
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        content += json.dumps([{"name": c["name"], "args": c["args"]} for c in tool_calls], default=str)
+    return content
+
+
+def make_token_counter(llm, exact: bool = False, chars_per_token: float = 4.0) -> Callable[[BaseMessage], int]:
+    """
+    Returns a function counting the tokens of a single message for this model.
+
+    With `exact`, the model's own tokenizer is used (e.g. tiktoken for OpenAI)
+    and the counter falls back to a characters-per-token estimate if the
+    tokenizer is unavailable, such as when its vocabulary can't be downloaded.
+    """
+    state = {"exact": exact}
+
+    def estimate(message: BaseMessage) -> int:
+        return int(len(_message_text(message)) / chars_per_token) + MESSAGE_OVERHEAD_TOKENS
+
+    def count(message: BaseMessage) -> int:
+        if state["exact"]:
+            try:
+                return llm.get_num_tokens_from_messages([message])
+            except Exception:
+                state["exact"] = False
+        return estimate(message)
+
+    return count
+
+
+def _split_turns(messages: list[BaseMessage]) -> list[list[BaseMessage]]:
+    """Groups messages into turns, each starting at a HumanMessage."""
+    turns = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+class HistoryManager:
+    """
+    Keeps the conversation sent to the model within a token budget.
+
+    A tool result repeated verbatim later in the conversation (the same file
+    read twice) is replaced by a reference to the later copy. The last
+    `keep_turns` turns are otherwise sent verbatim. In older turns, tool
+    results larger than `tool_output_max_tokens` are replaced by short stubs.
+    When the history still exceeds `max_tokens`, the older turns are folded
+    into a running summary, and if the kept turns alone are still too large,
+    their large tool results are stubbed too, oldest first, sparing the
+    results of the latest step, which the model has not seen yet. Stubs,
+    removals and the summary are returned as state updates so the
+    checkpoint shrinks along with the prompt.
+    """
+
+    def __init__(
+        self,
+        llm,
+        max_tokens: int,
+        keep_turns: int,
+        tool_output_max_tokens: int,
+        summary_max_tokens: int,
+        token_counter: Callable[[BaseMessage], int] | None = None,
+    ):
+        self.llm = llm
+        self.max_tokens = max_tokens
+        self.keep_turns = max(keep_turns, 1)
+        self.tool_output_max_tokens = tool_output_max_tokens
+        self.summary_max_tokens = summary_max_tokens
+        self._count = token_counter or make_token_counter(llm)
+        self._token_cache: dict[tuple[str, int], int] = {}
+
+    def count(self, message: BaseMessage) -> int:
+        """Counts a message's tokens, caching by message id and content length."""
+        if message.id is None:
+            return self._count(message)
+        key = (message.id, len(_message_text(message)))
+        if key not in self._token_cache:
+            self._token_cache[key] = self._count(message)
+        return self._token_cache[key]
+
+    def _stub(self, message: ToolMessage) -> ToolMessage:
+        size = len(_message_text(message))
+        return ToolMessage(
+            content=(
+                f"[Output of {message.name or 'tool'} ({size} chars) removed from history to save context. "
+                "Call the tool again if you need it.]"
+            ),
+            tool_call_id=message.tool_call_id,
+            name=message.name,
+            id=message.id,
+        )
+
+    def _reference(self, message: ToolMessage, later: ToolMessage) -> ToolMessage:
+        return ToolMessage(
+            content=(
+                f"[Output identical to the later {later.name or 'tool'} result (tool call {later.tool_call_id}); "
+                "removed here to avoid repeating it.]"
+            ),
+            tool_call_id=message.tool_call_id,
+            name=message.name,
+            id=message.id,
+        )
+
+    def _dedup(self, turns: list[list[BaseMessage]]) -> list[ToolMessage]:
+        """Replaces tool results that reappear verbatim later with references; returns the replacements."""
+        latest: dict[str, ToolMessage] = {}
+        replaced = []
+        for turn in reversed(turns):
+            for i in range(len(turn) - 1, -1, -1):
+                message = turn[i]
+                if not isinstance(message, ToolMessage) or not isinstance(message.content, str):
+                    continue
+                if len(message.content) < DEDUP_MIN_CHARS or message.status == "error":
+                    continue
+                digest = content_hash(message.content)
+                later = latest.get(digest)
+                if later is None:
+                    latest[digest] = message
+                else:
+                    turn[i] = self._reference(message, later)
+                    replaced.append(turn[i])
+        return replaced
+
+    def _summarize(self, summary: str, turns: list[list[BaseMessage]]) -> str:
+        transcript = "\n".join(
+            f"{m.type}: {_message_text(m)[:2000]}" for turn in turns for m in turn
+        )
+        prompt = HISTORY_SUMMARY_PROMPT.format(MAX_TOKENS=self.summary_max_tokens)
+        request = f"Current summary:\n{summary or '(none)'}\n\nNew conversation to fold in:\n{transcript}"
+        response = self.llm.invoke([SystemMessage(content=prompt), HumanMessage(content=request)])
+        return _message_text(response).strip()
+
+    def prepare(self, messages: list[BaseMessage], summary: str, reserved_tokens: int = 0) -> tuple[list[BaseMessage], dict]:
+        """
+        Fits the history into the budget.
+
+        Args:
+            messages: The full message history from the graph state.
+            summary: The running summary from the graph state.
+            reserved_tokens: Tokens already used by the system prompt.
+
+        Returns:
+            The messages to send to the model, and the state update
+            (message references/stubs/removals and the new summary) to persist.
+        """
+        turns = _split_turns(messages)
+        old_turns, recent_turns = turns[:-self.keep_turns], turns[-self.keep_turns:]
+        update_messages = self._dedup(turns)
+
+        for turn in old_turns:
+            for i, message in enumerate(turn):
+                if isinstance(message, ToolMessage) and self.count(message) > self.tool_output_max_tokens:
+                    turn[i] = self._stub(message)
+                    update_messages.append(turn[i])
+
+        budget = self.max_tokens - reserved_tokens - self.summary_max_tokens
+        total = sum(self.count(m) for turn in turns for m in turn)
+        update = {}
+        if total > budget and old_turns:
+            try:
+                summary = self._summarize(summary, old_turns)
+            except Exception:
+                summary = (summary + f"\n({len(old_turns)} earlier turns omitted)").strip()
+            update["summary"] = summary
+            # Folded turns are removed; references and stubs in the kept turns still apply.
+            removals = [RemoveMessage(id=m.id) for turn in old_turns for m in turn if m.id]
+            removed_ids = {m.id for m in removals}
+            update_messages = [m for m in update_messages if m.id not in removed_ids] + removals
+            old_turns = []
+            total = sum(self.count(m) for turn in recent_turns for m in turn)
+
+        if total > budget and recent_turns:
+            last = recent_turns[-1]
+            pending = len(last)
+            while pending > 0 and isinstance(last[pending - 1], ToolMessage):
+                pending -= 1
+            for turn in recent_turns:
+                for i, message in enumerate(turn[:pending] if turn is last else turn):
+                    if total <= budget:
+                        break
+                    if isinstance(message, ToolMessage) and self.count(message) > self.tool_output_max_tokens:
+                        turn[i] = self._stub(message)
+                        total -= self.count(message) - self.count(turn[i])
+                        update_messages.append(turn[i])
+
+        if update_messages:
+            update["messages"] = update_messages
+        return [m for turn in old_turns + recent_turns for m in turn], update
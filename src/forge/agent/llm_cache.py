@@ -0,0 +1,174 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+
+from langchain_core.messages import AIMessage, BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.runnables import RunnableBinding, RunnableConfig, RunnableLambda
+
+from ..config.config import ForgeConfig
+
+logger = logging.getLogger(__name__)
+
+# off: no cache. cache: serve repeated prompts, evicting by LRU and TTL.
+# record: always call the model and keep every response (never evicted).
+# replay: only serve stored responses; a prompt with none is an error.
+LLM_CACHE_MODES = ("off", "cache", "record", "replay")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY, model TEXT, message TEXT, size INTEGER, created REAL, used REAL, pinned INTEGER
+);
+CREATE INDEX IF NOT EXISTS responses_used ON responses (used);
+"""
+
+
+class LLMCacheMiss(RuntimeError):
+    """Raised in replay mode when a prompt was never recorded."""
+
+
+def model_id(llm) -> str:
+    """Identifies a chat model by its class and model name."""
+    name = getattr(llm, "model_name", None) or getattr(llm, "model", None) or ""
+    return f"{type(llm).__module__}.{type(llm).__qualname__}:{name}"
+
+
+def _canonical_message(message: BaseMessage) -> dict:
+    """The parts of a message the model sees; ids and metadata vary between runs and are left out."""
+    canonical = {"type": message.type, "content": message.content}
+    if getattr(message, "tool_calls", None):
+        canonical["tool_calls"] = [{"name": c["name"], "args": c["args"], "id": c["id"]} for c in message.tool_calls]
+    if getattr(message, "tool_call_id", None):
+        canonical["tool_call_id"] = message.tool_call_id
+    if message.name:
+        canonical["name"] = message.name
+    return canonical
+
+
+class LLMResponseCache:
+    """
+    Model responses stored in .forge/llm_cache.db, keyed on a hash of the
+    model, the prompt messages and the bound tool schemas and options.
+
+    In "cache" mode, entries older than `ttl_s` are not served and least
+    recently used entries are evicted beyond `max_bytes`. Recorded entries
+    are pinned: they are exempt from both, so a recorded session can always
+    be replayed, offline and deterministically, by a run in "replay" mode.
+    """
+
+    def __init__(self, mode: str, max_bytes: int, ttl_s: float = 0, path: str | os.PathLike | None = None):
+        if mode not in LLM_CACHE_MODES or mode == "off":
+            raise ValueError(f"Invalid LLM cache mode '{mode}'. Valid: {list(LLM_CACHE_MODES[1:])}")
+        if path is None:
+            path = os.path.join(ForgeConfig.CONFIG_DIR, "llm_cache.db") if os.path.isdir(ForgeConfig.CONFIG_DIR) else ":memory:"
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    @staticmethod
+    def key(model: str, messages: list[BaseMessage], bound: dict | None = None) -> str:
+        raw = json.dumps(
+            [model, [_canonical_message(m) for m in messages], bound or {}], sort_keys=True, default=str, ensure_ascii=False
+        )
+        return hashlib.sha256(raw.encode("utf-8", errors="surrogatepass")).hexdigest()
+
+    def get(self, key: str) -> AIMessage | None:
+        with self.lock:
+            row = self._conn.execute("SELECT message, created, pinned FROM responses WHERE key = ?", (key,)).fetchone()
+            expired = (
+                row is not None and self.mode == "cache" and not row[2]
+                and self.ttl_s > 0 and row[1] < time.time() - self.ttl_s
+            )
+            if row is None or expired:
+                self.misses += 1
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE responses SET used = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+        (message,) = messages_from_dict([json.loads(row[0])])
+        return message
+
+    def put(self, key: str, model: str, message: AIMessage):
+        data = json.dumps(message_to_dict(message), ensure_ascii=False, default=str)
+        now = time.time()
+        with self.lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, data, len(data.encode("utf-8", errors="replace")), now, now, int(self.mode == "record")),
+            )
+            self._evict()
+
+    def _evict(self):
+        if self.ttl_s > 0:
+            self._conn.execute("DELETE FROM responses WHERE pinned = 0 AND created < ?", (time.time() - self.ttl_s,))
+        (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses WHERE pinned = 0").fetchone()
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM responses WHERE pinned = 0 ORDER BY used").fetchall():
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def _lookup(self, model: str, messages: list[BaseMessage], bound: dict) -> tuple[str, AIMessage | None]:
+        key = self.key(model, messages, bound)
+        if self.mode == "record":
+            return key, None
+        cached = self.get(key)
+        if cached is None and self.mode == "replay":
+            last = messages[-1] if messages else None
+            preview = " ".join(str(last.content).split())[:80] if last is not None else ""
+            raise LLMCacheMiss(f"No recorded response for this prompt ({len(messages)} messages, last: {preview!r}); key {key[:12]}.")
+        if cached is not None:
+            logger.info("llm cache hit: %s %s", model, key[:12])
+            # A fresh id, so add_messages never mistakes a repeated response for an update of an earlier one.
+            cached.id = None
+            cached.response_metadata = {**cached.response_metadata, "forge_cache": "hit"}
+        return key, cached
+
+    def wrap(self, runnable, model: str):
+        """
+        Returns `runnable` (a chat model, possibly with tools bound) behind the
+        cache. Hits are marked with response_metadata["forge_cache"] = "hit".
+        """
+        bound = runnable.kwargs if isinstance(runnable, RunnableBinding) else {}
+
+        def invoke(messages: list[BaseMessage], config: RunnableConfig):
+            key, cached = self._lookup(model, messages, bound)
+            if cached is not None:
+                return cached
+            response = runnable.invoke(messages, config)
+            self.put(key, model, response)
+            return response
+
+        async def ainvoke(messages: list[BaseMessage], config: RunnableConfig):
+            key, cached = self._lookup(model, messages, bound)
+            if cached is not None:
+                return cached
+            response = await runnable.ainvoke(messages, config)
+            self.put(key, model, response)
+            return response
+
+        return RunnableLambda(invoke, afunc=ainvoke, name="llm_cache")
+
+
+_CACHES: dict[tuple, LLMResponseCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_llm_cache(mode: str, max_bytes: int, ttl_s: float = 0, path: str | os.PathLike | None = None) -> LLMResponseCache:
+    """Returns the process-wide response cache for a mode and file, shared by every graph and thread."""
+    with _CACHES_LOCK:
+        cache = _CACHES.get((mode, str(path)))
+        if cache is None:
+            cache = _CACHES[(mode, str(path))] = LLMResponseCache(mode, max_bytes, ttl_s, path)
+        cache.max_bytes, cache.ttl_s = max_bytes, ttl_s
+        return cache
@@ -0,0 +1,71 @@
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage, ToolMessage
+
+# Anthropic only caches up to explicit breakpoints. OpenAI and Gemini cache
+# long prompt prefixes automatically, so for them a byte-stable ordering
+# (tools, static instructions, project structure, then anything that changes)
+# is all that is needed.
+CACHE_STYLE_ANTHROPIC = "anthropic"
+CACHE_STYLE_PREFIX = "prefix"
+
+_EPHEMERAL = {"type": "ephemeral"}
+
+
+def _with_breakpoint(message: BaseMessage) -> BaseMessage:
+    """Returns a copy of the message whose last content block is marked as a cache breakpoint."""
+    content = message.content
+    blocks = [{"type": "text", "text": content}] if isinstance(content, str) else [
+        dict(block) if isinstance(block, dict) else {"type": "text", "text": str(block)} for block in content
+    ]
+    if not blocks:
+        return message
+    blocks[-1]["cache_control"] = _EPHEMERAL
+    return message.model_copy(update={"content": blocks})
+
+
+def build_prompt(
+    instructions: str,
+    project_section: str,
+    summary_section: str,
+    history: list[BaseMessage],
+    cache_style: str = CACHE_STYLE_PREFIX,
+) -> list[BaseMessage]:
+    """
+    Assembles the messages for one model call, most stable content first.
+
+    For Anthropic, cache breakpoints are placed after the project structure
+    (covering tools, instructions and structure) and on the latest user or
+    tool message (covering the conversation so far).
+    """
+    if cache_style != CACHE_STYLE_ANTHROPIC:
+        return [SystemMessage(content=instructions + project_section + summary_section)] + history
+
+    system_blocks = [
+        {"type": "text", "text": instructions},
+        {"type": "text", "text": project_section, "cache_control": _EPHEMERAL},
+    ]
+    if summary_section:
+        system_blocks.append({"type": "text", "text": summary_section})
+
+    if history and isinstance(history[-1], (HumanMessage, ToolMessage)):
+        history = history[:-1] + [_with_breakpoint(history[-1])]
+    return [SystemMessage(content=system_blocks)] + history
+
+
+def cache_usage(messages: list[BaseMessage]) -> dict:
+    """
+    Sums input, output and prompt-cache token counts over the given AI
+    messages, including the discarded router replies recorded on them
+    (response_metadata["forge_discarded_usage"], see agent/routing.py).
+    """
+    totals = {"input": 0, "output": 0, "cache_read": 0, "cache_write": 0}
+    for message in messages:
+        metadata = getattr(message, "response_metadata", None) or {}
+        for usage in [getattr(message, "usage_metadata", None), *metadata.get("forge_discarded_usage", [])]:
+            if not usage:
+                continue
+            details = usage.get("input_token_details") or {}
+            totals["input"] += usage.get("input_tokens", 0)
+            totals["output"] += usage.get("output_tokens", 0)
+            totals["cache_read"] += details.get("cache_read", 0) or 0
+            totals["cache_write"] += details.get("cache_creation", 0) or 0
+    return totals
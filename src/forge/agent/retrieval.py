@@ -0,0 +1,117 @@
+import os
+from collections import OrderedDict
+from typing import Callable
+
+from langchain_core.messages import BaseMessage, HumanMessage
+
+from .prompt import RETRIEVED_CONTEXT_SECTION
+from ..utils.bm25_index import BM25Index
+
+CONTEXT_CACHE_SIZE = 32
+
+
+def _chunk_text(root: str, path: str, start: int, end: int) -> str:
+    try:
+        with open(os.path.join(root, path), "r", encoding="utf-8", errors="replace") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return ""
+    return "\n".join(lines[start - 1:end])
+
+
+class Retriever:
+    """
+    Adds the project chunks most relevant to the user's request to the prompt.
+
+    Chunks are retrieved once per user message and appended to it. The
+    augmented message is stored in the conversation in place of the original
+    (marked with response_metadata["forge_retrieval"]), so every later model
+    call, in this turn and the following ones, sends the same bytes for it
+    and the prompt prefix stays cacheable.
+    """
+
+    def __init__(
+        self,
+        index: BM25Index,
+        top_k: int,
+        max_tokens: int,
+        token_counter: Callable[[BaseMessage], int],
+        refresh_seconds: float = 1.0,
+    ):
+        self.index = index
+        self.top_k = top_k
+        self.max_tokens = max_tokens
+        self.token_counter = token_counter
+        self.refresh_seconds = refresh_seconds
+        self._contexts: "OrderedDict[str, str]" = OrderedDict()
+
+    def _build(self, query: str) -> str:
+        self.index.refresh(max_seconds=self.refresh_seconds)
+        sections, used = [], 0
+        for chunk in self.index.search(query, top_k=self.top_k):
+            text = _chunk_text(self.index.root, chunk.path, chunk.start_line, chunk.end_line)
+            if not text.strip():
+                continue
+            section = f"--- {chunk.path}:{chunk.start_line}-{chunk.end_line} ---\n{text}"
+            tokens = self.token_counter(HumanMessage(content=section))
+            if used + tokens > self.max_tokens:
+                continue  # a smaller, lower-ranked chunk may still fit
+            sections.append(section)
+            used += tokens
+        return RETRIEVED_CONTEXT_SECTION.format(CHUNKS="\n".join(sections)) if sections else ""
+
+    @staticmethod
+    def _key(message: HumanMessage) -> str:
+        return message.id or str(hash(str(message.content)))
+
+    def context_for(self, message: HumanMessage) -> str:
+        """Returns the retrieved-context block for a user message ("" if nothing relevant)."""
+        key = self._key(message)
+        context = self._contexts.get(key)
+        if context is None:
+            text = message.content if isinstance(message.content, str) else " ".join(
+                block.get("text", "") for block in message.content if isinstance(block, dict)
+            )
+            context = self._contexts[key] = self._build(text)
+            while len(self._contexts) > CONTEXT_CACHE_SIZE:
+                self._contexts.popitem(last=False)
+        return context
+
+    def pending(self, messages: list[BaseMessage]) -> bool:
+        """
+        Whether the latest user message may still get retrieved context.
+
+        Once augmented, the context is part of the stored message and counted
+        with the history, so the budget needs no room reserved for it.
+        """
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                return not message.response_metadata.get("forge_retrieval") and self._contexts.get(self._key(message)) != ""
+        return False
+
+    def augment(self, history: list[BaseMessage]) -> tuple[list[BaseMessage], HumanMessage | None]:
+        """
+        Appends retrieved context to the latest user message, unless already done.
+
+        Returns:
+            The history to send, and the augmented message to store in the
+            state (None if there is nothing new to store).
+        """
+        for i in range(len(history) - 1, -1, -1):
+            message = history[i]
+            if isinstance(message, HumanMessage):
+                if message.response_metadata.get("forge_retrieval"):
+                    return history, None
+                context = self.context_for(message)
+                if not context:
+                    return history, None
+                content = message.content
+                if isinstance(content, str):
+                    content = content + context
+                else:
+                    content = list(content) + [{"type": "text", "text": context}]
+                augmented = message.model_copy(
+                    update={"content": content, "response_metadata": {**message.response_metadata, "forge_retrieval": True}}
+                )
+                return history[:i] + [augmented] + history[i + 1:], augmented
+        return history, None
@@ -0,0 +1,95 @@
+"""
+Per-step choice between a fast router model and the main (answer) model.
+
+Most steps of a turn only pick the next file to read or search. Those steps
+go to the router model; steps that plan, write or answer go to the answer
+model. The choice for the next step uses signals from the conversation:
+
+- The last message is the user's, so the step plans the turn: answer model.
+- The last tool calls included an edit or code execution (a pending edit):
+  answer model, which reviews the outcome and continues the change.
+- The last messages are results of read-only tools: router model, unless
+  the router already took `max_router_steps` steps in this turn.
+
+A router reply is kept only if it calls read-only tools. A reply that
+answers, edits or runs code (the large outputs, where quality matters) is
+discarded and the answer model is asked instead, so every final answer and
+edit comes from the answer model.
+
+That makes routing a trade: each kept router step saves the difference
+between the two models' latency, while the step that ends an exploration
+(usually the final answer) pays for one discarded router call on top of the
+answer model's. Routing only pays off when router steps are much faster and
+turns read several times before answering. The discarded calls' tokens are
+recorded on the reply that replaced them (see `discard`), so they show in
+turn and batch usage, and `forge stats` reports kept and discarded router
+steps with their time and tokens to check the trade on real traces.
+"""
+import logging
+from dataclasses import dataclass
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+
+logger = logging.getLogger(__name__)
+
+ANSWER = "answer"
+ROUTER = "router"
+
+
+@dataclass
+class Route:
+    role: str
+    reason: str
+
+
+class ModelRouter:
+    def __init__(self, read_only_tools: set[str], max_router_steps: int = 8):
+        self.read_only_tools = set(read_only_tools)
+        self.max_router_steps = max_router_steps
+
+    def route(self, messages: list[BaseMessage]) -> Route:
+        """Picks the model for the step that follows `messages`."""
+        if not messages or not isinstance(messages[-1], ToolMessage):
+            return Route(ANSWER, "new request")
+
+        turn_start = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=-1)
+        turn = messages[turn_start + 1:]
+        last_ai = next((m for m in reversed(turn) if isinstance(m, AIMessage)), None)
+        calls = [call["name"] for call in (last_ai.tool_calls if last_ai else [])]
+        pending = [name for name in calls if name not in self.read_only_tools]
+        if pending:
+            return Route(ANSWER, f"edit pending ({', '.join(pending)})")
+
+        router_steps = sum(
+            1 for m in turn if isinstance(m, AIMessage) and m.response_metadata.get("forge_route") == ROUTER
+        )
+        if router_steps >= self.max_router_steps:
+            return Route(ANSWER, f"router step limit ({self.max_router_steps})")
+        return Route(ROUTER, f"after {', '.join(calls) or 'tool results'}")
+
+    def accepts(self, response: AIMessage) -> bool:
+        """Whether a router reply can stand: it only calls read-only tools."""
+        return bool(response.tool_calls) and all(call["name"] in self.read_only_tools for call in response.tool_calls)
+
+    def rejection_reason(self, response: AIMessage) -> str:
+        if not response.tool_calls:
+            return "router answered"
+        return f"router called {', '.join(c['name'] for c in response.tool_calls if c['name'] not in self.read_only_tools)}"
+
+
+def mark(response: AIMessage, route: Route) -> AIMessage:
+    """Records the route in the response, for the router step limit and for inspection."""
+    response.response_metadata = {**response.response_metadata, "forge_route": route.role, "forge_route_reason": route.reason}
+    return response
+
+
+def discard(response: AIMessage, discarded: list[AIMessage]) -> AIMessage:
+    """Records the usage of router replies discarded in favour of `response`, so it is still counted."""
+    usage = [dict(m.usage_metadata) for m in discarded if m.usage_metadata]
+    if usage:
+        response.response_metadata = {**response.response_metadata, "forge_discarded_usage": usage}
+    return response
+
+
+def log_route(thread_id: str | None, route: Route, model: str):
+    logger.info("route [%s] %s -> %s (%s)", thread_id, route.role, model, route.reason)
@@ -30,7 +30,7 @@ def main():
     print("\n=== 2. Starting 5-Turn Chat Session ===")
     # The 'with' block ensures the database connection is managed safely.
     with SqliteSaver.from_conn_string(str(ForgeConfig.CONFIG_DB)) as checkpointer:
-        graph = create_graph(cfg.llm, checkpointer)
+        graph = create_graph(cfg.llm, checkpointer, cfg)
         
         # Loop for a 5-turn conversation.
         for i in range(5):
@@ -0,0 +1,137 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+
+from ..config.config import ForgeConfig
+
+logger = logging.getLogger(__name__)
+
+# Read-only tools whose output depends only on their arguments and the file they read.
+CACHEABLE_TOOLS = {"read_file", "list_notebook_cells", "read_notebook_cells", "summarize_dataset"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (hash TEXT PRIMARY KEY, content TEXT, size INTEGER);
+CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, hash TEXT, used REAL);
+CREATE INDEX IF NOT EXISTS entries_used ON entries (used);
+CREATE INDEX IF NOT EXISTS entries_hash ON entries (hash);
+"""
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", errors="surrogatepass")).hexdigest()
+
+
+def _file_stamp(file_path: str) -> tuple[str, int, int] | None:
+    try:
+        st = os.stat(file_path)
+    except (OSError, TypeError, ValueError):
+        return None
+    return os.path.abspath(file_path), st.st_mtime_ns, st.st_size
+
+
+class ToolResultCache:
+    """
+    A content-addressed cache of read-only tool results in .forge/tool_cache.db.
+
+    Entries are keyed on the tool name, its arguments and the (path, mtime,
+    size) of the file it reads, so an edited file is never served stale,
+    and map to the hash of the output, which is stored once however many
+    keys produce it. The cache is shared by every conversation thread and
+    session; least recently used entries are evicted beyond `max_bytes`.
+    """
+
+    def __init__(self, max_bytes: int, cache_dir: str | os.PathLike | None = None):
+        cache_dir = cache_dir if cache_dir is not None else ForgeConfig.CONFIG_DIR
+        db_path = os.path.join(cache_dir, "tool_cache.db") if os.path.isdir(cache_dir) else ":memory:"
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    @staticmethod
+    def key(name: str, args: dict) -> str | None:
+        """Returns the cache key for a call, or None if the tool's file can't be stat'ed."""
+        stamp = _file_stamp(args.get("file_path"))
+        if stamp is None:
+            return None
+        other = {k: v for k, v in args.items() if k != "file_path"}
+        raw = json.dumps([name, stamp, other], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        with self.lock:
+            row = self._conn.execute(
+                "SELECT b.content FROM entries e JOIN blobs b ON b.hash = e.hash WHERE e.key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE entries SET used = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, content: str):
+        digest = content_hash(content)
+        with self.lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO blobs VALUES (?, ?, ?)", (digest, content, len(content.encode("utf-8", errors="replace")))
+            )
+            self._conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)", (key, digest, time.time()))
+            self._evict()
+
+    def _evict(self):
+        (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used entries until their unreferenced blobs bring the total under the limit.
+        for key, digest in self._conn.execute("SELECT key, hash FROM entries ORDER BY used").fetchall():
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            if self._conn.execute("SELECT 1 FROM entries WHERE hash = ? LIMIT 1", (digest,)).fetchone() is None:
+                (size,) = self._conn.execute("SELECT size FROM blobs WHERE hash = ?", (digest,)).fetchone()
+                self._conn.execute("DELETE FROM blobs WHERE hash = ?", (digest,))
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    def call(self, name: str, args: dict, run) -> tuple[str, bool]:
+        """
+        Returns (output, cached): the cached output for this call, or the result
+        of `run()`, which is stored if it is text, not an error, and the file
+        did not change meanwhile.
+        """
+        key = self.key(name, args)
+        if key is not None:
+            content = self.get(key)
+            if content is not None:
+                logger.info("tool cache hit: %s(%s)", name, args.get("file_path"))
+                return content, True
+        content = run()
+        if (
+            key is not None
+            and isinstance(content, str)
+            and not content.startswith("[ToolError")
+            and self.key(name, args) == key
+        ):
+            self.put(key, content)
+        return content, False
+
+
+_CACHE: ToolResultCache | None = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_tool_cache(max_bytes: int) -> ToolResultCache:
+    """Returns the process-wide tool result cache, shared by every graph and thread."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = ToolResultCache(max_bytes)
+        _CACHE.max_bytes = max_bytes
+        return _CACHE
@@ -0,0 +1,120 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableConfig
+
+from .tool_cache import ToolResultCache, CACHEABLE_TOOLS
+from ..tools.tool_utils import _patched_path
+from ..utils.tracing import TRACER
+
+
+# config["configurable"] key of a run's cancellation event. A cancelled run's tools node
+# keeps running in its executor thread; once the event is set it starts no further calls.
+CANCEL_EVENT = "cancel_event"
+
+
+def with_cancel_event(config: dict) -> dict:
+    """A copy of a run config with a fresh cancellation event (see settle_cancelled_turn)."""
+    return {**config, "configurable": {**config.get("configurable", {}), CANCEL_EVENT: threading.Event()}}
+
+
+def _cancelled(config: RunnableConfig) -> bool:
+    event = (config.get("configurable") or {}).get(CANCEL_EVENT)
+    return event is not None and event.is_set()
+
+
+def _invoke(tool, call: dict, config: RunnableConfig) -> ToolMessage:
+    """Invokes a tool, turning raised errors into error ToolMessages."""
+    try:
+        result = tool.invoke({**call, "type": "tool_call"}, config)
+    except Exception as e:
+        return ToolMessage(
+            content=f"[ToolError: {call['name']} failed: {e}]",
+            tool_call_id=call["id"],
+            name=call["name"],
+            status="error",
+        )
+    if isinstance(result, ToolMessage):
+        return result
+    return ToolMessage(content=str(result), tool_call_id=call["id"], name=call["name"])
+
+
+def _run_call(tools_by_name: dict, call: dict, config: RunnableConfig, cache: ToolResultCache | None = None) -> ToolMessage:
+    """Runs one tool call via `_dispatch`, recording it as a trace span; a cancelled run's calls are skipped."""
+    if _cancelled(config):
+        return ToolMessage(
+            content="[ToolError: Not run: the turn was cancelled.]", tool_call_id=call["id"], name=call["name"], status="error"
+        )
+    with TRACER.span("tool", call["name"], config, args_bytes=len(json.dumps(call["args"], default=str))) as span:
+        result = _dispatch(tools_by_name, call, config, cache)
+        span.update(
+            result_bytes=len(str(result.content).encode("utf-8", errors="replace")),
+            cached=bool(result.additional_kwargs.get("cached")),
+            status="error" if result.status == "error" or str(result.content).startswith("[ToolError") else "ok",
+        )
+    return result
+
+
+def _dispatch(tools_by_name: dict, call: dict, config: RunnableConfig, cache: ToolResultCache | None) -> ToolMessage:
+    """Runs one tool call, serving cacheable tools from `cache` and turning unknown tools into error ToolMessages."""
+    tool = tools_by_name.get(call["name"])
+    if tool is None:
+        return ToolMessage(
+            content=f"[ToolError: Unknown tool '{call['name']}'. Valid: {list(tools_by_name)}]",
+            tool_call_id=call["id"],
+            name=call["name"],
+            status="error",
+        )
+    # A patch run's reads of patched files see the patched copy, which the cache doesn't key on.
+    if cache is None or call["name"] not in CACHEABLE_TOOLS or _patched_path(config, call["args"].get("file_path")):
+        return _invoke(tool, call, config)
+
+    fresh = None
+
+    def run():
+        nonlocal fresh
+        fresh = _invoke(tool, call, config)
+        return fresh.content
+
+    content, cached = cache.call(call["name"], call["args"], run)
+    if not cached:
+        return fresh
+    return ToolMessage(content=content, tool_call_id=call["id"], name=call["name"], additional_kwargs={"cached": True})
+
+
+def make_tool_node(tools: list, parallel_safe: set[str], max_workers: int = 8, cache: ToolResultCache | None = None):
+    """
+    Builds the graph node that executes the tool calls of the last AI message.
+
+    Calls to tools in `parallel_safe` (side-effect free) run concurrently on
+    a thread pool. All other calls, which may prompt the user for approval,
+    run one at a time in the order the model issued them, so prompts never
+    interleave. ToolMessages are always returned in the original call order.
+    Results of CACHEABLE_TOOLS are served from `cache` while the file they
+    read is unchanged, and marked with `additional_kwargs["cached"]`.
+    """
+    tools_by_name = {t.name: t for t in tools}
+
+    def tools_node(state: dict, config: RunnableConfig):
+        calls = state["messages"][-1].tool_calls
+        parallel = [c for c in calls if c["name"] in parallel_safe]
+        serial = [c for c in calls if c["name"] not in parallel_safe]
+
+        results = {}
+        if len(parallel) > 1 and max_workers > 1:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(parallel))) as pool:
+                futures = {c["id"]: pool.submit(_run_call, tools_by_name, c, config, cache) for c in parallel}
+                # Approval-gated calls run here while the reads proceed in the background.
+                for c in serial:
+                    results[c["id"]] = _run_call(tools_by_name, c, config, cache)
+                for call_id, future in futures.items():
+                    results[call_id] = future.result()
+        else:
+            for c in parallel + serial:
+                results[c["id"]] = _run_call(tools_by_name, c, config, cache)
+
+        return {"messages": [results[c["id"]] for c in calls]}
+
+    return tools_node
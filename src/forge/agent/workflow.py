@@ -1,43 +1,287 @@
-from langchain_core.messages import SystemMessage, BaseMessage
+import asyncio
+
+from langchain_core.messages import SystemMessage, BaseMessage, AIMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda, RunnableConfig
+from langgraph.constants import TAG_NOSTREAM
 from langgraph.graph import START, END, StateGraph
-from langgraph.prebuilt import ToolNode, tools_condition
+from langgraph.prebuilt import tools_condition
 from langgraph.graph.message import add_messages
 
 from typing import TypedDict, Annotated
 
-from .prompt import CODING_AGENT_PROMPT
-from ..tools.tools import read_file, propose_changes, read_notebook_cells, summarize_dataset, execute_code, write_notebook
-from ..utils.utils import generate_project_tree
+from .prompt import CODING_AGENT_PROMPT, PROJECT_STRUCTURE_SECTION, HISTORY_SUMMARY_SECTION
+from .prompt_cache import build_prompt, cache_usage, CACHE_STYLE_PREFIX
+from .history import HistoryManager, make_token_counter
+from .tool_runner import make_tool_node, CANCEL_EVENT
+from .tool_cache import get_tool_cache
+from .llm_cache import get_llm_cache, model_id
+from .retrieval import Retriever
+from .routing import ModelRouter, Route, ROUTER, ANSWER, mark, discard, log_route
+from ..config.config import ForgeConfig
+from ..config.constants import PROVIDER_MAP, DEFAULT_OPTIONS
+from ..tools.tools import (
+    read_file, search_code, find_definition, find_references, outline_file,
+    propose_changes, list_notebook_cells, read_notebook_cells, edit_notebook_cells, summarize_dataset,
+    execute_code, write_notebook,
+)
+from ..tools.python_worker import WORKER_POOL
+from ..utils.project_index import ProjectIndex
+from ..utils.bm25_index import get_bm25_index
+from ..utils.code_search import get_search_index
+from ..utils.symbol_index import get_symbol_index
+from ..utils.tracing import TRACER
 
 # State definition
 class ChatState(TypedDict):
     messages: Annotated[list[BaseMessage], add_messages]
+    summary: str  # running summary of turns folded out of `messages`
 
 # The agent's tools
-TOOLS = [read_file, propose_changes, read_notebook_cells, summarize_dataset, execute_code, write_notebook]
+TOOLS = [
+    read_file, search_code, find_definition, find_references, outline_file,
+    propose_changes, list_notebook_cells, read_notebook_cells, edit_notebook_cells, summarize_dataset,
+    execute_code, write_notebook,
+]
+
+# Side-effect-free tools whose calls may run concurrently within a turn.
+# Everything else asks the user for approval and runs one call at a time.
+PARALLEL_SAFE_TOOLS = {
+    "read_file", "search_code", "find_definition", "find_references", "outline_file",
+    "list_notebook_cells", "read_notebook_cells", "summarize_dataset",
+}
 
-def create_graph(llm, checkpointer):
+def create_graph(llm, checkpointer, cfg=None, router_llm=None):
     """
     Creates and compiles the LangGraph agent with the provided checkpointer.
+
+    `cfg` is the ForgeConfig supplying history budgets and the provider;
+    without it, default budgets and an estimated token count are used.
+    `router_llm` is a faster model for exploration steps (see agent/routing.py);
+    by default it comes from cfg's router_model, and without one every step uses `llm`.
     """
-    llm_with_tools = llm.bind_tools(TOOLS)
-    project_structure = generate_project_tree(".", max_depth=5)
-    system_prompt = CODING_AGENT_PROMPT.format(PROJECT_STRUCTURE=project_structure)
+    options = {name: getattr(cfg, name, default) for name, default in DEFAULT_OPTIONS.items()}
+    provider_spec = PROVIDER_MAP.get(getattr(cfg, "provider", None), {})
+
+    WORKER_POOL.configure(
+        max_workers=options["python_workers_max"],
+        timeout_s=options["execute_timeout_s"],
+        memory_limit_mb=options["execute_memory_limit_mb"],
+        cpu_limit_s=options["execute_cpu_limit_s"],
+    )
+    trace_dir = ForgeConfig.CONFIG_DIR
+    TRACER.configure(
+        trace_dir / "traces.jsonl" if options["trace_enabled"] and trace_dir.is_dir() else None,
+        max_bytes=options["trace_max_mb"] * 1024 * 1024,
+        otel=options["trace_otel"],
+    )
+    model_name = getattr(cfg, "model", None) or getattr(llm, "model_name", None) or getattr(llm, "model", None) or "llm"
+
+    llm_cache = None
+    if options["llm_cache"] != "off":
+        llm_cache = get_llm_cache(
+            options["llm_cache"],
+            max_bytes=options["llm_cache_max_mb"] * 1024 * 1024,
+            ttl_s=options["llm_cache_ttl_days"] * 86400,
+            path=options["llm_cache_path"],
+        )
+
+    def cached(model, base):
+        """`model` behind the response cache, keyed on `base`'s identity, when one is enabled."""
+        return llm_cache.wrap(model, model_id(base)) if llm_cache is not None else model
+
+    llm_with_tools = cached(llm.bind_tools(TOOLS), llm)
+    if router_llm is None and getattr(cfg, "router_model", None):
+        router_llm = cfg.router_llm
+    router = ModelRouter(PARALLEL_SAFE_TOOLS, max_router_steps=options["router_max_steps"]) if router_llm else None
+    # Router replies may be discarded, so they are not streamed token by token.
+    router_with_tools = cached(router_llm.bind_tools(TOOLS), router_llm).with_config(tags=[TAG_NOSTREAM]) if router_llm else None
+    router_name = (getattr(cfg, "router_model", None) or getattr(router_llm, "model_name", None) or "router") if router_llm else None
+    project_index = ProjectIndex(".")
+    project_index.refresh()
+    project_section = PROJECT_STRUCTURE_SECTION.format(PROJECT_STRUCTURE=project_index.render_tree(max_depth=5))
+    cache_style = provider_spec.get("prompt_cache", CACHE_STYLE_PREFIX)
+
+    token_counter = make_token_counter(
+        llm,
+        exact=provider_spec.get("exact_token_count", False),
+        chars_per_token=provider_spec.get("chars_per_token", 4.0),
+    )
+    history = HistoryManager(
+        cached(llm, llm),
+        max_tokens=options["history_max_tokens"],
+        keep_turns=options["history_keep_turns"],
+        tool_output_max_tokens=options["history_tool_output_max_tokens"],
+        summary_max_tokens=options["history_summary_max_tokens"],
+        token_counter=token_counter,
+    )
+    system_tokens = token_counter(SystemMessage(content=CODING_AGENT_PROMPT + project_section))
+
+    retriever = None
+    if options["retrieval_top_k"] > 0:
+        retriever = Retriever(
+            get_bm25_index("."),
+            top_k=options["retrieval_top_k"],
+            max_tokens=options["retrieval_max_tokens"],
+            token_counter=token_counter,
+            refresh_seconds=options["retrieval_refresh_seconds"],
+        )
+
+    def prepare(state: ChatState) -> tuple[list[BaseMessage], dict]:
+        """Builds the prompt for the next model call and the state update that goes with it."""
+        nonlocal project_section, system_tokens
+        # Pick up files created or removed by tools since the last call.
+        if project_index.refresh():
+            project_section = PROJECT_STRUCTURE_SECTION.format(PROJECT_STRUCTURE=project_index.render_tree(max_depth=5))
+            system_tokens = token_counter(SystemMessage(content=CODING_AGENT_PROMPT + project_section))
+
+        # Room for retrieved context only until it is stored in the message, after which the history counts it.
+        retrieval_tokens = options["retrieval_max_tokens"] if retriever is not None and retriever.pending(state["messages"]) else 0
+        history_messages, update = history.prepare(
+            state["messages"], state.get("summary", ""), reserved_tokens=system_tokens + retrieval_tokens
+        )
+        if retriever is not None:
+            history_messages, augmented = retriever.augment(history_messages)
+            if augmented is not None:
+                update = {**update, "messages": update.get("messages", []) + [augmented]}
+        summary = update.get("summary", state.get("summary", ""))
+        summary_section = HISTORY_SUMMARY_SECTION.format(SUMMARY=summary) if summary else ""
+
+        messages = build_prompt(CODING_AGENT_PROMPT, project_section, summary_section, history_messages, cache_style)
+        return messages, update
+
+    def traced_prepare(state: ChatState, config: RunnableConfig):
+        with TRACER.span("prepare", "chat_node", config):
+            return prepare(state)
+
+    def trace_usage(span: dict, response):
+        usage = cache_usage([response])
+        span.update(
+            input_tokens=usage["input"], output_tokens=usage["output"],
+            cache_read=usage["cache_read"], cache_write=usage["cache_write"],
+            tool_calls=len(getattr(response, "tool_calls", None) or []),
+            cached=response.response_metadata.get("forge_cache") == "hit" or None,
+        )
 
-    def chat_node(state: ChatState):
+    def step(decision: Route | None, config: RunnableConfig) -> tuple:
+        """The model (and its name) for a routing decision, which is logged."""
+        model, name = llm_with_tools, str(model_name)
+        if decision is not None and decision.role == ROUTER:
+            model, name = router_with_tools, str(router_name)
+        if decision is not None:
+            log_route(config.get("configurable", {}).get("thread_id"), decision, name)
+        return model, name
+
+    def escalation(decision: Route | None, response) -> Route | None:
+        """The answer model's route when a router reply can't stand, else None."""
+        if decision is None or decision.role != ROUTER or router.accepts(response):
+            return None
+        return Route(ANSWER, f"escalated: {router.rejection_reason(response)}")
+
+    def span_attrs(decision: Route | None) -> dict:
+        return {} if decision is None else {"route": decision.role, "reason": decision.reason}
+
+    def chat_node(state: ChatState, config: RunnableConfig):
         """LLM node that may answer or request a tool call."""
-        messages = [SystemMessage(content=system_prompt)] + state["messages"]
-        response = llm_with_tools.invoke(messages)
-        return {"messages": [response]}
+        messages, update = traced_prepare(state, config)
+        decision = router.route(state["messages"]) if router else None
+        discarded = []
+        while True:
+            model, name = step(decision, config)
+            with TRACER.span("llm", name, config, **span_attrs(decision)) as span:
+                response = model.invoke(messages)
+                trace_usage(span, response)
+                retry = escalation(decision, response)
+                span.update(discarded=retry is not None or None)
+            if retry is None:
+                break
+            discarded.append(response)
+            decision = retry
+        if decision is not None:
+            mark(discard(response, discarded), decision)
+        return {**update, "messages": update.get("messages", []) + [response]}
+
+    async def achat_node(state: ChatState, config: RunnableConfig):
+        """Async chat_node: cancelling the run cancels the in-flight model request."""
+        messages, update = await asyncio.to_thread(traced_prepare, state, config)
+        decision = router.route(state["messages"]) if router else None
+        discarded = []
+        while True:
+            model, name = step(decision, config)
+            with TRACER.span("llm", name, config, **span_attrs(decision)) as span:
+                response = await model.ainvoke(messages)
+                trace_usage(span, response)
+                retry = escalation(decision, response)
+                span.update(discarded=retry is not None or None)
+            if retry is None:
+                break
+            discarded.append(response)
+            decision = retry
+        if decision is not None:
+            mark(discard(response, discarded), decision)
+        return {**update, "messages": update.get("messages", []) + [response]}
 
-    tool_node = ToolNode(TOOLS)
+    tool_cache = get_tool_cache(options["tool_cache_max_mb"] * 1024 * 1024) if options["tool_cache_max_mb"] > 0 else None
+    tool_node = make_tool_node(
+        TOOLS, PARALLEL_SAFE_TOOLS, max_workers=options["parallel_tool_workers"], cache=tool_cache
+    )
 
     builder = StateGraph(ChatState)
-    builder.add_node("chat_node", chat_node)
+    builder.add_node("chat_node", RunnableLambda(chat_node, afunc=achat_node, name="chat_node"))
     builder.add_node("tools", tool_node)
     builder.add_edge(START, "chat_node")
     builder.add_conditional_edges("chat_node", tools_condition)
     builder.add_edge("tools", "chat_node")
 
     # Compile the graph with the checkpointer included
-    return builder.compile(checkpointer=checkpointer)
\ No newline at end of file
+    return builder.compile(checkpointer=checkpointer)
+
+def refresh_indexes(max_seconds: float = 0.5) -> bool:
+    """
+    Brings the project's search, symbol and retrieval indexes up to date, so
+    that idle time between turns, rather than the next tool call, pays for
+    indexing. Retrieval indexing stops after roughly max_seconds.
+
+    Returns:
+        True if retrieval indexing is unfinished and another call should follow.
+    """
+    for index in (get_search_index("."), get_symbol_index(".")):
+        with index.lock:
+            index.refresh()
+    bm25 = get_bm25_index(".")
+    bm25.refresh(max_seconds=max_seconds)
+    return bm25.pending > 0
+
+
+async def settle_cancelled_turn(graph, config: dict):
+    """
+    Leaves the thread ready for the next turn after a run was cancelled.
+
+    A turn cancelled after the model asked for tools would leave tool calls
+    without results, which providers reject; they are answered with an
+    error instead. The tools may already have run when the cancel landed
+    (the tools node keeps going in its thread), so the error says their
+    effects are unknown; setting the run's cancellation event (see
+    tool_runner.with_cancel_event) stops it from starting further calls. A
+    turn cancelled during the model call needs nothing: the user's message
+    is saved and the next turn simply follows it.
+    """
+    event = config.get("configurable", {}).get(CANCEL_EVENT)
+    if event is not None:
+        event.set()
+    state = await graph.aget_state(config)
+    messages = state.values.get("messages", [])
+    if not messages or not isinstance(messages[-1], AIMessage) or not messages[-1].tool_calls:
+        return
+    results = [
+        ToolMessage(
+            content=(
+                "[ToolError: Interrupted: the turn was cancelled while this call was pending or running. "
+                "Its effects are unknown; re-read any files it may have changed before retrying.]"
+            ),
+            tool_call_id=call["id"],
+            name=call["name"],
+            status="error",
+        )
+        for call in messages[-1].tool_calls
+    ]
+    await graph.aupdate_state(config, {"messages": results}, as_node="tools")
@@ -1,14 +1,14 @@
 import uuid
 import gc
+import time
+import signal
+import asyncio
 import typer
 from rich.console import Console
 from rich.markdown import Markdown
-
-from langchain_core.messages import HumanMessage
-from langgraph.checkpoint.sqlite import SqliteSaver
+from rich.markup import escape
 
 from .config.config import ForgeConfig
-from .agent.workflow import create_graph
 
 
 # Create a Typer app for a clean CLI experience
@@ -54,7 +54,105 @@ def init(
         raise typer.Exit(1)
 
 
-def _run_chat_repl(thread_id: str | None):
+TOOL_RESULT_PREVIEW_LEN = 200
+
+
+def _content_text(content) -> str:
+    """Extracts printable text from message content (a string or a list of content blocks)."""
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block.get("text", "") if isinstance(block, dict) else str(block) for block in content
+    )
+
+
+def _usage_line(ai_messages: list) -> str:
+    """Formats the turn's token usage, including prompt-cache hits and writes ("" if the provider reported none)."""
+    from .agent.prompt_cache import cache_usage
+
+    usage = cache_usage(ai_messages)
+    if not usage["input"]:
+        return ""
+    return (
+        f"tokens in {usage['input']:,} (cache hit {usage['cache_read']:,}, "
+        f"miss {usage['input'] - usage['cache_read']:,}, write {usage['cache_write']:,}) · out {usage['output']:,}"
+    )
+
+
+async def _stream_turn(graph, inputs: dict, config: dict):
+    """
+    Runs one turn with graph.astream, rendering LLM tokens, tool calls and
+    tool results as they arrive, then reports time-to-first-token.
+    """
+    from langchain_core.messages import AIMessageChunk
+    from .utils.tracing import TRACER
+
+    start = time.perf_counter()
+    first_token_at = None
+    streamed_ids = set()
+    ai_messages = []
+    line_open = False
+
+    def close_line():
+        nonlocal line_open
+        if line_open:
+            console.out("")
+            line_open = False
+
+    with TRACER.span("turn", "chat", config) as span:
+        async for mode, payload in graph.astream(inputs, config=config, stream_mode=["messages", "updates"]):
+            if mode == "messages":
+                chunk, metadata = payload
+                if not isinstance(chunk, AIMessageChunk) or metadata.get("langgraph_node") != "chat_node":
+                    continue
+                text = _content_text(chunk.content)
+                if not text:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter() - start
+                if not line_open:
+                    console.print("[bold green]Forge:[/bold green] ", end="")
+                    line_open = True
+                streamed_ids.add(chunk.id)
+                console.out(text, end="", highlight=False)
+                continue
+
+            for node, update in payload.items():
+                if not isinstance(update, dict):
+                    continue
+                for msg in update.get("messages", []):
+                    if node == "chat_node":
+                        ai_messages.append(msg)
+                        # Providers that don't stream only show up here, as a whole message.
+                        text = _content_text(msg.content)
+                        if text and msg.id not in streamed_ids:
+                            if first_token_at is None:
+                                first_token_at = time.perf_counter() - start
+                            console.print(f"[bold green]Forge:[/bold green] {escape(text)}")
+                        close_line()
+                        for call in getattr(msg, "tool_calls", []) or []:
+                            console.print(f"[dim]→ {call['name']}({escape(str(call['args']))})[/dim]")
+                    elif node == "tools":
+                        close_line()
+                        preview = " ".join(_content_text(msg.content).split())
+                        if len(preview) > TOOL_RESULT_PREVIEW_LEN:
+                            preview = preview[:TOOL_RESULT_PREVIEW_LEN] + "..."
+                        name = getattr(msg, "name", None) or "tool"
+                        if msg.additional_kwargs.get("cached"):
+                            name += " (cached)"
+                        console.print(f"[dim]← {name}: {escape(preview)}[/dim]")
+
+        if first_token_at is not None:
+            span["ttft_ms"] = round(first_token_at * 1000, 1)
+
+    close_line()
+    total = time.perf_counter() - start
+    ttft = f"{first_token_at:.2f}s" if first_token_at is not None else "n/a"
+    usage = _usage_line(ai_messages)
+    console.print(f"[dim]⏱ first token {ttft} · total {total:.2f}s{' · ' + usage if usage else ''}[/dim]")
+
+
+def _run_chat_repl(thread_id: str | None, stream: bool = True, llm_cache: str | None = None):
     """Helper function to contain the main chat loop."""
     try:
         cfg = ForgeConfig.load()
@@ -63,6 +161,8 @@ def _run_chat_repl(thread_id: str | None):
             "[bold red]Configuration not found. Please run 'forge init' first.[/bold red]"
         )
         raise typer.Exit(1)
+    if llm_cache is not None:
+        cfg.llm_cache = llm_cache
 
     if not thread_id:
         thread_id = str(uuid.uuid4())
@@ -88,41 +188,30 @@ def _run_chat_repl(thread_id: str | None):
             "You can use this ID with the main command to continue this conversation later."
         )
 
-    console.print("[cyan]Type 'exit' or 'quit' to end.[/cyan]")
-
-    with SqliteSaver.from_conn_string(str(ForgeConfig.CONFIG_DB)) as checkpointer:
-        graph = create_graph(cfg.llm, checkpointer)
+    console.print("[cyan]Type 'exit' or 'quit' to end. Ctrl-C cancels the current response.[/cyan]")
 
-        while True:
-            try:
-                user_input = console.input("[bold yellow]You: [/bold yellow]")
-                if user_input.lower() in ["exit", "quit"]:
-                    break
-
-                result = graph.invoke(
-                    {"messages": [HumanMessage(content=user_input)]},
-                    config={"configurable": {"thread_id": thread_id}},
-                )
-
-                agent_response = result["messages"][-1]
-
-                console.print(f"[bold green]Forge:[/bold green] {agent_response.content}")
-                if agent_response.tool_calls:
-                    console.print(f"[dim]Tool Calls: {agent_response.tool_calls}[/dim]")
+    # Apply the retention policies; pages freed here are reused by new checkpoints
+    # (`forge gc` also returns them to the file system). The thread being resumed is never deleted.
+    overrides = {} if cfg.memory_gc_on_start else {"checkpoint_max_age_days": 0, "memory_max_mb": 0}
+    stats = cfg.collect_garbage(vacuum=False, protect=[thread_id], **overrides)
+    if stats.threads:
+        console.print(
+            f"[dim]🧹 Removed {stats.threads:,} idle or oldest conversation thread(s) "
+            f"(checkpoint_max_age_days / memory_max_mb; see `forge gc`).[/dim]"
+        )
 
-            except KeyboardInterrupt:
-                break
+    asyncio.run(_chat_loop(cfg, thread_id, stream))
 
     console.print("\n[cyan]Chat session ended.[/cyan]")
 
     # Post-session cleanup options
-    if typer.confirm("Do you want to clear all conversation memory?"):
+    if _confirm("Do you want to clear all conversation memory?"):
         ForgeConfig.clear_all_memory()
         console.print(
             "[bold green]All conversation memory has been cleared.[/bold green]"
         )
 
-    if typer.confirm(
+    if _confirm(
         "Do you want to delete all Forge data (config and all memory)?"
     ):
         # Explicitly trigger garbage collection to help release the file lock
@@ -132,6 +221,115 @@ def _run_chat_repl(thread_id: str | None):
         console.print("[bold green]All Forge data has been deleted.[/bold green]")
 
 
+def _confirm(question: str) -> bool:
+    """Asks a yes/no question through the shared stdin reader (see utils/terminal.py)."""
+    from .utils.terminal import TERMINAL
+
+    return TERMINAL.ask(f"{question} [y/N]: ").strip().lower() in ("y", "yes")
+
+
+async def _invoke_turn(graph, inputs: dict, config: dict):
+    """Runs one turn with graph.ainvoke and prints the final response."""
+    from langchain_core.messages import HumanMessage
+    from .utils.tracing import TRACER
+
+    with TRACER.span("turn", "chat", config):
+        result = await graph.ainvoke(inputs, config=config)
+
+    agent_response = result["messages"][-1]
+    turn_start = max(
+        (i for i, m in enumerate(result["messages"]) if isinstance(m, HumanMessage)), default=0
+    )
+    ai_messages = [m for m in result["messages"][turn_start:] if m.type == "ai"]
+
+    console.print(f"[bold green]Forge:[/bold green] {agent_response.content}")
+    if agent_response.tool_calls:
+        console.print(f"[dim]Tool Calls: {agent_response.tool_calls}[/dim]")
+    usage = _usage_line(ai_messages)
+    if usage:
+        console.print(f"[dim]{usage}[/dim]")
+
+
+async def _refresh_while_idle():
+    """Keeps the project indexes current in the background while the user types."""
+    from .agent.workflow import refresh_indexes
+
+    try:
+        while await asyncio.to_thread(refresh_indexes):
+            pass
+    except Exception:
+        pass  # indexes also refresh on demand; a failure here must not end the session
+
+
+async def _chat_loop(cfg: ForgeConfig, thread_id: str, stream: bool):
+    """
+    The REPL proper. Each turn runs as a task that Ctrl-C cancels, which also
+    cancels the in-flight model request; Ctrl-C at the prompt ends the session.
+    """
+    # Imported here so that commands which never talk to a model stay fast.
+    from langchain_core.messages import HumanMessage
+    from .agent.workflow import create_graph, settle_cancelled_turn
+    from .agent.tool_runner import with_cancel_event
+    from .tools.python_worker import WORKER_POOL
+    from .utils.checkpointer import DeltaSqliteSaver
+    from .utils.terminal import TERMINAL
+
+    loop = asyncio.get_running_loop()
+    current: asyncio.Task | None = None  # the prompt or turn Ctrl-C cancels
+
+    def cancel_current():
+        if current is not None and not current.done():
+            current.cancel()
+
+    previous_handler = signal.signal(signal.SIGINT, lambda *_: loop.call_soon_threadsafe(cancel_current))
+    try:
+        with DeltaSqliteSaver.from_conn_string(str(ForgeConfig.CONFIG_DB)) as checkpointer:
+            graph = create_graph(cfg.llm, checkpointer, cfg)
+            config = {"configurable": {"thread_id": thread_id}}
+
+            while True:
+                idle = asyncio.create_task(_refresh_while_idle())
+                current = asyncio.create_task(
+                    TERMINAL.aask("[bold yellow]You: [/bold yellow]", console=console, markup=True)
+                )
+                try:
+                    user_input = await current
+                except (asyncio.CancelledError, EOFError):
+                    console.out("")
+                    break
+                finally:
+                    idle.cancel()
+                if user_input.lower() in ["exit", "quit"]:
+                    break
+
+                inputs = {"messages": [HumanMessage(content=user_input)]}
+                turn_config = with_cancel_event(config)
+                current = asyncio.create_task(
+                    _stream_turn(graph, inputs, turn_config) if stream else _invoke_turn(graph, inputs, turn_config)
+                )
+                try:
+                    await current
+                except asyncio.CancelledError:
+                    # Approval prompts of the cancelled turn answer "no" rather than wait for input,
+                    # and code it is running is interrupted (its interpreter state is kept).
+                    TERMINAL.cancel_pending()
+                    WORKER_POOL.interrupt(thread_id)
+                    console.print("\n[yellow]Cancelled.[/yellow]")
+                    await settle_cancelled_turn(graph, turn_config)
+                finally:
+                    current = None
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+
+
+def _check_llm_cache_mode(value: str | None) -> str | None:
+    from .agent.llm_cache import LLM_CACHE_MODES
+
+    if value is not None and value not in LLM_CACHE_MODES:
+        raise typer.BadParameter(f"must be one of: {', '.join(LLM_CACHE_MODES)}.")
+    return value
+
+
 @app.callback()
 def main(
     ctx: typer.Context,
@@ -141,6 +339,17 @@ def main(
         "-t",
         help="Continue a conversation with a specific thread ID.",
     ),
+    no_stream: bool = typer.Option(
+        False,
+        "--no-stream",
+        help="Wait for the full response instead of streaming tokens and tool activity.",
+    ),
+    llm_cache: str = typer.Option(
+        None,
+        "--llm-cache",
+        callback=_check_llm_cache_mode,
+        help="Model response cache for this session: off, cache, record or replay (default: llm_cache).",
+    ),
 ):
     """
     Forge AI Agent CLI.
@@ -148,7 +357,7 @@ def main(
     Run without a subcommand to start the chat REPL.
     """
     if ctx.invoked_subcommand is None:
-        _run_chat_repl(thread_id)
+        _run_chat_repl(thread_id, stream=not no_stream, llm_cache=llm_cache)
 
 
 @app.command()
@@ -159,6 +368,172 @@ def clear_memory():
     ForgeConfig.clear_all_memory()
     console.print('[bold green]🔥 Forge whispers:[/bold green] "All past echoes have been burned away... the slate is clean."')
 
+@app.command("gc")
+def collect_garbage(
+    keep_last: int = typer.Option(None, "--keep-last", help="Checkpoints to keep per thread (default: checkpoint_keep_last)."),
+    max_age_days: float = typer.Option(None, "--max-age-days", help="Delete threads idle for longer than this (default: checkpoint_max_age_days)."),
+    max_mb: int = typer.Option(None, "--max-mb", help="Delete the oldest threads until memory fits in this size (default: memory_max_mb)."),
+    full: bool = typer.Option(False, "--full", help="Run a full VACUUM instead of an incremental one."),
+):
+    """
+    Prune old checkpoints and threads from memory and compact the database.
+    """
+    try:
+        cfg = ForgeConfig.load()
+    except FileNotFoundError:
+        console.print("[bold red]Configuration not found. Please run 'forge init' first.[/bold red]")
+        raise typer.Exit(1)
+
+    start = time.perf_counter()
+    stats = cfg.collect_garbage(
+        full=full, checkpoint_keep_last=keep_last, checkpoint_max_age_days=max_age_days, memory_max_mb=max_mb,
+    )
+    console.print(
+        f"[bold green]🧹 Forge swept the ashes:[/bold green] removed {stats.checkpoints:,} checkpoints, "
+        f"{stats.writes:,} pending writes, {stats.messages:,} stored messages and {stats.threads:,} threads; "
+        f"{stats.size_before / 2**20:.1f} MB → {stats.size_after / 2**20:.1f} MB in {time.perf_counter() - start:.2f}s"
+    )
+
+
+@app.command()
+def batch(
+    tasks_file: typer.FileText = typer.Argument(..., help="JSONL file of tasks: {\"prompt\": ..., \"id\": ..., \"thread_id\": ...} per line ('-' for stdin)."),
+    output: typer.FileTextWrite = typer.Option("-", "--output", "-o", help="Where to write one JSON result per task ('-' for stdout)."),
+    concurrency: int = typer.Option(4, "--concurrency", "-c", min=1, help="Tasks run at the same time."),
+    rpm: float = typer.Option(0, "--rpm", min=0, help="Maximum model requests per minute across all tasks (0: unlimited)."),
+    approval: str = typer.Option("reject", "--approval", help="How approval-gated tools decide: approve, reject, or patch (save changes as patch files)."),
+    patch_dir: str = typer.Option(None, "--patch-dir", help="Where --approval patch writes patches, one folder per task (default: .forge/patches/<run id>)."),
+    timeout: float = typer.Option(0, "--timeout", min=0, help="Seconds before a task is cancelled (0: no limit)."),
+    llm_cache: str = typer.Option(
+        None, "--llm-cache", callback=_check_llm_cache_mode,
+        help="Model response cache for this run: off, cache, record or replay (default: llm_cache).",
+    ),
+):
+    """
+    Run many agent tasks headlessly, each in its own thread, and stream the results as JSONL.
+    """
+    from .tools.tool_utils import APPROVAL_POLICIES
+
+    if approval not in APPROVAL_POLICIES or approval == "prompt":
+        console.print("[bold red]--approval must be one of: approve, reject, patch.[/bold red]")
+        raise typer.Exit(2)
+    try:
+        cfg = ForgeConfig.load()
+    except FileNotFoundError:
+        console.print("[bold red]Configuration not found. Please run 'forge init' first.[/bold red]")
+        raise typer.Exit(1)
+    if llm_cache is not None:
+        cfg.llm_cache = llm_cache
+
+    run_id = uuid.uuid4().hex[:8]
+    if approval == "patch" and patch_dir is None:
+        patch_dir = str(ForgeConfig.CONFIG_DIR / "patches" / run_id)
+    # Progress goes to stderr, so the results can be piped from stdout.
+    progress = Console(stderr=True)
+    progress.print(f"[cyan]Batch {run_id}: concurrency {concurrency}, approval {approval}[/cyan]")
+
+    start = time.perf_counter()
+    results = asyncio.run(_run_batch(cfg, tasks_file, output, run_id, concurrency, rpm, approval, patch_dir, timeout, progress))
+    failed = sum(r.status != "ok" for r in results)
+    progress.print(
+        f"[bold green]Batch {run_id} finished:[/bold green] {len(results) - failed} ok, {failed} failed "
+        f"in {time.perf_counter() - start:.1f}s"
+        + (f"; patches in {patch_dir}" if approval == "patch" else "")
+    )
+    if failed:
+        raise typer.Exit(1)
+
+
+async def _run_batch(cfg, tasks_file, output, run_id, concurrency, rpm, approval, patch_dir, timeout, progress):
+    from .agent.batch import read_tasks, run_batch
+    from .agent.workflow import create_graph
+    from .utils.checkpointer import DeltaSqliteSaver
+
+    llm = cfg.llm
+    if rpm > 0:
+        from langchain_core.rate_limiters import InMemoryRateLimiter
+
+        # A bucket of one spreads requests evenly instead of letting the first ones burst.
+        limiter = InMemoryRateLimiter(requests_per_second=rpm / 60, check_every_n_seconds=0.05, max_bucket_size=1)
+        for model in (llm, cfg.router_llm):
+            if model is not None:
+                model.rate_limiter = limiter
+
+    def report(result):
+        mark = "[green]✓[/green]" if result.status == "ok" else "[red]✗[/red]"
+        detail = f" {escape(result.error)}" if result.error else ""
+        progress.print(f"{mark} {escape(result.id)} [dim]{result.seconds:.1f}s[/dim]{detail}")
+
+    with DeltaSqliteSaver.from_conn_string(str(ForgeConfig.CONFIG_DB)) as checkpointer:
+        graph = create_graph(llm, checkpointer, cfg)
+        return await run_batch(
+            graph, read_tasks(tasks_file, run_id), output,
+            concurrency=concurrency, approval=approval, patch_dir=patch_dir, timeout_s=timeout, on_result=report,
+        )
+
+
+@app.command()
+def stats(
+    thread_id: str = typer.Option(None, "--thread-id", "-t", help="Only include spans from this thread."),
+    since_hours: float = typer.Option(None, "--since-hours", help="Only include spans from the last N hours."),
+    top: int = typer.Option(15, "--top", help="Threads to list, slowest p95 turn first."),
+    as_json: bool = typer.Option(False, "--json", help="Print the aggregates as JSON."),
+):
+    """
+    Summarize traced latency and token usage per span kind, thread and tool.
+    """
+    import json
+    from rich.table import Table
+    from .utils.tracing import load_spans, summarize
+
+    trace_path = ForgeConfig.CONFIG_DIR / "traces.jsonl"
+    cutoff = time.time() - since_hours * 3600 if since_hours else 0
+    spans = (
+        span for span in load_spans(trace_path)
+        if (thread_id is None or span.get("thread_id") == thread_id) and span.get("ts", 0) >= cutoff
+    )
+    summary = summarize(spans)
+    if as_json:
+        typer.echo(json.dumps(summary, indent=2))
+        return
+    if not summary["kinds"]:
+        console.print(f"[yellow]No traces found in {trace_path}. Chat with Forge first.[/yellow]")
+        return
+
+    def table(title: str, key: str, rows: dict, columns: list[str]):
+        t = Table(title=title, title_justify="left")
+        t.add_column(key)
+        for column in columns:
+            t.add_column(column.replace("_", " "), justify="right")
+        for name, row in rows.items():
+            t.add_row(escape(name), *(f"{row[c]:,}" if isinstance(row[c], int) else str(row[c]) for c in columns))
+        console.print(t)
+
+    latency = ["count", "p50_ms", "p95_ms", "total_s"]
+    table("Latency by span", "span", summary["kinds"], latency)
+    threads = sorted(summary["threads"].items(), key=lambda item: item[1]["turns"]["p95_ms"], reverse=True)[:top]
+    table(
+        "Threads", "thread",
+        {
+            name: {
+                "turns": t["turns"]["count"], "turn_p50_ms": t["turns"]["p50_ms"], "turn_p95_ms": t["turns"]["p95_ms"],
+                "llm_p50_ms": t["llm"]["p50_ms"], "llm_p95_ms": t["llm"]["p95_ms"],
+                "input_tokens": t["input_tokens"], "cache_read": t["cache_read"], "output_tokens": t["output_tokens"],
+            }
+            for name, t in threads
+        },
+        ["turns", "turn_p50_ms", "turn_p95_ms", "llm_p50_ms", "llm_p95_ms", "input_tokens", "cache_read", "output_tokens"],
+    )
+    table("Tools", "tool", summary["tools"], latency + ["cache_hits", "errors", "result_tokens", "approval_wait_s"])
+    routing = summary["routing"]
+    if routing:
+        kept, discarded = routing["router_kept"], routing["router_discarded"]
+        console.print(
+            f"Routing: {kept['count']:,} router step(s) kept ({kept['total_s']} s), "
+            f"{discarded['count']:,} discarded and re-asked ({discarded['total_s']} s, {routing['discarded_tokens']:,} tokens)"
+        )
+
+
 @app.command()
 def stop():
     """
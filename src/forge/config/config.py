@@ -1,9 +1,11 @@
 import json
 import time
+import shutil
 import sqlite3
 from pathlib import Path
 
-from .constants import PROVIDER_MAP
+from .constants import DEFAULT_OPTIONS, MEMORY_DEFAULTS
+from .providers import available_providers, get_provider_spec, create_chat_model
 
 class ForgeConfig:
     """
@@ -13,24 +15,56 @@ class ForgeConfig:
     CONFIG_DB = CONFIG_DIR / "memory.db"
     CONFIG_FILE = CONFIG_DIR / "config.json"
 
-    def __init__(self, provider: str, api_key: str, model: str | None = None):
-        if provider not in PROVIDER_MAP:
-            raise ValueError(f"Unknown provider '{provider}'. Valid: {list(PROVIDER_MAP.keys())}")
+    def __init__(self, provider: str, api_key: str, model: str | None = None, **options):
+        if provider not in available_providers():
+            raise ValueError(f"Unknown provider '{provider}'. Valid: {available_providers()}")
 
         self.provider = provider
         self.api_key = api_key
-        self.model = model or PROVIDER_MAP[provider]["default_model"]
-        llm_class = PROVIDER_MAP[provider]["class"]
-        self.llm = llm_class(model=self.model, api_key=self.api_key)
+        self.model = model or get_provider_spec(provider)["default_model"]
+        if not self.model:
+            raise ValueError(f"Provider '{provider}' has no default model. Please pass --model.")
+        self._llm = None
+        self._router_llm = None
+
+        unknown = set(options) - set(DEFAULT_OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown config option(s): {sorted(unknown)}. Valid: {list(DEFAULT_OPTIONS)}")
+        for name, default in DEFAULT_OPTIONS.items():
+            setattr(self, name, options.get(name, default))
 
         ForgeConfig.CONFIG_DIR.mkdir(exist_ok=True)
 
+    @property
+    def llm(self):
+        """The chat model client, imported and built on first access."""
+        if self._llm is None:
+            self._llm = create_chat_model(self.provider, self.model, self.api_key, self.http_options)
+        return self._llm
+
+    @property
+    def router_llm(self):
+        """The model for exploration steps (router_model, same provider), or None if routing is off."""
+        if not self.router_model:
+            return None
+        if self._router_llm is None:
+            self._router_llm = create_chat_model(self.provider, self.router_model, self.api_key, self.http_options)
+        return self._router_llm
+
+    @property
+    def http_options(self):
+        """Connection pool, timeout, retry and concurrency settings for the provider's HTTP clients."""
+        from ..utils.http_pool import HttpOptions
+
+        return HttpOptions.from_config(self)
+
     def save(self):
-        """Save provider, api_key, and model into config.json"""
+        """Save provider, api_key, model, and tunable options into config.json"""
         data = {
             "provider": self.provider,
             "api_key": self.api_key,
             "model": self.model,
+            **{name: getattr(self, name) for name in DEFAULT_OPTIONS},
         }
         with open(ForgeConfig.CONFIG_FILE, "w") as f:
             json.dump(data, f, indent=2)
@@ -46,25 +80,47 @@ class ForgeConfig:
 
     @classmethod
     def clear_all_memory(cls):
-        """Deletes all checkpoints from the database, wiping agent memory."""
+        """Deletes all checkpoints, pending writes and stored messages from the database, wiping agent memory."""
         if not cls.CONFIG_DB.exists():
             return
-        
-        # The table used by SqliteSaver is named 'checkpoints'
-        table_name = "checkpoints"
+
+        # The tables used by SqliteSaver and DeltaSqliteSaver; they are recreated on next use.
         try:
             with sqlite3.connect(cls.CONFIG_DB) as conn:
-                cursor = conn.cursor()
-                cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
+                conn.execute("DROP TABLE IF EXISTS checkpoints")
+                conn.execute("DROP TABLE IF EXISTS writes")
+                conn.execute("DROP TABLE IF EXISTS checkpoint_messages")
                 conn.commit()
+                conn.execute("VACUUM")
         except sqlite3.Error as e:
             print(f"An error occurred while clearing memory: {e}")
 
+    def collect_garbage(self, vacuum: bool = True, full: bool = False, protect=(), **overrides):
+        """
+        Applies the checkpoint retention options to the database (see utils/checkpoint_gc.py).
+
+        `overrides` replace checkpoint_keep_last, checkpoint_max_age_days or memory_max_mb;
+        threads in `protect` are never deleted by age or size.
+        """
+        from ..utils.checkpoint_gc import collect_garbage
+
+        options = {name: getattr(self, name) for name in MEMORY_DEFAULTS}
+        options.update({name: value for name, value in overrides.items() if value is not None})
+        return collect_garbage(
+            self.CONFIG_DB,
+            keep_last=options["checkpoint_keep_last"],
+            max_age_days=options["checkpoint_max_age_days"],
+            max_bytes=options["memory_max_mb"] * 1024 * 1024,
+            vacuum=vacuum,
+            full=full,
+            protect=protect,
+        )
+
 
     @classmethod
     def delete(cls):
         """
-        Delete stored config files, the DB, and the .forge directory itself.
+        Delete stored config files, the DB, any indexes/caches, and the .forge directory itself.
         Assumes any active connection has already been closed by the caller.
         """
         # Delete files first
@@ -84,6 +140,14 @@ class ForgeConfig:
                     else:
                         raise # Re-raise after final attempt
         
+        # Remove anything else Forge keeps here (indexes, caches)
+        if cls.CONFIG_DIR.exists():
+            for path in cls.CONFIG_DIR.iterdir():
+                if path.is_dir():
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    path.unlink(missing_ok=True)
+
         # Now, delete the directory itself
         if cls.CONFIG_DIR.exists():
             try:
@@ -1,18 +1,115 @@
-from langchain_openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_anthropic import ChatAnthropic
-
+# Built-in providers are described by import path only, so that no LLM SDK is
+# imported until the provider is actually selected and its client is needed.
 PROVIDER_MAP = {
     "gemini": {
-        "class": ChatGoogleGenerativeAI,
+        "module": "langchain_google_genai",
+        "class": "ChatGoogleGenerativeAI",
         "default_model": "gemini-2.5-flash",
+        "http_client": "gemini",
     },
     "openai": {
-        "class": ChatOpenAI,
+        "module": "langchain_openai",
+        "class": "ChatOpenAI",
         "default_model": "gpt-4o-mini",
+        "http_client": "openai",
+        "exact_token_count": True,
     },
     "anthropic": {
-        "class": ChatAnthropic,
+        "module": "langchain_anthropic",
+        "class": "ChatAnthropic",
         "default_model": "claude-3-haiku-20240307",
+        "http_client": "anthropic",
+        "chars_per_token": 3.5,
+        "prompt_cache": "anthropic",
     },
-}
\ No newline at end of file
+}
+
+# Entry point group third-party packages can use to register extra providers.
+PROVIDER_ENTRY_POINT_GROUP = "forge.providers"
+
+# Conversation history budgets (see agent/history.py); overridable in config.json.
+HISTORY_DEFAULTS = {
+    "history_max_tokens": 60_000,
+    "history_keep_turns": 4,
+    "history_tool_output_max_tokens": 500,
+    "history_summary_max_tokens": 800,
+}
+
+# Tool execution settings (see agent/tool_runner.py).
+TOOL_DEFAULTS = {
+    "parallel_tool_workers": 8,
+    # Persistent execute_code workers (see tools/python_worker.py); 0 disables a limit.
+    "python_workers_max": 4,
+    "execute_timeout_s": 30,
+    "execute_memory_limit_mb": 0,
+    "execute_cpu_limit_s": 0,
+    # Shared cache of read_file / notebook cell / summarize_dataset results (see agent/tool_cache.py); 0 disables it.
+    "tool_cache_max_mb": 64,
+}
+
+# Automatic retrieval of relevant code chunks (see agent/retrieval.py); top_k 0 disables it.
+RETRIEVAL_DEFAULTS = {
+    "retrieval_top_k": 6,
+    "retrieval_max_tokens": 2_000,
+    "retrieval_refresh_seconds": 1.0,
+}
+
+# Checkpoint retention in .forge/memory.db (see utils/checkpoint_gc.py); 0 disables a policy.
+MEMORY_DEFAULTS = {
+    "checkpoint_keep_last": 20,
+    "checkpoint_max_age_days": 30,
+    "memory_max_mb": 256,
+    # Whether starting the REPL also deletes idle threads and threads beyond memory_max_mb
+    # (it always trims checkpoints to checkpoint_keep_last); `forge gc` applies all three.
+    "memory_gc_on_start": False,
+}
+
+# Model routing (see agent/routing.py): a faster model of the same provider for
+# exploration steps; null sends every step to the main model.
+ROUTING_DEFAULTS = {
+    "router_model": None,
+    "router_max_steps": 8,
+}
+
+# Span tracing to .forge/traces.jsonl (see utils/tracing.py); trace_otel also exports via OpenTelemetry.
+TRACE_DEFAULTS = {
+    "trace_enabled": True,
+    "trace_max_mb": 32,
+    "trace_otel": False,
+}
+
+# Model response cache in .forge/llm_cache.db (see agent/llm_cache.py). Modes: off, cache,
+# record (keep every response for replay) and replay (strict: an unrecorded prompt is an error).
+LLM_CACHE_DEFAULTS = {
+    "llm_cache": "off",
+    "llm_cache_max_mb": 256,
+    "llm_cache_ttl_days": 7,
+    "llm_cache_path": None,
+}
+
+# Provider HTTP connections (see utils/http_pool.py): one keep-alive pool per provider,
+# retries with jittered exponential backoff that honor Retry-After, and a process-wide
+# limit on concurrent requests per provider (0 = unlimited).
+HTTP_DEFAULTS = {
+    "http_timeout_s": 120.0,
+    "http_connect_timeout_s": 10.0,
+    "http_max_connections": 20,
+    "http_max_keepalive": 10,
+    "http_keepalive_s": 60.0,
+    "http_max_retries": 4,
+    "http_backoff_base_s": 0.5,
+    "http_backoff_max_s": 30.0,
+    "provider_max_concurrency": 8,
+}
+
+# Every tunable option ForgeConfig accepts, with its default.
+DEFAULT_OPTIONS = {
+    **HISTORY_DEFAULTS,
+    **TOOL_DEFAULTS,
+    **RETRIEVAL_DEFAULTS,
+    **MEMORY_DEFAULTS,
+    **TRACE_DEFAULTS,
+    **ROUTING_DEFAULTS,
+    **LLM_CACHE_DEFAULTS,
+    **HTTP_DEFAULTS,
+}
@@ -0,0 +1,81 @@
+import importlib
+from importlib.metadata import entry_points
+
+from .constants import PROVIDER_MAP, PROVIDER_ENTRY_POINT_GROUP
+
+
+def _provider_entry_points() -> dict:
+    """Returns the provider entry points registered by installed packages, keyed by name."""
+    try:
+        return {ep.name: ep for ep in entry_points(group=PROVIDER_ENTRY_POINT_GROUP)}
+    except Exception:
+        return {}
+
+
+def available_providers() -> list[str]:
+    """Lists built-in and entry-point providers without importing any of them."""
+    names = list(PROVIDER_MAP.keys())
+    names += [name for name in _provider_entry_points() if name not in PROVIDER_MAP]
+    return names
+
+
+def get_provider_spec(provider: str) -> dict:
+    """
+    Returns the spec for a provider: a dict with "class", "default_model" and
+    "http_client", the style in which its constructor takes HTTP clients
+    (see utils/http_pool.py; None if Forge can't pool its connections).
+
+    Built-in specs keep "class" as an import path string. Entry points may
+    point either at a chat model class or at a dict with the same keys.
+    Only the entry point of the requested provider is loaded.
+    """
+    if provider in PROVIDER_MAP:
+        spec = PROVIDER_MAP[provider]
+        return {
+            "class": f"{spec['module']}:{spec['class']}",
+            "default_model": spec["default_model"],
+            "http_client": spec.get("http_client"),
+        }
+
+    eps = _provider_entry_points()
+    if provider not in eps:
+        raise ValueError(f"Unknown provider '{provider}'. Valid: {available_providers()}")
+
+    target = eps[provider].load()
+    if isinstance(target, dict):
+        return {"class": target["class"], "default_model": target.get("default_model"), "http_client": target.get("http_client")}
+    return {"class": target, "default_model": getattr(target, "default_model", None), "http_client": None}
+
+
+def load_provider_class(provider: str):
+    """Imports and returns the chat model class for a provider."""
+    llm_class = get_provider_spec(provider)["class"]
+    if isinstance(llm_class, str):
+        module_name, _, class_name = llm_class.partition(":")
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError as e:
+            raise ValueError(
+                f"Provider '{provider}' requires the '{module_name}' package: {e}"
+            ) from e
+        llm_class = getattr(module, class_name)
+    return llm_class
+
+
+def create_chat_model(provider: str, model: str, api_key: str, http_options=None):
+    """
+    Builds a provider's chat model. With `http_options` (a utils.http_pool.HttpOptions),
+    its requests go through the provider's shared connection pool, retries and
+    concurrency limit.
+    """
+    llm_class = load_provider_class(provider)
+    if http_options is None:
+        return llm_class(model=model, api_key=api_key)
+
+    from ..utils.http_pool import get_provider_pool, provider_client_kwargs, attach_clients
+
+    style = get_provider_spec(provider)["http_client"]
+    pool = get_provider_pool(provider, http_options)
+    llm = llm_class(model=model, api_key=api_key, **provider_client_kwargs(style, pool))
+    attach_clients(llm, style, pool)
+    return llm
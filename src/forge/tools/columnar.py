@@ -0,0 +1,179 @@
+"""
+Metadata-only profiling of columnar and spreadsheet files.
+
+Parquet row counts and column statistics come from the file footer, Arrow
+IPC/Feather row and null counts from the record batch headers, and Excel
+dimensions from the sheet metadata, so the cost does not grow with the size
+of the data. Only the sample rows are decoded: a few rows of the first row
+group (or batch), projected to at most SAMPLE_MAX_COLUMNS columns.
+
+pyarrow and openpyxl are optional (`pip install forge-ai[data]`) and are
+imported on first use.
+"""
+import os
+from typing import Any
+
+from .dataset_profiler import _infer_type
+
+SAMPLE_MAX_COLUMNS = 50
+PARQUET_EXTENSIONS = (".parquet", ".pq")
+ARROW_EXTENSIONS = (".arrow", ".feather", ".ipc")
+EXCEL_EXTENSIONS = (".xlsx", ".xlsm")
+COLUMNAR_EXTENSIONS = PARQUET_EXTENSIONS + ARROW_EXTENSIONS + EXCEL_EXTENSIONS
+
+
+def _require(module: str, package: str):
+    try:
+        return __import__(module, fromlist=["_"])
+    except ImportError:
+        raise ImportError(
+            f"Reading this format requires '{package}'. Install it with `pip install forge-ai[data]`."
+        ) from None
+
+
+def _column(type_name: str, nulls: int | None = None, low: Any = None, high: Any = None, distinct: int | None = None) -> dict:
+    return {"type": type_name, "nulls": nulls, "min": low, "max": high, "distinct": distinct}
+
+
+def _sample_rows(batch) -> list[dict]:
+    return batch.to_pylist() if batch is not None else []
+
+
+def profile_parquet(file_path: str, sample_size: int = 3) -> dict:
+    """Profiles a Parquet file from its footer: row count, schema and per-column statistics."""
+    pq = _require("pyarrow.parquet", "pyarrow")
+    with pq.ParquetFile(file_path) as pf:
+        meta = pf.metadata
+        schema = pf.schema_arrow
+
+        # Column chunk statistics are per leaf column and per row group; merge them.
+        stats: dict[str, dict] = {}
+        for rg in range(meta.num_row_groups):
+            row_group = meta.row_group(rg)
+            for i in range(row_group.num_columns):
+                chunk = row_group.column(i)
+                entry = stats.setdefault(chunk.path_in_schema, {"nulls": 0, "min": None, "max": None, "complete": True})
+                s = chunk.statistics
+                if s is None:
+                    entry["complete"] = False
+                    continue
+                if s.has_null_count and entry["nulls"] is not None:
+                    entry["nulls"] += s.null_count
+                else:
+                    entry["nulls"] = None
+                if s.has_min_max:
+                    if entry["min"] is None or s.min < entry["min"]:
+                        entry["min"] = s.min
+                    if entry["max"] is None or s.max > entry["max"]:
+                        entry["max"] = s.max
+                else:
+                    entry["complete"] = False
+
+        columns = {}
+        for field in schema:
+            entry = stats.get(field.name)
+            if entry is None:  # nested column: statistics only exist for its leaves
+                columns[field.name] = _column(str(field.type))
+                continue
+            complete = entry["complete"]
+            columns[field.name] = _column(
+                str(field.type),
+                nulls=entry["nulls"] if complete else None,
+                low=entry["min"] if complete else None,
+                high=entry["max"] if complete else None,
+            )
+
+        sample = []
+        if meta.num_row_groups and sample_size:
+            projection = schema.names[:SAMPLE_MAX_COLUMNS]
+            batches = pf.iter_batches(batch_size=sample_size, row_groups=[0], columns=projection)
+            sample = _sample_rows(next(batches, None))[:sample_size]
+
+        return {
+            "rows": meta.num_rows,
+            "columns": columns,
+            "sample": sample,
+            "partial": False,
+            "source": f"Parquet footer ({meta.num_row_groups} row groups, created by {meta.created_by or 'unknown'})",
+        }
+
+
+def profile_arrow(file_path: str, sample_size: int = 3) -> dict:
+    """Profiles an Arrow IPC file (Feather v2) from its record batch headers, memory-mapped."""
+    pa = _require("pyarrow", "pyarrow")
+    with pa.memory_map(file_path, "r") as source:
+        try:
+            reader = pa.ipc.open_file(source)
+        except pa.ArrowInvalid:
+            raise ValueError("Not an Arrow IPC file (Feather v1 and IPC streams are not supported).") from None
+        schema = reader.schema
+        rows = 0
+        nulls = [0] * len(schema)
+        first = None
+        for i in range(reader.num_record_batches):
+            # Batches are zero-copy views into the mapping; lengths and null counts are header fields.
+            batch = reader.get_batch(i)
+            rows += batch.num_rows
+            for j, column in enumerate(batch.columns):
+                nulls[j] += column.null_count
+            if first is None and batch.num_rows:
+                first = batch
+
+        sample = []
+        if first is not None and sample_size:
+            projection = schema.names[:SAMPLE_MAX_COLUMNS]
+            sample = _sample_rows(first.select(projection).slice(0, sample_size))
+
+        return {
+            "rows": rows,
+            "columns": {field.name: _column(str(field.type), nulls=nulls[j]) for j, field in enumerate(schema)},
+            "sample": sample,
+            "partial": False,
+            "source": f"Arrow IPC metadata ({reader.num_record_batches} record batches)",
+        }
+
+
+def profile_excel(file_path: str, sample_size: int = 3) -> dict:
+    """Profiles the first sheet of an Excel workbook from its dimensions and first rows."""
+    openpyxl = _require("openpyxl", "openpyxl")
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        # Without a <dimension> element, counting rows would mean scanning the whole sheet; it stays unknown.
+        known = sheet.max_row is not None
+        width = min(sheet.max_column or SAMPLE_MAX_COLUMNS, SAMPLE_MAX_COLUMNS)
+        rows = sheet.iter_rows(max_row=sample_size + 1, max_col=width, values_only=True)
+        header = next(rows, None) or ()
+        if not known:  # the width is unknown too: drop the empty columns the read padded in
+            header = header[:max((i + 1 for i, h in enumerate(header) if h is not None), default=0)]
+        names = [str(h) if h is not None else f"column_{i + 1}" for i, h in enumerate(header)]
+        sample = [dict(zip(names, row)) for row in rows]
+
+        others = workbook.sheetnames[1:]
+        source = f"sheet '{sheet.title}' dimensions" if known else f"sheet '{sheet.title}' first rows (no dimensions recorded)"
+        if others:
+            source += f"; other sheets: {', '.join(others)}"
+        return {
+            "rows": max(sheet.max_row - 1, 0) if known else None,
+            "columns": {
+                name: _column(_infer_type([r[name] for r in sample if r.get(name) not in (None, "")]) + " (sampled)")
+                for name in names
+            },
+            "sample": sample,
+            "partial": False,
+            "source": source,
+        }
+    finally:
+        workbook.close()
+
+
+def profile_columnar(file_path: str, sample_size: int = 3) -> dict:
+    """Dispatches to the metadata reader for the file's extension."""
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext in PARQUET_EXTENSIONS:
+        return profile_parquet(file_path, sample_size)
+    if ext in ARROW_EXTENSIONS:
+        return profile_arrow(file_path, sample_size)
+    if ext in EXCEL_EXTENSIONS:
+        return profile_excel(file_path, sample_size)
+    raise ValueError(f"Unsupported columnar format '{ext}'.")
@@ -0,0 +1,254 @@
+import json
+import math
+import time
+import random
+from typing import Any, Iterable, Iterator
+
+PROFILE_MAX_SECONDS = 5.0
+RESERVOIR_SIZE = 1000
+BUDGET_CHECK_EVERY = 1024
+JSON_CHUNK_SIZE = 1 << 16
+HLL_PRECISION = 12
+
+
+class HyperLogLog:
+    """A small HyperLogLog sketch for approximate distinct counts (~1.6% error at p=12)."""
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.p = precision
+        self.m = 1 << precision
+        self.registers = bytearray(self.m)
+        self._rest_bits = 64 - precision
+        self._rest_mask = (1 << self._rest_bits) - 1
+
+    def add(self, value: str):
+        h = hash(value) & 0xFFFFFFFFFFFFFFFF
+        index = h >> self._rest_bits
+        rank = self._rest_bits - (h & self._rest_mask).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            estimate = self.m * math.log(self.m / zeros)  # linear counting for small cardinalities
+        return int(round(estimate))
+
+
+def _value_type(value: Any) -> str:
+    """Classifies a single non-null value; strings are parsed the way CSV cells would be."""
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, dict):
+        return "object"
+    if isinstance(value, list):
+        return "list"
+    text = str(value).strip()
+    try:
+        int(text)
+        return "int"
+    except ValueError:
+        pass
+    try:
+        float(text)
+        return "float"
+    except ValueError:
+        pass
+    if text.lower() in ("true", "false"):
+        return "bool"
+    return "string"
+
+
+def _infer_type(values: list) -> str:
+    """Infers a column type from sampled values, widening int to float and mixed types to string."""
+    types = {_value_type(v) for v in values}
+    if not types:
+        return "null"
+    if len(types) == 1:
+        return types.pop()
+    if types <= {"int", "float"}:
+        return "float"
+    return "mixed(" + ", ".join(sorted(types)) + ")"
+
+
+class ColumnProfile:
+    """Running statistics for one column."""
+
+    def __init__(self):
+        self.nulls = 0
+        self.non_null = 0
+        self.numeric = True
+        self.num_min = self.num_max = None
+        self.str_min = self.str_max = None
+        self.distinct = HyperLogLog()
+
+    def add(self, value: Any):
+        if value is None or value == "":
+            self.nulls += 1
+            return
+        self.non_null += 1
+        text = value if isinstance(value, str) else json.dumps(value, sort_keys=True, default=str)
+        self.distinct.add(text)
+
+        if self.numeric and not isinstance(value, (bool, dict, list)):
+            try:
+                number = float(value)
+            except (TypeError, ValueError):
+                self.numeric = False
+            else:
+                if self.num_min is None or number < self.num_min:
+                    self.num_min = number
+                if self.num_max is None or number > self.num_max:
+                    self.num_max = number
+                return
+        elif self.numeric:
+            self.numeric = False
+        if self.str_min is None or text < self.str_min:
+            self.str_min = text
+        if self.str_max is None or text > self.str_max:
+            self.str_max = text
+
+    def summary(self, inferred_type: str) -> dict:
+        if self.numeric and self.num_min is not None:
+            as_int = inferred_type == "int"
+            low, high = (int(self.num_min), int(self.num_max)) if as_int else (self.num_min, self.num_max)
+        else:
+            low, high = self.str_min, self.str_max
+        return {
+            "type": inferred_type,
+            "nulls": self.nulls,
+            "min": low,
+            "max": high,
+            "distinct": min(self.distinct.count(), self.non_null),
+        }
+
+
+def profile_rows(
+    rows: Iterable[dict],
+    columns: list[str] | None = None,
+    sample_size: int = 3,
+    max_rows: int | None = None,
+    max_seconds: float | None = PROFILE_MAX_SECONDS,
+    progress=None,
+) -> dict:
+    """
+    Profiles a stream of rows in a single pass with bounded memory.
+
+    Computes the row count, per-column null counts, min/max and approximate
+    distinct counts, and infers column types from a reservoir sample. Stops
+    early when the row or time budget is spent, marking the result partial.
+
+    Args:
+        rows: Rows as dicts (column -> value).
+        columns: Known column order (e.g. a CSV header); new keys are appended as seen.
+        sample_size: Number of leading rows to return as the sample.
+        max_rows: Stop after this many rows.
+        max_seconds: Stop after roughly this many seconds.
+        progress: Optional callable returning the fraction of the input consumed.
+
+    Returns:
+        A dict with "rows", "columns", "sample", "partial" and, when partial, "progress".
+    """
+    stats: dict[str, ColumnProfile] = {c: ColumnProfile() for c in columns or []}
+    reservoir, sample = [], []
+    deadline = time.monotonic() + max_seconds if max_seconds else None
+    rng = random.Random(0)
+    count = 0
+    partial = False
+
+    for row in rows:
+        if max_rows and count >= max_rows:
+            partial = True  # a row beyond the budget exists
+            break
+        count += 1
+        if len(sample) < sample_size:
+            sample.append(row)
+        if len(reservoir) < RESERVOIR_SIZE:
+            reservoir.append(row)
+        else:
+            j = rng.randrange(count)
+            if j < RESERVOIR_SIZE:
+                reservoir[j] = row
+
+        for key, value in row.items():
+            column = stats.get(key)
+            if column is None:
+                column = stats[key] = ColumnProfile()
+                column.nulls = count - 1  # missing from every earlier row
+            column.add(value)
+        if len(row) < len(stats):
+            for key, column in stats.items():
+                if key not in row:
+                    column.nulls += 1
+
+        if deadline and count % BUDGET_CHECK_EVERY == 0 and time.monotonic() > deadline:
+            partial = True
+            break
+
+    result = {
+        "rows": count,
+        "columns": {
+            name: column.summary(_infer_type([r[name] for r in reservoir if r.get(name) not in (None, "")]))
+            for name, column in stats.items()
+        },
+        "sample": sample,
+        "partial": partial,
+    }
+    if partial and progress is not None:
+        result["progress"] = progress()
+    return result
+
+
+def iter_json_array(f, chunk_size: int = JSON_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Yields the elements of a top-level JSON array without loading the whole file.
+
+    The file must be positioned at (or before whitespace preceding) the '['.
+    """
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+
+    def fill(n: int) -> bool:
+        nonlocal buf, pos, eof
+        more = f.read(n)
+        if not more:
+            eof = True
+            return False
+        buf, pos = buf[pos:] + more, 0
+        return True
+
+    def skip(chars: str) -> bool:
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in chars:
+                pos += 1
+            if pos < len(buf) or not fill(chunk_size):
+                return pos < len(buf)
+
+    if not skip(" \t\r\n") or buf[pos] != "[":
+        raise ValueError("Expected a JSON array.")
+    pos += 1
+    read_size = chunk_size
+    while skip(" \t\r\n,"):
+        if buf[pos] == "]":
+            return
+        try:
+            value, end = decoder.raw_decode(buf, pos)
+            # A value ending exactly at the buffer edge (e.g. a number) may be cut short.
+            if end == len(buf) and not eof:
+                raise json.JSONDecodeError("Possibly truncated", buf, end)
+        except json.JSONDecodeError:
+            if fill(read_size):
+                read_size *= 2  # large elements: grow reads to avoid quadratic re-parsing
+                continue
+            value, end = decoder.raw_decode(buf, pos)  # at EOF: parse what is left, or raise
+        read_size = chunk_size
+        yield value
+        pos = end
+    raise ValueError("Unterminated JSON array.")
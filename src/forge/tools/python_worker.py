@@ -0,0 +1,175 @@
+import os
+import sys
+import json
+import queue
+import atexit
+import signal
+import threading
+import subprocess
+from collections import OrderedDict
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker_main.py")
+
+
+class WorkerTimeout(Exception):
+    """The call exceeded its wall-clock timeout; the worker was killed."""
+
+
+class WorkerCrashed(Exception):
+    """The worker process exited while running a call."""
+
+    def __init__(self, returncode: int | None):
+        self.returncode = returncode
+        reason = f"exit code {returncode}"
+        if returncode is not None and returncode < 0:
+            try:
+                reason = f"killed by {signal.Signals(-returncode).name}"
+            except ValueError:
+                pass
+            if returncode == -getattr(signal, "SIGXCPU", 0):
+                reason += ", CPU limit exceeded"
+        super().__init__(reason)
+
+
+class PythonWorker:
+    """
+    A long-lived Python process that executes code in a persistent namespace.
+
+    The process is started lazily and restarted on the next call after a
+    crash, a timeout or a reset, in which case its state is lost.
+    """
+
+    def __init__(self, memory_limit_mb: int = 0, cpu_limit_s: int = 0):
+        self.memory_limit_mb = memory_limit_mb
+        self.cpu_limit_s = cpu_limit_s
+        self._proc = None
+        self._responses = queue.Queue()
+        self._lock = threading.Lock()
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def _start(self):
+        # A session (process group on Windows) of its own, so a Ctrl-C in the terminal doesn't reach it.
+        isolation = (
+            {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP} if os.name == "nt" else {"start_new_session": True}
+        )
+        self._proc = subprocess.Popen(
+            [sys.executable, "-u", WORKER_SCRIPT, str(self.memory_limit_mb), str(self.cpu_limit_s)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=os.getcwd(),
+            **isolation,
+        )
+        responses = self._responses = queue.Queue()
+
+        def read(stdout):
+            for line in stdout:
+                responses.put(json.loads(line))
+            responses.put(None)  # EOF: the worker exited
+
+        threading.Thread(target=read, args=(self._proc.stdout,), daemon=True).start()
+
+    def run(self, code: str, timeout: float) -> dict:
+        """
+        Executes code in the worker.
+
+        Returns:
+            A dict with "stdout", "stderr" and "duration" (seconds).
+
+        Raises:
+            WorkerTimeout: The call ran longer than `timeout` seconds.
+            WorkerCrashed: The worker exited during the call.
+        """
+        with self._lock:
+            if not self.alive:
+                self._start()
+            try:
+                self._proc.stdin.write(json.dumps({"code": code}).encode("utf-8") + b"\n")
+                self._proc.stdin.flush()
+            except OSError:
+                pass  # the worker died; the reader reports EOF below
+            try:
+                response = self._responses.get(timeout=timeout)
+            except queue.Empty:
+                self.stop()
+                raise WorkerTimeout()
+            if response is None:
+                returncode = self._proc.wait()
+                self._proc = None
+                raise WorkerCrashed(returncode)
+            return response
+
+    def interrupt(self):
+        """
+        Raises KeyboardInterrupt in the code the worker is running, keeping its
+        state; the call returns with the traceback. A no-op while idle, and on
+        Windows, where a worker can't be interrupted without being killed.
+        """
+        proc = self._proc
+        if proc is not None and proc.poll() is None and os.name != "nt":
+            try:
+                os.kill(proc.pid, signal.SIGINT)
+            except OSError:
+                pass
+
+    def stop(self):
+        """Kills the worker process; the next call starts a fresh one."""
+        if self._proc is not None:
+            if self._proc.poll() is None:
+                self._proc.kill()
+            self._proc.wait()
+            self._proc = None
+
+
+class PythonWorkerPool:
+    """Keeps one PythonWorker per conversation thread, evicting the least recently used."""
+
+    def __init__(self, max_workers: int = 4, timeout_s: float = 30, memory_limit_mb: int = 0, cpu_limit_s: int = 0):
+        self._workers: "OrderedDict[str, PythonWorker]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.configure(max_workers, timeout_s, memory_limit_mb, cpu_limit_s)
+
+    def configure(self, max_workers: int, timeout_s: float, memory_limit_mb: int, cpu_limit_s: int):
+        """Updates limits; they apply to workers started afterwards."""
+        self.max_workers = max(max_workers, 1)
+        self.timeout_s = timeout_s
+        self.memory_limit_mb = memory_limit_mb
+        self.cpu_limit_s = cpu_limit_s
+
+    def get(self, key: str) -> PythonWorker:
+        with self._lock:
+            worker = self._workers.get(key)
+            if worker is None:
+                worker = self._workers[key] = PythonWorker(self.memory_limit_mb, self.cpu_limit_s)
+            self._workers.move_to_end(key)
+            while len(self._workers) > self.max_workers:
+                _, evicted = self._workers.popitem(last=False)
+                evicted.stop()
+            return worker
+
+    def interrupt(self, key: str):
+        """Interrupts the code a thread's worker is running, if any."""
+        with self._lock:
+            worker = self._workers.get(key)
+        if worker is not None:
+            worker.interrupt()
+
+    def reset(self, key: str):
+        """Discards the state of a thread's worker."""
+        with self._lock:
+            worker = self._workers.pop(key, None)
+        if worker is not None:
+            worker.stop()
+
+    def shutdown(self):
+        with self._lock:
+            workers, self._workers = list(self._workers.values()), OrderedDict()
+        for worker in workers:
+            worker.stop()
+
+
+WORKER_POOL = PythonWorkerPool()
+atexit.register(WORKER_POOL.shutdown)
@@ -1,14 +1,34 @@
 from rich.console import Console
 from rich.syntax import Syntax
 
+import os
+import re
 import csv
 import json
+import mmap
+import uuid
+import bisect
 import difflib
-from typing import Any, Union
+import itertools
+from array import array
+from collections import OrderedDict
+from typing import Any
+
+from .dataset_profiler import profile_rows, iter_json_array, PROFILE_MAX_SECONDS, JSON_CHUNK_SIZE
+from .columnar import profile_columnar
 
 console = Console()
 
-def _show_diff(old_content: str, new_content: str, filename: str) -> str:
+def _render_diff(diff_text: str, show: bool = True) -> str:
+    """Displays a colorized, unified diff in the terminal."""
+    if not diff_text:
+        return "[Info] No changes detected."
+
+    if show:
+        console.print(Syntax(diff_text, "diff", theme="monokai", line_numbers=True))
+    return diff_text
+
+def _show_diff(old_content: str, new_content: str, filename: str, show: bool = True) -> str:
     """Generates and displays a colorized, unified diff in the terminal."""
     diff = difflib.unified_diff(
         old_content.splitlines(keepends=True),
@@ -16,13 +36,392 @@ def _show_diff(old_content: str, new_content: str, filename: str) -> str:
         fromfile=f"a/{filename}",
         tofile=f"b/{filename}",
     )
-    diff_text = "".join(diff)
+    return _render_diff("".join(diff), show=show)
 
-    if not diff_text:
-        return "[Info] No changes detected."
+# How approval-gated tools decide, set per run in config["configurable"]["approval"]:
+# ask on the terminal, or (for unattended runs) approve, reject, or save the change as a patch.
+APPROVAL_POLICIES = ("prompt", "approve", "reject", "patch")
 
-    console.print(Syntax(diff_text, "diff", theme="monokai", line_numbers=True))
-    return diff_text
+def _approval_policy(config) -> str:
+    return ((config or {}).get("configurable") or {}).get("approval", "prompt")
+
+def _patch_thread_dir(config) -> str:
+    configurable = (config or {}).get("configurable") or {}
+    thread_id = re.sub(r"[^\w.-]+", "_", str(configurable.get("thread_id", "default")))
+    return os.path.join(configurable.get("patch_dir") or "patches", thread_id)
+
+def _patch_name(file_path: str) -> str:
+    return os.path.relpath(file_path).replace(os.sep, "/")
+
+def _patched_path(config, file_path: str | None) -> str | None:
+    """
+    Where a patch run keeps a file as its saved patches leave it (under
+    <patch_dir>/<thread_id>/patched/), or None if no patch touched the file
+    or the run doesn't save patches. Reads and later changes in the thread
+    use this copy, so that its patches build on each other.
+    """
+    if not file_path or _approval_policy(config) != "patch":
+        return None
+    path = os.path.join(_patch_thread_dir(config), "patched", re.sub(r"[^\w.-]+", "_", _patch_name(file_path)))
+    return path if os.path.isfile(path) else None
+
+def _save_patch(config, file_path: str, old_content: str | None, new_content: str) -> str:
+    """
+    Writes a change as a patch that `git apply` accepts, under
+    <patch_dir>/<thread_id>/, numbered in the order the changes were proposed.
+    `old_content` is None for a new file. Returns the patch path.
+
+    `old_content` must be the file as the thread's earlier patches leave it
+    (see _patched_path), so the patches apply in order; the new content
+    becomes the thread's patched copy.
+    """
+    directory = _patch_thread_dir(config)
+    os.makedirs(os.path.join(directory, "patched"), exist_ok=True)
+
+    name = _patch_name(file_path)
+    diff = []
+    for line in difflib.unified_diff(
+        (old_content or "").splitlines(keepends=True),
+        new_content.splitlines(keepends=True),
+        fromfile="/dev/null" if old_content is None else f"a/{name}",
+        tofile=f"b/{name}",
+    ):
+        diff.append(line if line.endswith("\n") else line + "\n\\ No newline at end of file\n")
+
+    safe_name = re.sub(r"[^\w.-]+", "_", name)
+    number = sum(entry.endswith(".patch") for entry in os.listdir(directory)) + 1
+    path = os.path.join(directory, f"{number:03d}-{safe_name}.patch")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("".join(diff))
+    with open(os.path.join(directory, "patched", safe_name), "w", encoding="utf-8", newline="") as f:
+        f.write(new_content)
+    return path
+
+DIFF_CONTEXT_LINES = 3
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+def _locate_edits(content: str, edits: list[dict]) -> list[tuple[int, int, str]]:
+    """
+    Finds where each search/replace edit applies in the current content.
+
+    Every search string must match exactly once; a missing match means the
+    caller's view of the file is stale, and repeated matches are ambiguous.
+
+    Returns:
+        The (start, end, replacement) spans, sorted and non-overlapping.
+    """
+    spans = []
+    for i, edit in enumerate(edits, 1):
+        search, replace = edit["search"], edit["replace"]
+        if not search:
+            raise ValueError(f"Edit {i}: 'search' must not be empty.")
+        start = content.find(search)
+        if start == -1:
+            raise ValueError(f"Edit {i}: search text not found. The file may have changed; re-read it and retry.")
+        if content.find(search, start + 1) != -1:
+            raise ValueError(
+                f"Edit {i}: search text matches {content.count(search)} locations. "
+                "Include more surrounding lines to make it unique."
+            )
+        spans.append((start, start + len(search), replace))
+
+    spans.sort()
+    for (_, prev_end, _), (start, _, _) in zip(spans, spans[1:]):
+        if start < prev_end:
+            raise ValueError("Edits overlap. Merge them into a single search/replace block.")
+    return spans
+
+def _apply_edits(content: str, spans: list[tuple[int, int, str]], filename: str) -> tuple[str, str]:
+    """
+    Applies located edits and builds the approval diff from the edited regions only.
+
+    Returns:
+        The new content and the unified diff of the change.
+    """
+    line_starts = [0] + [m.end() for m in re.finditer("\n", content)]
+    if len(line_starts) > 1 and line_starts[-1] == len(content):
+        line_starts.pop()
+
+    def line_of(offset: int) -> int:
+        return bisect.bisect_right(line_starts, offset) - 1
+
+    # Group edits whose context windows touch, so each group becomes one hunk.
+    groups = []
+    for span in spans:
+        first, last = line_of(span[0]), line_of(max(span[1] - 1, span[0]))
+        if groups and first <= groups[-1][1] + 2 * DIFF_CONTEXT_LINES:
+            groups[-1][1] = max(groups[-1][1], last)
+            groups[-1][2].append(span)
+        else:
+            groups.append([first, last, [span]])
+
+    pieces, hunks, cursor, line_delta = [], [], 0, 0
+    for first, last, group in groups:
+        lo = max(first - DIFF_CONTEXT_LINES, 0)
+        hi = min(last + DIFF_CONTEXT_LINES + 1, len(line_starts))
+        region_start = line_starts[lo]
+        region_end = line_starts[hi] if hi < len(line_starts) else len(content)
+
+        new_region, pos = [], region_start
+        for start, end, replace in group:
+            new_region += [content[pos:start], replace]
+            pos = end
+        new_region.append(content[pos:region_end])
+        new_region = "".join(new_region)
+        old_region = content[region_start:region_end]
+
+        pieces += [content[cursor:region_start], new_region]
+        cursor = region_end
+
+        old_lines = old_region.splitlines(keepends=True)
+        new_lines = new_region.splitlines(keepends=True)
+        for line in difflib.unified_diff(old_lines, new_lines, n=DIFF_CONTEXT_LINES):
+            m = _HUNK_HEADER.match(line)
+            if m:
+                old_len = m[2] if m[2] is not None else "1"
+                new_len = m[4] if m[4] is not None else "1"
+                line = f"@@ -{int(m[1]) + lo},{old_len} +{int(m[3]) + lo + line_delta},{new_len} @@\n"
+            elif line.startswith(("---", "+++")):
+                continue
+            elif not line.endswith("\n"):
+                line += "\n\\ No newline at end of file\n"
+            hunks.append(line)
+        line_delta += len(new_lines) - len(old_lines)
+
+    pieces.append(content[cursor:])
+    diff_text = "".join(hunks)
+    if diff_text:
+        diff_text = f"--- a/{filename}\n+++ b/{filename}\n" + diff_text
+    return "".join(pieces), diff_text
+
+def _parse_unified_patch(patch: str) -> list[tuple[int, list[str], list[str]]]:
+    """
+    Parses a single-file unified diff into (old_start, old_lines, new_lines) hunks.
+
+    Hunk line counts are not trusted; a hunk ends at the next header. Any
+    other line inside a hunk that is not context, a removal or an addition
+    is an error, so no part of a hunk is silently dropped.
+    """
+    hunks = []
+    current = None
+    last_targets = ()
+    lines = patch.rstrip("\n").splitlines(keepends=True)
+    for i, line in enumerate(lines):
+        m = _HUNK_HEADER.match(line)
+        if m:
+            current = (int(m[1]), [], [])
+            hunks.append(current)
+            continue
+        if current is None:
+            continue  # file headers before the first hunk
+        if line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            raise ValueError("Patch touches more than one file; send one patch per file.")
+        if line.startswith("\\"):
+            # "\ No newline at end of file" applies to the previous line.
+            for target in last_targets:
+                target[-1] = target[-1].rstrip("\n")
+            continue
+
+        tag, text = line[:1], line[1:]
+        if line.strip() == "":
+            tag, text = " ", "\n"  # context blank lines often lose their leading space
+        if not text.endswith("\n"):
+            text += "\n"
+        if tag == " ":
+            current[1].append(text)
+            current[2].append(text)
+            last_targets = (current[1], current[2])
+        elif tag == "-":
+            current[1].append(text)
+            last_targets = (current[1],)
+        elif tag == "+":
+            current[2].append(text)
+            last_targets = (current[2],)
+        else:
+            raise ValueError(
+                f"Hunk {len(hunks)}: line {i + 1} ({line.rstrip()[:60]!r}) is not context, a removal or an addition. "
+                "Prefix context lines with a space."
+            )
+
+    if not hunks:
+        raise ValueError("Patch contains no hunks.")
+    return hunks
+
+def _apply_unified_patch(content: str, patch: str) -> str:
+    """
+    Applies a unified diff to the current content.
+
+    Each hunk must match at its stated line, or at exactly one other place
+    after the previous hunk; otherwise the patch is stale or ambiguous.
+    """
+    lines = content.splitlines(keepends=True)
+
+    def matches_at(i: int, old: list[str]) -> bool:
+        window = lines[i:i + len(old)]
+        return len(window) == len(old) and all(a.rstrip("\n") == b.rstrip("\n") for a, b in zip(window, old))
+
+    out, pos = [], 0
+    for n, (old_start, old, new) in enumerate(_parse_unified_patch(patch), 1):
+        expected = max(old_start - 1, 0) if old else old_start
+        if not old:
+            if not pos <= expected <= len(lines):
+                raise ValueError(f"Hunk {n}: insertion point at line {old_start} is out of range.")
+            found = expected
+        elif expected >= pos and matches_at(expected, old):
+            found = expected
+        else:
+            candidates = [i for i in range(pos, len(lines) - len(old) + 1) if matches_at(i, old)]
+            if not candidates:
+                raise ValueError(f"Hunk {n}: context does not match the current file. Re-read the file and regenerate the patch.")
+            if len(candidates) > 1:
+                raise ValueError(f"Hunk {n}: context matches {len(candidates)} locations. Include more context lines.")
+            found = candidates[0]
+        out += lines[pos:found] + new
+        pos = found + len(old)
+
+    out += lines[pos:]
+    return "".join(out)
+
+READ_MAX_BYTES = 100_000
+BINARY_SNIFF_BYTES = 8192
+LINE_INDEX_CHUNK = 1 << 22
+LINE_INDEX_CACHE_SIZE = 16
+
+# Line-start offsets per file, keyed by absolute path and validated by (size, mtime_ns).
+_line_index_cache: "OrderedDict[str, tuple[int, int, array]]" = OrderedDict()
+
+def _line_offsets(path: str, mm: mmap.mmap, size: int, mtime_ns: int) -> array:
+    """Returns the byte offset of the start of every line, building and caching it if needed."""
+    key = os.path.abspath(path)
+    cached = _line_index_cache.get(key)
+    if cached and cached[0] == size and cached[1] == mtime_ns:
+        _line_index_cache.move_to_end(key)
+        return cached[2]
+
+    offsets = array("q", [0])
+    for chunk_start in range(0, size, LINE_INDEX_CHUNK):
+        parts = mm[chunk_start:chunk_start + LINE_INDEX_CHUNK].split(b"\n")
+        # Each newline starts a new line one byte after it; accumulate in C rather than per line in Python.
+        starts = itertools.accumulate(map((1).__add__, map(len, parts[:-1])), initial=chunk_start)
+        next(starts)
+        offsets.extend(starts)
+    if len(offsets) > 1 and offsets[-1] == size:
+        offsets.pop()  # trailing newline does not start another line
+
+    _line_index_cache[key] = (size, mtime_ns, offsets)
+    if len(_line_index_cache) > LINE_INDEX_CACHE_SIZE:
+        _line_index_cache.popitem(last=False)
+    return offsets
+
+def _decode(data: bytes) -> str:
+    """Decodes file bytes the way text-mode reads did: UTF-8, ignoring errors, universal newlines."""
+    return data.decode("utf-8", errors="ignore").replace("\r\n", "\n").replace("\r", "\n")
+
+def _read_range(
+    file_path: str,
+    start_line: int | None = None,
+    end_line: int | None = None,
+    start_byte: int | None = None,
+    end_byte: int | None = None,
+    max_bytes: int = READ_MAX_BYTES,
+    source: str | None = None,
+) -> str:
+    """
+    Reads a window of a file through mmap, bounded by max_bytes.
+
+    A plain read of a file that fits the budget returns the raw content.
+    Anything partial (a range, a truncated read or a binary file) is
+    prefixed with a metadata header so the caller knows how to page.
+    `source` is read in place of file_path (a patched copy) when given.
+    """
+    source = source or file_path
+    st = os.stat(source)
+    size = st.st_size
+    ranged = any(v is not None for v in (start_line, end_line, start_byte, end_byte))
+    if size == 0:
+        return f"[File: {file_path} | 0 lines | 0 bytes]" if ranged else ""
+    max_bytes = max(1, max_bytes)
+
+    with open(source, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if b"\x00" in mm[:BINARY_SNIFF_BYTES]:
+            return f"[Binary file: {file_path} | {size} bytes | content not shown]"
+
+        if not ranged and size <= max_bytes:
+            return _decode(mm[:])
+
+        offsets = _line_offsets(source, mm, size, st.st_mtime_ns)
+        line_count = len(offsets)
+        header = f"[File: {file_path} | {line_count} lines | {size} bytes"
+
+        if start_byte is not None or end_byte is not None:
+            begin = min(max(start_byte or 0, 0), size)
+            end = min(end_byte if end_byte is not None else size, size, begin + max_bytes)
+            end = max(end, begin)
+            note = f"showing bytes {begin}-{end}"
+            if end < (min(end_byte, size) if end_byte is not None else size):
+                note += f"; truncated, continue with start_byte={end}"
+            return f"{header} | {note}]\n{_decode(mm[begin:end])}"
+
+        if start_line is not None and start_line < 0:
+            first = max(line_count + start_line + 1, 1)
+        else:
+            first = min(max(start_line or 1, 1), line_count)
+        last = min(end_line if end_line is not None else line_count, line_count)
+        if last < first:
+            return f"{header} | empty range {first}-{last}]"
+
+        begin = offsets[first - 1]
+        end = offsets[last] if last < line_count else size
+        note = ""
+        if end - begin > max_bytes:
+            # Cut at the last line boundary that fits; fall back to a byte cut for a single huge line.
+            cut_line = bisect.bisect_right(offsets, begin + max_bytes) - 1
+            if cut_line > first - 1:
+                end, last = offsets[cut_line], cut_line
+                note = f"; truncated, continue with start_line={last + 1}"
+            else:
+                end = begin + max_bytes
+                note = f"; line {first} truncated at {max_bytes} bytes, use start_byte={end} to continue"
+        return f"{header} | showing lines {first}-{last}{note}]\n{_decode(mm[begin:end])}"
+
+DEFINITION_SOURCE_MAX_CHARS = 12_000
+
+def _source_lines(file_path: str, start_line: int, end_line: int) -> list[str]:
+    """Returns lines start_line..end_line (1-based, inclusive) of a file, using the cached line index."""
+    try:
+        st = os.stat(file_path)
+        if st.st_size == 0:
+            return []
+        with open(source, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            offsets = _line_offsets(file_path, mm, st.st_size, st.st_mtime_ns)
+            if start_line < 1 or start_line > len(offsets):
+                return []
+            end = offsets[end_line] if end_line < len(offsets) else st.st_size
+            return _decode(mm[offsets[start_line - 1]:end]).splitlines(keepends=True)
+    except (OSError, ValueError):
+        return []
+
+def _format_outline(file_path: str, symbols: list[dict]) -> str:
+    """Formats a file's symbols as an indented outline with line ranges and signatures."""
+    counts = {}
+    for sym in symbols:
+        counts[sym["kind"]] = counts.get(sym["kind"], 0) + 1
+    summary = ", ".join(f"{n} {kind}{'es' if kind.endswith('s') else 's'}" for kind, n in counts.items()) or "no symbols"
+    lines = [f"[outline: {file_path} | {summary}]"]
+
+    imports = [sym for sym in symbols if sym["kind"] == "import" and "." not in sym["qualname"]]
+    if imports:
+        lines.append("imports: " + ", ".join(
+            sym["name"] if sym["target"].endswith(sym["name"]) else f"{sym['name']} ({sym['target']})" for sym in imports
+        ))
+    for sym in symbols:
+        if sym["kind"] == "import":
+            continue
+        depth = sym["qualname"].count(".")
+        span = f"L{sym['line']}" if sym["line"] == sym["end_line"] else f"L{sym['line']}-{sym['end_line']}"
+        label = sym.get("signature") or f"{sym['kind']} {sym['name']}"
+        lines.append(f"{'  ' * depth}{span}  {label}")
+    return "\n".join(lines)
 
 MAX_FIELD_LEN = 100
 MAX_LIST_ITEMS = 5
@@ -38,49 +437,273 @@ def _truncate_value(val: Any) -> Any:
         return {k: _truncate_value(v) for k, v in val.items()}
     return val
 
-def _guess_type(value: Any) -> Union[str, dict, list]:
-    """Helper to infer the data type of a given value."""
-    if value is None or value == "": return "null"
-    if isinstance(value, dict): return {k: _guess_type(v) for k, v in value.items()}
-    if isinstance(value, list): return ["list(empty)" if not value else _guess_type(value[0])]
-    try:
-        int(str(value)); return "int"
-    except (ValueError, TypeError): pass
-    try:
-        float(str(value)); return "float"
-    except (ValueError, TypeError): pass
-    if str(value).lower() in ["true", "false"]: return "bool"
-    return "string"
+def _profile_result(profile: dict, size: int) -> dict:
+    """Shapes a profiler result into the schema/sample/profile dict used by summarize_dataset."""
+    return {
+        "schema": {name: col["type"] for name, col in profile["columns"].items()},
+        "sample": [_truncate_value(row) for row in profile["sample"]],
+        "profile": {**profile, "sample": None, "size": size},
+    }
 
-def _extract_csv_tsv(file_path: str, sep: str) -> dict:
-    """Helper to extract schema and sample rows from a CSV or TSV file."""
+def _extract_csv_tsv(file_path: str, sep: str, max_rows: int | None = None, max_seconds: float | None = PROFILE_MAX_SECONDS) -> dict:
+    """Helper to stream-profile a CSV or TSV file and extract its schema, statistics and sample rows."""
     try:
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-            reader = csv.DictReader(f, delimiter=sep)
-            rows = [_truncate_value(row) for i, row in enumerate(reader) if i < MAX_SAMPLE_ROWS]
-            schema = {}
-            if rows and reader.fieldnames:
-                for col in reader.fieldnames:
-                    values = [row.get(col) for row in rows if row.get(col) not in (None, "")]
-                    schema[col] = _guess_type(values[0]) if values else "unknown"
-            return {"schema": schema, "sample": rows}
+        size = os.path.getsize(file_path)
+        with open(file_path, "r", encoding="utf-8", errors="ignore", newline="") as f:
+            reader = csv.DictReader(f, delimiter=sep, restkey="(extra)")
+            profile = profile_rows(
+                reader,
+                columns=reader.fieldnames or [],
+                sample_size=MAX_SAMPLE_ROWS,
+                max_rows=max_rows,
+                max_seconds=max_seconds,
+                progress=lambda: f.buffer.tell() / size if size else 1.0,
+            )
+        return _profile_result(profile, size)
     except Exception as e:
         return {"error": str(e)}
 
-def _extract_json(file_path: str) -> dict:
-    """Helper to extract schema and sample rows from a JSON or JSONL file."""
-    rows = []
+def _extract_json(file_path: str, max_rows: int | None = None, max_seconds: float | None = PROFILE_MAX_SECONDS) -> dict:
+    """
+    Helper to stream-profile a JSON or JSONL file and extract its schema, statistics and sample rows.
+
+    Top-level arrays are parsed incrementally, NDJSON line by line; only a
+    file holding a single JSON object is loaded whole.
+    """
     try:
+        size = os.path.getsize(file_path)
         with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-            try:
-                data = json.load(f)
-                rows = [_truncate_value(d) for d in (data if isinstance(data, list) else [data])[:MAX_SAMPLE_ROWS]]
-            except json.JSONDecodeError:
+            head = f.read(JSON_CHUNK_SIZE).lstrip()
+            f.seek(0)
+            if head.startswith("["):
+                records = iter_json_array(f)
+            else:
+                first_line = f.readline()
                 f.seek(0)
-                for line in f:
-                    if line.strip() and len(rows) < MAX_SAMPLE_ROWS:
-                        rows.append(_truncate_value(json.loads(line)))
-        schema = _guess_type(rows[0]) if rows else {}
-        return {"schema": schema, "sample": rows}
+                try:
+                    json.loads(first_line)
+                    records = (json.loads(line) for line in f if line.strip())
+                except json.JSONDecodeError:
+                    records = iter([json.load(f)])
+
+            rows = (r if isinstance(r, dict) else {"value": r} for r in records)
+            profile = profile_rows(
+                rows,
+                sample_size=MAX_SAMPLE_ROWS,
+                max_rows=max_rows,
+                max_seconds=max_seconds,
+                progress=lambda: f.buffer.tell() / size if size else 1.0,
+            )
+        return _profile_result(profile, size)
     except Exception as e:
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+def _extract_columnar(file_path: str) -> dict:
+    """Helper to profile a Parquet, Arrow/Feather or Excel file from its metadata."""
+    try:
+        profile = profile_columnar(file_path, sample_size=MAX_SAMPLE_ROWS)
+        return _profile_result(profile, os.path.getsize(file_path))
+    except Exception as e:
+        return {"error": str(e)}
+
+def _format_profile(profile: dict) -> list[str]:
+    """Formats a dataset profile as summary lines: row count, then one line per column."""
+    rows = f"{profile['rows']:,}" if profile["rows"] is not None else "unknown"
+    if profile["partial"]:
+        progress = profile.get("progress")
+        scanned = f"{progress:.1%} of the file" if progress is not None else "part of the file"
+        rows = f"{rows} scanned (partial: stopped at the row/time budget after {scanned})"
+    lines = [f"Rows: {rows}", "Columns:"]
+    for name, col in profile["columns"].items():
+        stats = []
+        if col["nulls"] is not None:
+            stats.append(f"nulls={col['nulls']:,}")
+        if col["distinct"] is not None:
+            stats.append(f"distinct≈{col['distinct']:,}")
+        if col["min"] is not None:
+            stats.append(f"min={_truncate_value(col['min'])}, max={_truncate_value(col['max'])}")
+        lines.append(f"  - {name} (type: {col['type']})" + (": " + ", ".join(stats) if stats else ""))
+    if profile.get("source"):
+        lines.append(f"Statistics from: {profile['source']}")
+    return lines
+
+NOTEBOOK_OUTPUT_MAX_CHARS = 2_000
+NOTEBOOK_PREVIEW_CHARS = 60
+CELL_TYPES = ("code", "markdown", "raw")
+_ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+
+def _load_notebook(file_path: str) -> tuple[dict, str]:
+    """Reads a notebook, returning its JSON and the raw text (for diffs and patches)."""
+    with open(file_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    notebook = json.loads(text)
+    if not isinstance(notebook, dict) or not isinstance(notebook.get("cells"), list):
+        raise ValueError("not an nbformat 4 notebook (no 'cells' list)")
+    return notebook, text
+
+def _notebook_style(notebook: dict, text: str) -> dict:
+    """
+    The JSON style (indentation, key order) of a notebook file, so that a
+    cell edit only changes that cell's lines. Files that match no style get
+    nbformat's own: one-space indent and sorted keys.
+    """
+    match = re.search(r"^\{\s*\n( +)\"", text)
+    indent = len(match.group(1)) if match else 1
+    # A key-sorted file also round-trips unsorted (json.loads keeps the file's
+    # key order), so sorted keys are checked first and win.
+    if _dump_notebook(notebook, {"indent": indent, "sort_keys": True}) == text:
+        return {"indent": indent, "sort_keys": True}
+    sort_keys = _dump_notebook(notebook, {"indent": indent, "sort_keys": False}) != text
+    return {"indent": indent, "sort_keys": sort_keys}
+
+def _dump_notebook(notebook: dict, style: dict) -> str:
+    return json.dumps(notebook, ensure_ascii=False, **style) + "\n"
+
+def _cell_source(cell: dict) -> str:
+    source = cell.get("source", "")
+    return "".join(source) if isinstance(source, list) else str(source)
+
+def _cell_label(index: int, cell: dict) -> str:
+    cell_id = f" id={cell['id']}" if cell.get("id") else ""
+    return f"[{index}] {cell.get('cell_type', '?')}{cell_id}"
+
+def _output_text(output: dict) -> str:
+    """The text of one code cell output; rich (non-text) outputs are described by MIME type and size."""
+    kind = output.get("output_type")
+    if kind == "stream":
+        return _cell_source({"source": output.get("text", "")})
+    if kind == "error":
+        traceback = _ANSI_ESCAPE.sub("", "\n".join(output.get("traceback", [])[-3:]))
+        return f"{output.get('ename', 'Error')}: {output.get('evalue', '')}\n{traceback}".rstrip()
+    data = output.get("data", {})
+    if "text/plain" in data:
+        return _cell_source({"source": data["text/plain"]})
+    return " ".join(f"[{mime} output, {len(_cell_source({'source': value})):,} chars]" for mime, value in data.items())
+
+def _format_cell_list(file_path: str, notebook: dict) -> str:
+    """One line per cell: index, type, id, size, execution count, outputs, and the first line of its source."""
+    cells = notebook["cells"]
+    counts = {t: sum(c.get("cell_type") == t for c in cells) for t in CELL_TYPES}
+    kernel = notebook.get("metadata", {}).get("kernelspec", {}).get("name")
+    lines = [
+        f"{file_path}: {len(cells)} cells ("
+        + ", ".join(f"{n} {t}" for t, n in counts.items() if n)
+        + f"), nbformat {notebook.get('nbformat', '?')}.{notebook.get('nbformat_minor', '?')}"
+        + (f", kernel {kernel}" if kernel else "")
+    ]
+    for index, cell in enumerate(cells):
+        source = _cell_source(cell)
+        info = [f"{len(source.splitlines())} lines", f"{len(source):,} chars"]
+        if cell.get("cell_type") == "code":
+            outputs = cell.get("outputs", [])
+            if cell.get("execution_count") is not None:
+                info.append(f"exec {cell['execution_count']}")
+            if outputs:
+                size = sum(len(json.dumps(o, ensure_ascii=False)) for o in outputs)
+                info.append(f"{len(outputs)} outputs ({size:,} chars)")
+        first_line = next((line.strip() for line in source.splitlines() if line.strip()), "")
+        if len(first_line) > NOTEBOOK_PREVIEW_CHARS:
+            first_line = first_line[:NOTEBOOK_PREVIEW_CHARS] + "…"
+        lines.append(f"{_cell_label(index, cell)}  {', '.join(info)} | {first_line}")
+    return "\n".join(lines)
+
+def _format_cells(
+    notebook: dict, start: int, end: int, include_outputs: bool, max_output_chars: int = NOTEBOOK_OUTPUT_MAX_CHARS
+) -> str:
+    """Cells start..end (inclusive) with a header line each, and optionally their outputs, truncated per cell."""
+    parts = []
+    for index in range(start, end + 1):
+        cell = notebook["cells"][index]
+        parts.append(f"# {_cell_label(index, cell)}\n{_cell_source(cell)}")
+        if include_outputs and cell.get("outputs"):
+            text = "\n".join(_output_text(o) for o in cell["outputs"])
+            if len(text) > max_output_chars:
+                text = text[:max_output_chars] + f"\n… [{len(text) - max_output_chars:,} more chars of output]"
+            parts[-1] += f"\n# [{index}] outputs:\n{text}"
+    return "\n\n".join(parts)
+
+def _render_notebook_cells(cells: list[dict]) -> str:
+    """
+    Cell sources as text, one section per cell, for cell-level diffs. Sections
+    are labeled by type and id rather than index, so that inserting or
+    deleting a cell doesn't show every later cell as changed.
+    """
+    return "".join(
+        f"# {cell.get('cell_type', '?')}" + (f" id={cell['id']}" if cell.get("id") else "") + "\n"
+        + _cell_source(cell).rstrip("\n") + "\n\n"
+        for cell in cells
+    )
+
+def _new_cell(cell_type: str, source: str, with_id: bool) -> dict:
+    cell = {"cell_type": cell_type, "metadata": {}, "source": source.splitlines(keepends=True)}
+    if with_id:
+        cell["id"] = uuid.uuid4().hex[:8]
+    if cell_type == "code":
+        cell["execution_count"] = None
+        cell["outputs"] = []
+    return cell
+
+def _apply_cell_edits(notebook: dict, edits: list[dict]) -> list[dict]:
+    """
+    Applies insert/replace/delete edits to a notebook's cells and returns the new cell list.
+
+    Every edit names its target cell by id or by index in the notebook as it
+    was before any edit, so edits don't shift each other. Inserted cells go
+    before their target, or at the end without one. Replacing a code cell's
+    source clears its outputs, which no longer match it. All edits are
+    validated before any is applied; a problem raises ValueError.
+    """
+    cells = notebook["cells"]
+    ids = {cell["id"]: i for i, cell in enumerate(cells) if cell.get("id")}
+    with_id = bool(ids) or (notebook.get("nbformat", 4), notebook.get("nbformat_minor", 0)) >= (4, 5)
+    inserts: dict[int, list[dict]] = {}
+    changes: dict[int, dict | None] = {}
+    for n, edit in enumerate(edits, 1):
+        action, cell_id, index = edit.get("action"), edit.get("cell_id"), edit.get("index")
+        if cell_id is not None:
+            if cell_id not in ids:
+                raise ValueError(f"edit {n}: no cell with id '{cell_id}'")
+            target = ids[cell_id]
+        elif index is not None:
+            target = index + len(cells) if index < 0 else index
+            if not 0 <= target < len(cells) + (action == "insert"):
+                raise ValueError(f"edit {n}: cell index {index} is out of range (the notebook has {len(cells)} cells)")
+        elif action == "insert":
+            target = len(cells)
+        else:
+            raise ValueError(f"edit {n}: '{action}' needs a cell_id or index")
+
+        if action in ("insert", "replace"):
+            if edit.get("source") is None:
+                raise ValueError(f"edit {n}: '{action}' needs a source")
+            cell_type = edit.get("cell_type") or ("code" if action == "insert" else cells[target].get("cell_type"))
+            if cell_type not in CELL_TYPES:
+                raise ValueError(f"edit {n}: cell_type must be one of {', '.join(CELL_TYPES)}")
+        if action == "insert":
+            inserts.setdefault(target, []).append(_new_cell(cell_type, edit["source"], with_id))
+            continue
+        if action not in ("replace", "delete"):
+            raise ValueError(f"edit {n}: action must be insert, replace or delete")
+        if target in changes:
+            raise ValueError(f"edit {n}: cell {_cell_label(target, cells[target])} is already changed by another edit")
+        if action == "delete":
+            changes[target] = None
+            continue
+        cell = dict(cells[target])
+        if cell_type != cell.get("cell_type") or edit["source"] != _cell_source(cell):
+            replacement = _new_cell(cell_type, edit["source"], with_id=False)
+            for key in ("id", "metadata", "attachments"):
+                if key in cell and not (key == "attachments" and cell_type == "code"):
+                    replacement[key] = cell[key]
+            cell = replacement
+        changes[target] = cell
+
+    new_cells = []
+    for i, cell in enumerate(cells):
+        new_cells.extend(inserts.get(i, []))
+        if i not in changes:
+            new_cells.append(cell)
+        elif changes[i] is not None:
+            new_cells.append(changes[i])
+    new_cells.extend(inserts.get(len(cells), []))
+    return new_cells
@@ -1,69 +1,312 @@
 from langchain_core.tools import tool
+from langchain_core.runnables import RunnableConfig
+from pydantic import BaseModel, Field
+from typing import Literal
 from rich.console import Console
 from rich.panel import Panel
 
 import os
-import sys
+import re
 import json
-import subprocess
 
-from .tool_utils import _show_diff, _extract_csv_tsv, _extract_json
+from .tool_utils import (
+    _show_diff, _render_diff, _locate_edits, _apply_edits, _apply_unified_patch,
+    _extract_csv_tsv, _extract_json, _extract_columnar, _format_profile, _read_range, READ_MAX_BYTES,
+    _source_lines, _format_outline, DEFINITION_SOURCE_MAX_CHARS, _approval_policy, _save_patch, _patched_path,
+    _load_notebook, _notebook_style, _dump_notebook, _format_cell_list, _format_cells, _render_notebook_cells, _apply_cell_edits,
+    NOTEBOOK_OUTPUT_MAX_CHARS,
+)
+from .dataset_profiler import PROFILE_MAX_SECONDS
+from .columnar import COLUMNAR_EXTENSIONS
+from .python_worker import WORKER_POOL, WorkerTimeout, WorkerCrashed
+from ..utils.code_search import get_search_index
+from ..utils.symbol_index import get_symbol_index
+from ..utils.terminal import TERMINAL
+from ..utils.tracing import TRACER
 
 @tool
-def read_file(file_path: str) -> str:
-    """Reads and returns the entire content of a specified text file.
+def read_file(
+    file_path: str,
+    start_line: int | None = None,
+    end_line: int | None = None,
+    start_byte: int | None = None,
+    end_byte: int | None = None,
+    max_bytes: int = READ_MAX_BYTES,
+    config: RunnableConfig = None,
+) -> str:
+    """Reads a text file, either whole or as a window of lines or bytes.
+
+    Files that fit within max_bytes are returned as-is when no range is given.
+    Larger files, ranged reads and binary files are returned with a metadata
+    header (line count, size, the range shown and how to continue), so large
+    files can be paged instead of read in one go.
 
     Args:
         file_path: The path to the file to read.
+        start_line: First line to return (1-based). Negative values count from the end, e.g. -50 for the last 50 lines.
+        end_line: Last line to return (inclusive). Defaults to the end of the file.
+        start_byte: Byte offset to start from, instead of a line range.
+        end_byte: Byte offset to stop at (exclusive).
+        max_bytes: Maximum number of bytes to return.
 
     Returns:
-        The content of the file as a string, or an error message if the file cannot be read.
+        The requested content as a string, or an error message if the file cannot be read.
     """
     try:
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-            return f.read()
+        source = _patched_path(config, file_path)
+        return _read_range(file_path, start_line, end_line, start_byte, end_byte, max_bytes, source=source)
     except Exception as e:
         return f"[ToolError: Error reading file '{file_path}': {e}]"
 
 
 @tool
-def propose_changes(file_path: str, new_content: str) -> str:
+def search_code(
+    query: str,
+    regex: bool = False,
+    case_sensitive: bool = True,
+    path_glob: str | None = None,
+    max_results: int = 50,
+) -> str:
+    """Searches the project's text files for a literal string or regular expression.
+
+    Uses a persistent trigram index in .forge/ that is updated incrementally,
+    so only files that can contain the query are scanned. Results are
+    file:line snippets, with files containing matching definitions
+    (def/class/function/...) ranked first.
+
+    Args:
+        query: The text or Python regular expression to search for.
+        regex: Treat the query as a regular expression instead of a literal.
+        case_sensitive: Match case exactly.
+        path_glob: Only search files whose path or name matches this glob, e.g. "*.py" or "src/*".
+        max_results: Maximum number of matching lines to return.
+
+    Returns:
+        A header with match counts followed by one "path:line: text" line per match,
+        or an error message if the query is invalid.
+    """
+    if not query:
+        return "[ToolError: The query must not be empty.]"
+    try:
+        result = get_search_index(".").search(query, regex, case_sensitive, path_glob, max_results)
+    except re.error as e:
+        return f"[ToolError: Invalid regular expression '{query}': {e}]"
+    except Exception as e:
+        return f"[ToolError: Search failed: {e}]"
+
+    at_least = "" if result.complete else "at least "
+    lines = [
+        f"[search_code: {at_least}{result.total_matches} matches in {result.files_matched} files "
+        f"| {result.candidates} of {result.files_indexed} files scanned | {result.elapsed * 1000:.0f} ms]"
+    ]
+    lines.extend(f"{m.path}:{m.line}: {m.text}" for m in result.matches)
+    hidden = result.total_matches - len(result.matches)
+    if hidden > 0 or not result.complete:
+        lines.append(f"[{at_least}{hidden} more matches not shown; narrow the query or use path_glob]")
+    elif not result.matches:
+        lines.append("No matches.")
+    return "\n".join(lines)
+
+
+@tool
+def find_definition(symbol: str, kind: str | None = None, include_source: bool = True, max_results: int = 10) -> str:
+    """Finds where a class, function, method or module-level variable is defined.
+
+    Looks the name up in a symbol index built from the project's syntax trees
+    (Python), so the agent can fetch exactly the definition it needs instead
+    of reading whole modules.
+
+    Args:
+        symbol: A name ("save") or dotted qualified name ("ForgeConfig.save").
+        kind: Only return definitions of this kind: "class", "function", "method", "variable" or "import".
+        include_source: Include the source of each definition (within a size budget).
+        max_results: Maximum number of definitions to return.
+
+    Returns:
+        One "path:start-end kind qualname" entry per definition with its signature and,
+        optionally, its source; or a message if nothing was found.
+    """
+    try:
+        matches = get_symbol_index(".").find_definitions(symbol, kind)
+    except Exception as e:
+        return f"[ToolError: Symbol lookup failed: {e}]"
+    if not matches:
+        return f"No definition of '{symbol}' found. Try search_code for a text search."
+
+    lines = [f"[find_definition: '{symbol}' | {len(matches)} definitions]"]
+    budget = DEFINITION_SOURCE_MAX_CHARS
+    for path, sym in matches[:max_results]:
+        lines.append(f"{path}:{sym['line']}-{sym['end_line']}  {sym['kind']} {sym['qualname']}")
+        if not (include_source and budget > 0):
+            if sym.get("signature"):
+                lines.append(f"    {sym['signature']}")
+        else:
+            source = "".join(_source_lines(path, sym["line"], sym["end_line"]))
+            if len(source) > budget:
+                source = source[:budget] + f"\n[... truncated; read_file('{path}', start_line={sym['line']}, end_line={sym['end_line']})]\n"
+            budget -= len(source)
+            lines.append(source.rstrip("\n"))
+    if len(matches) > max_results:
+        lines.append(f"[{len(matches) - max_results} more definitions not shown; use a qualified name or kind]")
+    return "\n".join(lines)
+
+
+@tool
+def find_references(symbol: str, max_results: int = 100) -> str:
+    """Finds the call sites, imports and other uses of a name across the project.
+
+    Uses the symbol index, so matches are real identifiers (not text inside
+    strings or comments). Only the last part of a dotted name is matched, so
+    "ForgeConfig.save" finds every ".save" usage.
+
+    Args:
+        symbol: The name to look up, e.g. "create_graph" or "ForgeConfig.save".
+        max_results: Maximum number of references to return.
+
+    Returns:
+        One "path:line [kind] text" line per reference, where kind is call, import or use.
+    """
+    try:
+        refs = get_symbol_index(".").find_references(symbol)
+    except Exception as e:
+        return f"[ToolError: Symbol lookup failed: {e}]"
+    if not refs:
+        return f"No references to '{symbol}' found."
+
+    files = len({path for path, _ in refs})
+    lines = [f"[find_references: '{symbol}' | {len(refs)} references in {files} files]"]
+    for path, ref in refs[:max_results]:
+        text = "".join(_source_lines(path, ref["line"], ref["line"])).strip()
+        lines.append(f"{path}:{ref['line']} [{ref['kind']}] {text[:200]}")
+    if len(refs) > max_results:
+        lines.append(f"[{len(refs) - max_results} more references not shown]")
+    return "\n".join(lines)
+
+
+@tool
+def outline_file(file_path: str) -> str:
+    """Lists the classes, functions, methods, module-level variables and imports of a source file.
+
+    Each entry has its line range and signature, so a follow-up read_file call
+    can request just the lines it needs.
+
+    Args:
+        file_path: The path to the source file (Python).
+
+    Returns:
+        The file's outline, indented by nesting, or an error message if the file cannot be outlined.
+    """
+    if not os.path.exists(file_path):
+        return f"[ToolError: The file '{file_path}' was not found.]"
+    try:
+        data = get_symbol_index(".").outline(file_path)
+    except Exception as e:
+        return f"[ToolError: Could not outline '{file_path}': {e}]"
+    if data is None:
+        return f"[ToolError: No symbol parser for '{file_path}', or the file is outside the project or ignored.]"
+    if data.get("error"):
+        return f"[ToolError: Could not parse '{file_path}': {data['error']}]"
+    return _format_outline(file_path, data["symbols"])
+
+
+class SearchReplace(BaseModel):
+    """A single search/replace edit for propose_changes."""
+    search: str = Field(description="Exact text currently in the file. Must match exactly once.")
+    replace: str = Field(description="Text to put in its place.")
+
+
+@tool
+def propose_changes(
+    file_path: str,
+    new_content: str | None = None,
+    edits: list[SearchReplace] | None = None,
+    patch: str | None = None,
+    config: RunnableConfig = None,
+) -> str:
     """Proposes changes to a file by showing a diff and asking for user approval.
 
-    This function first reads the existing content of the file (if it exists),
-    then generates a colorized diff between the original and new content.
-    If the directory for the file doesn't exist, it will be created upon approval.
-    Changes are only written to the file if the user approves.
+    The change is given in exactly one of three forms:
+    - edits: search/replace blocks applied to the current file (preferred for existing files).
+    - patch: a unified diff of the current file.
+    - new_content: the complete new file (for new files or full rewrites).
+
+    Edits and patches are validated against the current file first; a search
+    text or hunk context that is missing (stale) or matches more than once
+    (ambiguous) is rejected without prompting. The approval diff is built from
+    the edit as applied. If the directory for the file doesn't exist, it will be
+    created upon approval. Changes are only written if the user approves.
+    In unattended runs an approval policy decides instead of the user, and
+    may save the change as a patch file rather than apply it.
 
     Args:
         file_path: The path to the file to propose changes for.
-        new_content: The new content to write to the file if approved.
+        new_content: The complete new content of the file.
+        edits: Search/replace blocks, each matching exactly one location in the current file.
+        patch: A unified diff (with @@ hunk headers) against the current file.
 
     Returns:
         A string indicating the outcome:
         - "changes applied to {file_path}": The change was approved and written.
         - "changes rejected by user": The user did not approve the change.
+        - "changes saved as patch {path}, not applied": The run saves changes as patches.
         - "[Info] No changes detected.": The new content is identical to the original.
-        - "[ToolError: ...]": An error occurred during file reading or writing.
+        - "[ToolError: ...]": The edit did not apply, or an error occurred during file reading or writing.
     """
+    if sum(arg is not None for arg in (new_content, edits, patch)) != 1:
+        return "[ToolError: Provide exactly one of 'new_content', 'edits' or 'patch'.]"
+
     original_content = ""
-    if os.path.exists(file_path):
+    original_stat = None
+    # In a patch run, the file as this thread's earlier patches leave it.
+    source = _patched_path(config, file_path) or file_path
+    if os.path.exists(source):
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
+            original_stat = os.stat(source)
+            with open(source, "r", encoding="utf-8") as f:
                 original_content = f.read()
         except Exception as e:
             return f"[ToolError: Could not read '{file_path}': {e}]"
+    elif edits is not None:
+        return f"[ToolError: '{file_path}' does not exist. Use new_content to create it.]"
 
-    diff_result = _show_diff(original_content, new_content, filename=file_path)
+    policy = _approval_policy(config)
+    show = policy == "prompt"
+    try:
+        if edits is not None:
+            spans = _locate_edits(original_content, [e if isinstance(e, dict) else e.model_dump() for e in edits])
+            new_content, diff_text = _apply_edits(original_content, spans, filename=file_path)
+            diff_result = _render_diff(diff_text, show=show)
+        elif patch is not None:
+            new_content = _apply_unified_patch(original_content, patch)
+            # Shown from the result, not the raw patch, so the diff is exactly what gets written.
+            diff_result = _show_diff(original_content, new_content, filename=file_path, show=show)
+        else:
+            diff_result = _show_diff(original_content, new_content, filename=file_path, show=show)
+    except ValueError as e:
+        return f"[ToolError: Could not apply changes to '{file_path}': {e}]"
 
     if "[Info] No changes detected." in diff_result:
         return diff_result
 
-    # Ask user for approval (interactive)
-    choice = input(f"\nApply changes to {file_path}? [y/N]: ").strip().lower()
+    if policy == "patch":
+        try:
+            path = _save_patch(config, file_path, original_content if original_stat is not None else None, new_content)
+        except Exception as e:
+            return f"[ToolError: Failed to save patch: {e}]"
+        return f"changes saved as patch {path}, not applied"
+    if policy == "prompt":
+        # Ask user for approval (interactive)
+        with TRACER.span("approval", "propose_changes", config):
+            choice = TERMINAL.ask(f"\nApply changes to {file_path}? [y/N]: ").strip().lower()
+    else:
+        choice = "y" if policy == "approve" else "n"
 
     if choice in ("y", "yes"):
         try:
+            if original_stat is not None:
+                current_stat = os.stat(file_path)
+                if (current_stat.st_mtime_ns, current_stat.st_size) != (original_stat.st_mtime_ns, original_stat.st_size):
+                    return f"[ToolError: '{file_path}' changed while awaiting approval. Re-read it and retry.]"
             parent_dir = os.path.dirname(file_path)
             if parent_dir:
                 os.makedirs(parent_dir, exist_ok=True)
@@ -76,40 +319,164 @@ def propose_changes(file_path: str, new_content: str) -> str:
         return "changes rejected by user"
 
 @tool
-def read_notebook_cells(file_path: str) -> str:
-    """Reads a Jupyter Notebook (.ipynb) and extracts all cell sources into a single string.
+def list_notebook_cells(file_path: str, config: RunnableConfig = None) -> str:
+    """Lists the cells of a Jupyter Notebook (.ipynb) without their contents.
 
-    Each cell's source content is joined, and then all cell contents are
-    joined by a separator string ("\\n\\n---\\n\\n").
+    One line per cell gives its index, type, id, size in lines and characters,
+    execution count, number and size of outputs, and the first line of its
+    source, so large notebooks can be navigated without reading every cell.
 
     Args:
         file_path: The path to the Jupyter Notebook file.
 
     Returns:
-        A single string containing the concatenated source code of all cells,
-        or an error message if the notebook cannot be read or parsed.
+        A notebook summary line followed by one line per cell, or an error message
+        if the notebook cannot be read or parsed.
     """
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            notebook = json.load(f)
-        content = ["".join(cell["source"]) for cell in notebook.get("cells", []) if "source" in cell]
-        return "\n\n---\n\n".join(content)
+        notebook, _ = _load_notebook(_patched_path(config, file_path) or file_path)
+        return _format_cell_list(file_path, notebook)
     except Exception as e:
         return f"[ToolError: Error reading notebook '{file_path}': {e}]"
 
 @tool
-def summarize_dataset(file_path: str) -> str:
-    """Inspects a data file (.csv, .tsv, .json, .ndjson) and provides a summary.
+def read_notebook_cells(
+    file_path: str,
+    start_cell: int = 0,
+    end_cell: int | None = None,
+    include_outputs: bool = False,
+    max_output_chars: int = NOTEBOOK_OUTPUT_MAX_CHARS,
+    config: RunnableConfig = None,
+) -> str:
+    """Reads a range of cells from a Jupyter Notebook (.ipynb).
+
+    Each cell starts with a header line giving its index, type and id (the
+    handles edit_notebook_cells takes), followed by its source. Outputs are
+    left out unless include_outputs is set; then text outputs, errors and
+    descriptions of rich outputs follow each code cell, truncated per cell.
 
-    The summary includes the file name, inferred schema, and a few sample rows.
-    Supports CSV, TSV, JSON, and NDJSON formats.
+    Args:
+        file_path: The path to the Jupyter Notebook file.
+        start_cell: Index of the first cell to return (0-based). Negative values count from the end.
+        end_cell: Index of the last cell to return (inclusive). Defaults to the last cell.
+        include_outputs: Whether to include code cell outputs.
+        max_output_chars: Maximum characters of output shown per cell.
+
+    Returns:
+        The requested cells as text, or an error message if the notebook cannot be read or parsed.
+    """
+    try:
+        notebook, _ = _load_notebook(_patched_path(config, file_path) or file_path)
+    except Exception as e:
+        return f"[ToolError: Error reading notebook '{file_path}': {e}]"
+    count = len(notebook["cells"])
+    if count == 0:
+        return f"[Info] '{file_path}' has no cells."
+    start = start_cell + count if start_cell < 0 else start_cell
+    end = count - 1 if end_cell is None else (end_cell + count if end_cell < 0 else min(end_cell, count - 1))
+    if not 0 <= start <= end:
+        shown = f"{start_cell}..{'end' if end_cell is None else end_cell}"
+        return f"[ToolError: Cell range {shown} is empty or out of range (the notebook has {count} cells).]"
+    return _format_cells(notebook, start, end, include_outputs, max_output_chars)
+
+class CellEdit(BaseModel):
+    """A single cell edit for edit_notebook_cells."""
+    action: Literal["insert", "replace", "delete"] = Field(description="What to do with the target cell.")
+    cell_id: str | None = Field(None, description="Id of the target cell (preferred when the notebook has ids).")
+    index: int | None = Field(None, description="Index of the target cell in the notebook before any edit, if it has no id.")
+    source: str | None = Field(None, description="The full new source of the cell (insert and replace).")
+    cell_type: Literal["code", "markdown", "raw"] | None = Field(
+        None, description="Type of the cell; defaults to code for inserts and to the current type for replacements."
+    )
+
+@tool
+def edit_notebook_cells(file_path: str, edits: list[CellEdit], config: RunnableConfig = None) -> str:
+    """Inserts, replaces or deletes individual cells of an existing Jupyter Notebook after user approval.
+
+    Edits target cells by id or by index in the notebook as it is now, so
+    several edits in one call don't shift each other. An inserted cell goes
+    before its target, or at the end of the notebook when no target is given.
+    Replacing a code cell clears its outputs. The approval diff shows only the
+    changed cells; the notebook is updated in place and every other cell,
+    including outputs and metadata, is kept as it is.
+
+    Args:
+        file_path: The path to the .ipynb file.
+        edits: The cell edits to apply.
+
+    Returns:
+        A string indicating the outcome:
+        - "notebook changes applied to {file_path}": The change was approved and written.
+        - "notebook changes rejected by user": The user did not approve the change.
+        - "notebook changes saved as patch {path}, not applied": The run saves changes as patches.
+        - "[Info] No changes detected.": The edits leave the notebook as it is.
+        - "[ToolError: ...]": The edits did not apply, or the notebook could not be read or written.
+    """
+    if not file_path.endswith(".ipynb"):
+        return "[ToolError: file_path must end with .ipynb]"
+    source = _patched_path(config, file_path) or file_path
+    if not os.path.exists(source):
+        return f"[ToolError: '{file_path}' does not exist. Use write_notebook to create it.]"
+    try:
+        original_stat = os.stat(source)
+        notebook, original_text = _load_notebook(source)
+    except Exception as e:
+        return f"[ToolError: Error reading notebook '{file_path}': {e}]"
+
+    try:
+        new_cells = _apply_cell_edits(notebook, [e if isinstance(e, dict) else e.model_dump() for e in edits])
+    except ValueError as e:
+        return f"[ToolError: Could not apply cell edits to '{file_path}': {e}]"
+    if new_cells == notebook["cells"]:
+        return "[Info] No changes detected."
+    new_text = _dump_notebook({**notebook, "cells": new_cells}, _notebook_style(notebook, original_text))
+
+    policy = _approval_policy(config)
+    if policy == "patch":
+        try:
+            path = _save_patch(config, file_path, original_text, new_text)
+        except Exception as e:
+            return f"[ToolError: Failed to save patch: {e}]"
+        return f"notebook changes saved as patch {path}, not applied"
+    if policy == "prompt":
+        _show_diff(_render_notebook_cells(notebook["cells"]), _render_notebook_cells(new_cells), filename=file_path)
+        with TRACER.span("approval", "edit_notebook_cells", config):
+            choice = TERMINAL.ask(f"\nApply cell changes to {file_path}? [y/N]: ").strip().lower()
+    else:
+        choice = "y" if policy == "approve" else "n"
+    if choice not in ("y", "yes"):
+        return "notebook changes rejected by user"
+
+    try:
+        current_stat = os.stat(file_path)
+        if (current_stat.st_mtime_ns, current_stat.st_size) != (original_stat.st_mtime_ns, original_stat.st_size):
+            return f"[ToolError: '{file_path}' changed while awaiting approval. Re-read it and retry.]"
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(new_text)
+        return f"notebook changes applied to {file_path}"
+    except Exception as e:
+        return f"[ToolError: Failed to write notebook: {e}]"
+
+@tool
+def summarize_dataset(file_path: str, max_rows: int | None = None, max_seconds: float = PROFILE_MAX_SECONDS) -> str:
+    """Inspects a data file (.csv, .tsv, .json, .ndjson, .parquet, .arrow, .feather, .xlsx) and provides a summary.
+
+    Text formats are profiled in a single streaming pass with bounded memory.
+    The summary includes the file name, row count, inferred schema, per-column
+    null counts, min/max and approximate distinct counts, and a few sample rows.
+    On large files the pass stops at the row or time budget and the statistics
+    are marked partial. Parquet, Arrow IPC/Feather and Excel files are
+    summarized from their metadata without scanning the data (requires the
+    optional pyarrow/openpyxl dependencies).
 
     Args:
         file_path: The path to the data file to summarize.
+        max_rows: Stop profiling after this many rows (default: no limit). Text formats only.
+        max_seconds: Stop profiling after roughly this many seconds. Text formats only.
 
     Returns:
-        A multi-line string containing the summary of the dataset, including schema
-        and sample rows. Returns an error message if the file is not found,
+        A multi-line string containing the summary of the dataset, including schema,
+        column statistics and sample rows. Returns an error message if the file is not found,
         the format is unsupported, or an error occurs during processing.
     """
     if not os.path.exists(file_path):
@@ -117,20 +484,17 @@ def summarize_dataset(file_path: str) -> str:
 
     ext = os.path.splitext(file_path)[1].lower()
     info = {}
-    if ext == ".csv": info = _extract_csv_tsv(file_path, sep=",")
-    elif ext == ".tsv": info = _extract_csv_tsv(file_path, sep="\t")
-    elif ext in [".json", ".ndjson"]: info = _extract_json(file_path)
+    if ext == ".csv": info = _extract_csv_tsv(file_path, sep=",", max_rows=max_rows, max_seconds=max_seconds)
+    elif ext == ".tsv": info = _extract_csv_tsv(file_path, sep="\t", max_rows=max_rows, max_seconds=max_seconds)
+    elif ext in [".json", ".ndjson", ".jsonl"]: info = _extract_json(file_path, max_rows=max_rows, max_seconds=max_seconds)
+    elif ext in COLUMNAR_EXTENSIONS: info = _extract_columnar(file_path)
     else: return f"[ToolError: Unsupported file format '{ext}'.]"
 
     if "error" in info:
         return f"[ToolError: Could not process '{file_path}': {info['error']}]"
 
-    lines = [f"File: {os.path.basename(file_path)}"]
-    schema = info.get("schema", {})
-    if isinstance(schema, dict):
-        lines.append(f"Schema: {', '.join(f'{k} (type: {v})' for k, v in schema.items())}")
-    else:
-        lines.append(f"Schema: {json.dumps(schema)}")
+    lines = [f"File: {os.path.basename(file_path)} ({info['profile']['size']} bytes)"]
+    lines.extend(_format_profile(info["profile"]))
 
     sample_rows = info.get("sample", [])
     if sample_rows:
@@ -140,17 +504,29 @@ def summarize_dataset(file_path: str) -> str:
     return "\n".join(lines)
 
 @tool
-def execute_code(code: str) -> str:
+def execute_code(code: str, reset: bool = False, config: RunnableConfig = None) -> str:
     """
     Executes a given string of Python code after getting user permission.
     It captures and returns the code's output and errors.
 
+    Code runs in a persistent Python worker for the current conversation, so
+    variables, imports and loaded data survive between calls. The worker is
+    restarted (losing its state) after a timeout, a crash or a reset.
+
     Args:
         code: A string containing the Python code to be executed.
+        reset: Start from a fresh interpreter, discarding all state from earlier calls.
 
     Returns:
-        A string containing the outcome: execution output, user rejection, or an error.
+        A string containing the outcome: execution output and time, user rejection, or an error.
     """
+    policy = _approval_policy(config)
+    if policy != "prompt":
+        # Code can't be held back as a patch, so only an approving policy runs it.
+        if policy != "approve":
+            return f"[Action Rejected by Policy] Code execution is not allowed in this run (approval: {policy})."
+        return _run_code(code, reset, config)
+
     console = Console()
 
     prompt_panel = Panel(
@@ -164,37 +540,45 @@ def execute_code(code: str) -> str:
     
     try:
         # Ask for user confirmation.
-        choice = console.input("[bold]Do you approve? [y/N]:[/bold] ").strip().lower()
+        with TRACER.span("approval", "execute_code", config):
+            choice = TERMINAL.ask("[bold]Do you approve? \\[y/N]:[/bold] ", console=console, markup=True).strip().lower()
         if choice not in ('y', 'yes'):
             return "[Action Rejected by User] Code execution cancelled."
     except KeyboardInterrupt:
         return "[Action Rejected by User] Code execution cancelled."
 
+    return _run_code(code, reset, config)
+
+
+def _run_code(code: str, reset: bool, config: RunnableConfig | None) -> str:
+    thread_id = str((config or {}).get("configurable", {}).get("thread_id", "default"))
+    if reset:
+        WORKER_POOL.reset(thread_id)
+
     try:
-        result = subprocess.run(
-            [sys.executable, "-c", code],
-            capture_output=True,
-            text=True,
-            check=False,
-            timeout=30 
-        )
+        result = WORKER_POOL.get(thread_id).run(code, timeout=WORKER_POOL.timeout_s)
         output = ""
-        if result.stdout:
-            output += f"--- Output ---\n{result.stdout}\n"
-        if result.stderr:
-            output += f"--- Error ---\n{result.stderr}\n"
+        if result["stdout"]:
+            output += f"--- Output ---\n{result['stdout']}\n"
+        if result["stderr"]:
+            output += f"--- Error ---\n{result['stderr']}\n"
         if not output:
-            return "Code executed with no output."
-            
-        return output
+            output = "Code executed with no output.\n"
+
+        return output + f"--- Execution time: {result['duration']:.3f}s ---"
 
-    except subprocess.TimeoutExpired:
-        return "[ToolError: Code execution timed out after 30 seconds.]"
+    except WorkerTimeout:
+        return (
+            f"[ToolError: Code execution timed out after {WORKER_POOL.timeout_s} seconds. "
+            "The Python worker was restarted and its state was lost.]"
+        )
+    except WorkerCrashed as e:
+        return f"[ToolError: The Python worker crashed ({e}) and will be restarted; its state was lost.]"
     except Exception as e:
         return f"[ToolError: An unexpected error occurred: {e}]"
     
 @tool
-def write_notebook(file_path: str, notebook_json: str) -> str:
+def write_notebook(file_path: str, notebook_json: str, config: RunnableConfig = None) -> str:
     """
     Writes a JSON string to a .ipynb file after getting user permission.
 
@@ -210,15 +594,34 @@ def write_notebook(file_path: str, notebook_json: str) -> str:
     """
     if not file_path.endswith(".ipynb"):
         return "[ToolError: file_path must end with .ipynb]"
-    
-    print(f"\n--- Notebook to be created at: {file_path} ---")
-    try:
-        # Ask for user confirmation.
-        choice = input("Do you want to create/update this notebook? [y/N]: ").strip().lower()
-        if choice not in ('y', 'yes'):
+
+    policy = _approval_policy(config)
+    if policy == "reject":
+        return f"[Action Rejected by Policy] Notebook creation is not allowed in this run (approval: {policy})."
+    if policy == "patch":
+        try:
+            new_content = json.dumps(json.loads(notebook_json), indent=2) + "\n"
+            old_content = None
+            source = _patched_path(config, file_path) or file_path
+            if os.path.exists(source):
+                with open(source, "r", encoding="utf-8") as f:
+                    old_content = f.read()
+            return f"notebook saved as patch {_save_patch(config, file_path, old_content, new_content)}, not written"
+        except json.JSONDecodeError:
+            return "[ToolError: The provided 'notebook_json' string is not valid JSON.]"
+        except Exception as e:
+            return f"[ToolError: Failed to save patch: {e}]"
+
+    if policy == "prompt":
+        print(f"\n--- Notebook to be created at: {file_path} ---")
+        try:
+            # Ask for user confirmation.
+            with TRACER.span("approval", "write_notebook", config):
+                choice = TERMINAL.ask("Do you want to create/update this notebook? [y/N]: ").strip().lower()
+            if choice not in ('y', 'yes'):
+                return "[Action Rejected by User] Notebook creation cancelled."
+        except KeyboardInterrupt:
             return "[Action Rejected by User] Notebook creation cancelled."
-    except KeyboardInterrupt:
-        return "[Action Rejected by User] Notebook creation cancelled."
     
     try:
         notebook_data = json.loads(notebook_json)
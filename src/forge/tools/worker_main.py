@@ -0,0 +1,99 @@
+"""
+Entry point of a persistent Python worker used by execute_code.
+
+Run as a script (not imported) with two arguments: the memory limit in MB
+and the per-call CPU limit in seconds (0 disables either). Requests and
+responses are JSON lines on the original stdin/stdout; user code sees an
+empty stdin, and its output is captured per call at the file descriptor
+level, so output of subprocesses and C extensions is included.
+
+The worker ignores SIGINT while it waits for a request, so a Ctrl-C in the
+terminal never kills it; during a call, SIGINT (sent by
+PythonWorker.interrupt) raises KeyboardInterrupt in the user's code.
+"""
+import os
+import sys
+import json
+import time
+import signal
+import tempfile
+import traceback
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _set_soft_limit(kind: int, soft: int):
+    _, hard = resource.getrlimit(kind)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(kind, (soft, hard))
+
+
+def _read_capture(f) -> str:
+    f.seek(0)
+    return f.read().decode("utf-8", errors="replace")
+
+
+def main():
+    memory_limit_mb, cpu_limit_s = int(sys.argv[1]), int(sys.argv[2])
+    # Run as a script, sys.path[0] is forge's tools package; user code imports from the project instead.
+    sys.path[0] = os.getcwd()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # Keep private copies of the protocol pipes, then point fds 0/1 away from
+    # them so that user code (or a C extension) can't corrupt the protocol.
+    proto_in = os.fdopen(os.dup(0), "rb")
+    proto_out = os.fdopen(os.dup(1), "wb")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    sys.stdin = open(os.devnull, "r")
+    saved_err = os.dup(2)
+    capture_out, capture_err = tempfile.TemporaryFile(), tempfile.TemporaryFile()
+
+    if resource is not None and memory_limit_mb:
+        _set_soft_limit(resource.RLIMIT_AS, memory_limit_mb * 1024 * 1024)
+
+    namespace = {"__name__": "__main__", "__builtins__": __builtins__}
+    for line in proto_in:
+        request = json.loads(line)
+        if resource is not None and cpu_limit_s:
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            _set_soft_limit(resource.RLIMIT_CPU, int(usage.ru_utime + usage.ru_stime) + cpu_limit_s + 1)
+
+        for f in (capture_out, capture_err):
+            f.seek(0)
+            f.truncate()
+        os.dup2(capture_out.fileno(), 1)
+        os.dup2(capture_err.fileno(), 2)
+        start = time.perf_counter()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        try:
+            exec(compile(request["code"], "<forge>", "exec"), namespace)
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                print(f"SystemExit: {e.code}", file=sys.stderr)
+        except BaseException as e:
+            # Skip this module's own frame so the traceback starts in the user's code.
+            traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+        finally:
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            duration = time.perf_counter() - start
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(devnull, 1)
+            os.dup2(saved_err, 2)
+        response = {
+            "stdout": _read_capture(capture_out),
+            "stderr": _read_capture(capture_err),
+            "duration": duration,
+        }
+        proto_out.write(json.dumps(response).encode("utf-8") + b"\n")
+        proto_out.flush()
+
+
+if __name__ == "__main__":
+    main()
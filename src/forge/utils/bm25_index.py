@@ -0,0 +1,276 @@
+import os
+import re
+import ast
+import math
+import time
+import sqlite3
+import threading
+from collections import Counter
+from typing import NamedTuple
+
+from ..config.config import ForgeConfig
+from .project_index import ProjectIndex
+
+CHUNK_MAX_LINES = 80
+CHUNK_WINDOW_LINES = 40
+BM25_MAX_FILE_BYTES = 200_000
+BM25_K1 = 1.2
+BM25_B = 0.75
+BM25_MAX_DF_RATIO = 0.25  # terms in more chunks than this carry almost no weight and are skipped
+BINARY_SNIFF_BYTES = 8192
+
+# Data, media and generated files are left to summarize_dataset / read_file.
+SKIP_EXTENSIONS = {
+    ".csv", ".tsv", ".json", ".jsonl", ".ndjson", ".parquet", ".pq", ".arrow", ".feather",
+    ".xlsx", ".xlsm", ".xls", ".ipynb", ".svg", ".min.js", ".map", ".lock", ".db", ".sqlite",
+}
+
+STOPWORDS = {
+    "the", "and", "for", "with", "this", "that", "from", "into", "not", "are", "was", "but", "you", "your",
+    "can", "how", "what", "why", "does", "should", "would", "could", "please", "there", "then", "than",
+    "self", "def", "return", "import", "class", "none", "true", "false", "if", "else", "in", "is", "of",
+    "to", "a", "an", "it", "be", "or", "as", "on", "at", "by", "we", "do", "me", "my", "i",
+}
+
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_CAMEL = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Splits text into lowercase terms: whole identifiers plus their snake_case/camelCase parts.
+
+    Numbers are dropped, except inside whole identifiers ("utf8", "v2").
+    """
+    terms = []
+    for word in _WORD.findall(text):
+        parts = [p for piece in word.split("_") for p in _CAMEL.findall(piece)]
+        lowered = word.lower()
+        if len(lowered) > 1 and lowered not in STOPWORDS:
+            terms.append(lowered)
+        if len(parts) > 1:
+            terms.extend(p.lower() for p in parts if len(p) > 1 and p.lower() not in STOPWORDS)
+    return terms
+
+
+class Chunk(NamedTuple):
+    path: str
+    start_line: int
+    end_line: int
+    score: float
+
+
+def _windows(start: int, end: int) -> list[tuple[int, int]]:
+    return [(s, min(s + CHUNK_WINDOW_LINES - 1, end)) for s in range(start, end + 1, CHUNK_WINDOW_LINES)]
+
+
+def _python_chunks(source: str, line_count: int) -> list[tuple[int, int]]:
+    """Chunks Python source by top-level function/class (methods for large classes); the rest by windows."""
+    tree = ast.parse(source)
+    spans = []
+    for node in tree.body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        start = min([d.lineno for d in node.decorator_list] + [node.lineno])
+        end = node.end_lineno
+        if end - start < CHUNK_MAX_LINES or not isinstance(node, ast.ClassDef):
+            spans.append((start, end))
+            continue
+        cursor = start
+        for child in node.body:
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                child_start = min([d.lineno for d in child.decorator_list] + [child.lineno])
+                if child_start > cursor:
+                    spans.append((cursor, child_start - 1))
+                spans.append((child_start, child.end_lineno))
+                cursor = child.end_lineno + 1
+        if cursor <= end:
+            spans.append((cursor, end))
+
+    chunks, cursor = [], 1
+    for start, end in spans:
+        if start > cursor:
+            chunks.extend(_windows(cursor, start - 1))
+        chunks.extend(_windows(start, end) if end - start >= CHUNK_MAX_LINES else [(start, end)])
+        cursor = end + 1
+    if cursor <= line_count:
+        chunks.extend(_windows(cursor, line_count))
+    return chunks
+
+
+def chunk_file(path: str, text: str) -> list[tuple[int, int]]:
+    """Splits a file into (start_line, end_line) chunks: by definition for Python, by line window otherwise."""
+    line_count = text.count("\n") + (0 if text.endswith("\n") else 1)
+    if path.endswith(".py"):
+        try:
+            return _python_chunks(text, line_count)
+        except (SyntaxError, ValueError, RecursionError):
+            pass
+    return _windows(1, line_count)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER);
+CREATE TABLE IF NOT EXISTS chunks (id INTEGER PRIMARY KEY, path TEXT, start_line INTEGER, end_line INTEGER, length INTEGER);
+CREATE TABLE IF NOT EXISTS terms (id INTEGER PRIMARY KEY, term TEXT UNIQUE);
+CREATE TABLE IF NOT EXISTS postings (term_id INTEGER, chunk_id INTEGER, tf INTEGER, PRIMARY KEY (term_id, chunk_id)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS chunks_path ON chunks (path);
+CREATE INDEX IF NOT EXISTS postings_chunk ON postings (chunk_id);
+"""
+
+
+class BM25Index:
+    """
+    An on-disk BM25 index of the project's source chunks, stored in .forge/retrieval.db.
+
+    Files are split into chunks (one per Python function or class, line
+    windows elsewhere) whose terms go into an inverted index. Refreshing
+    re-indexes files whose size or mtime changed, within a time budget so
+    that a large first build is spread over several calls instead of
+    blocking one; queries rank whatever has been indexed so far.
+    """
+    VERSION = 1
+
+    def __init__(self, root_path: str = ".", index_dir: str | os.PathLike | None = None):
+        self.root = os.path.abspath(root_path)
+        index_dir = index_dir if index_dir is not None else ForgeConfig.CONFIG_DIR
+        db_path = os.path.join(index_dir, "retrieval.db") if os.path.isdir(index_dir) else ":memory:"
+        self.project = ProjectIndex(root_path, cache_path=os.path.join(index_dir, "index.json"))
+        self.lock = threading.Lock()
+        self._refresh_lock = threading.Lock()  # refreshes from a turn and from idle time take turns
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        expected = {"version": str(self.VERSION), "root": self.root}
+        if dict(self._conn.execute("SELECT key, value FROM meta")) != expected:
+            with self._conn:
+                for table in ("meta", "files", "chunks", "terms", "postings"):
+                    self._conn.execute(f"DELETE FROM {table}")
+                self._conn.executemany("INSERT INTO meta VALUES (?, ?)", expected.items())
+        self._files = {path: (size, mtime_ns) for path, size, mtime_ns in self._conn.execute("SELECT * FROM files")}
+        self._term_ids: dict[str, int] | None = None  # loaded on first write
+        self.pending = 0  # files still waiting to be indexed after the last refresh
+
+    def _term_id(self, term: str) -> int:
+        if self._term_ids is None:
+            self._term_ids = dict(self._conn.execute("SELECT term, id FROM terms"))
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            term_id = self._term_ids[term] = self._conn.execute(
+                "INSERT INTO terms (term) VALUES (?)", (term,)
+            ).lastrowid
+        return term_id
+
+    def _remove(self, path: str):
+        ids = [(chunk_id,) for (chunk_id,) in self._conn.execute("SELECT id FROM chunks WHERE path = ?", (path,))]
+        self._conn.executemany("DELETE FROM postings WHERE chunk_id = ?", ids)
+        self._conn.execute("DELETE FROM chunks WHERE path = ?", (path,))
+        self._conn.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def _index(self, path: str, size: int, mtime_ns: int):
+        self._remove(path)
+        self._conn.execute("INSERT INTO files VALUES (?, ?, ?)", (path, size, mtime_ns))
+        try:
+            with open(os.path.join(self.root, path), "rb") as f:
+                data = f.read(BM25_MAX_FILE_BYTES + 1)
+        except OSError:
+            return
+        if b"\0" in data[:BINARY_SNIFF_BYTES]:
+            return
+        lines = data.decode("utf-8", errors="replace").splitlines()
+        # The path's own terms (e.g. "config", "loader") count towards every chunk of the file.
+        path_terms = tokenize(path)
+        for start, end in chunk_file(path, "\n".join(lines)):
+            terms = Counter(tokenize("\n".join(lines[start - 1:end])))
+            terms.update(path_terms)
+            if not terms:
+                continue
+            chunk_id = self._conn.execute(
+                "INSERT INTO chunks (path, start_line, end_line, length) VALUES (?, ?, ?, ?)",
+                (path, start, end, sum(terms.values())),
+            ).lastrowid
+            self._conn.executemany(
+                "INSERT INTO postings VALUES (?, ?, ?)",
+                [(self._term_id(term), chunk_id, tf) for term, tf in terms.items()],
+            )
+
+    def refresh(self, max_seconds: float | None = None):
+        """Re-indexes changed files, stopping after roughly max_seconds (None: no limit)."""
+        with self._refresh_lock:
+            self._refresh(max_seconds)
+
+    def _refresh(self, max_seconds: float | None):
+        self.project.refresh()
+        current = {
+            path: (size, mtime_ns)
+            for path, size, mtime_ns in self.project.iter_files(restat=True)
+            if size <= BM25_MAX_FILE_BYTES and not any(path.endswith(ext) for ext in SKIP_EXTENSIONS)
+        }
+        removed = self._files.keys() - current.keys()
+        changed = [(path, stamp) for path, stamp in current.items() if self._files.get(path) != stamp]
+        if not removed and not changed:
+            self.pending = 0
+            return
+
+        deadline = time.monotonic() + max_seconds if max_seconds is not None else None
+        done = 0
+        with self.lock, self._conn:
+            for path in removed:
+                self._remove(path)
+                del self._files[path]
+            for path, (size, mtime_ns) in changed:
+                if deadline is not None and time.monotonic() > deadline:
+                    break
+                self._index(path, size, mtime_ns)
+                self._files[path] = (size, mtime_ns)
+                done += 1
+        self.pending = len(changed) - done
+
+    def search(self, query: str, top_k: int = 8) -> list[Chunk]:
+        """Returns the top_k chunks ranked by BM25 score for the query's terms."""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        with self.lock:
+            total, avg_length = self._conn.execute("SELECT COUNT(*), AVG(length) FROM chunks").fetchone()
+            if not total:
+                return []
+            scores: dict[int, float] = {}
+            for term in terms:
+                row = self._conn.execute("SELECT id FROM terms WHERE term = ?", (term,)).fetchone()
+                if row is None:
+                    continue
+                term_id = row[0]
+                (df,) = self._conn.execute("SELECT COUNT(*) FROM postings WHERE term_id = ?", (term_id,)).fetchone()
+                if not df or (df > BM25_MAX_DF_RATIO * total and total > 20):
+                    continue
+                idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+                for chunk_id, tf, length in self._conn.execute(
+                    "SELECT p.chunk_id, p.tf, c.length FROM postings p JOIN chunks c ON c.id = p.chunk_id WHERE p.term_id = ?",
+                    (term_id,),
+                ):
+                    norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+
+            best = sorted(scores.items(), key=lambda item: -item[1])[:top_k]
+            results = []
+            for chunk_id, score in best:
+                path, start, end = self._conn.execute(
+                    "SELECT path, start_line, end_line FROM chunks WHERE id = ?", (chunk_id,)
+                ).fetchone()
+                results.append(Chunk(path, start, end, score))
+        return results
+
+
+_INDEXES: dict[str, BM25Index] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_bm25_index(root_path: str = ".") -> BM25Index:
+    """Returns the process-wide BM25Index for a project root, loading it on first use."""
+    root = os.path.abspath(root_path)
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(root)
+        if index is None:
+            index = _INDEXES[root] = BM25Index(root)
+        return index
@@ -0,0 +1,183 @@
+"""
+Retention and compaction for the checkpoint database (.forge/memory.db).
+
+SqliteSaver writes a full checkpoint at every graph step and never deletes
+one. Resuming a thread only needs its latest checkpoint, so older ones can
+be pruned. Pruning keeps the last N checkpoints of each thread, drops
+threads idle for longer than a maximum age, and then drops the least
+recently used threads until the database fits a size cap. Pending writes
+whose checkpoint is gone are deleted with it, and so are messages stored by
+DeltaSqliteSaver that no checkpoint refers to any more. The freed pages are returned
+to the file system by an incremental vacuum, or by a full VACUUM on request.
+"""
+import os
+import time
+import sqlite3
+from dataclasses import dataclass
+from typing import Iterable
+
+from .checkpointer import sweep_messages
+
+# Offset between the UUID epoch (1582-10-15) and the Unix epoch, in 100 ns intervals.
+_UUID_EPOCH_OFFSET = 0x01B21DD213814000
+
+
+def checkpoint_time(checkpoint_id: str) -> float:
+    """Returns the Unix time encoded in a LangGraph checkpoint id (a version 6 UUID)."""
+    value = int(checkpoint_id.replace("-", ""), 16)
+    ticks = ((value >> 96) & 0xFFFFFFFF) << 28 | ((value >> 80) & 0xFFFF) << 12 | ((value >> 64) & 0x0FFF)
+    return (ticks - _UUID_EPOCH_OFFSET) / 1e7
+
+
+@dataclass
+class GCStats:
+    checkpoints: int = 0
+    writes: int = 0
+    messages: int = 0
+    threads: int = 0
+    size_before: int = 0
+    size_after: int = 0
+
+
+def _db_size(path: str) -> int:
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+
+def _tables(conn: sqlite3.Connection) -> set[str]:
+    return {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def _delete_threads(conn: sqlite3.Connection, thread_ids: list[str], stats: GCStats, messages: bool):
+    for thread_id in thread_ids:
+        stats.checkpoints += conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,)).rowcount
+        stats.writes += conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,)).rowcount
+        if messages:
+            stats.messages += conn.execute("DELETE FROM checkpoint_messages WHERE thread_id = ?", (thread_id,)).rowcount
+    stats.threads += len(thread_ids)
+
+
+def prune(
+    conn: sqlite3.Connection, keep_last: int = 0, max_age_days: float = 0, max_bytes: int = 0, protect: Iterable[str] = ()
+) -> GCStats:
+    """
+    Applies the retention policies in one transaction; 0 disables a policy.
+
+    Args:
+        conn: A connection to the checkpoint database.
+        keep_last: Checkpoints kept per thread (and namespace), newest first.
+        max_age_days: Threads whose latest checkpoint is older than this are deleted.
+        max_bytes: Least recently used threads are deleted until the stored
+            checkpoints and writes fit in this size. The latest thread is always kept.
+        protect: Threads never deleted by age or size, such as the one being resumed.
+    """
+    stats = GCStats()
+    tables = _tables(conn)
+    if not {"checkpoints", "writes"} <= tables:
+        return stats
+    messages = "checkpoint_messages" in tables
+    with conn:
+        if keep_last > 0:
+            stats.checkpoints += conn.execute(
+                """
+                DELETE FROM checkpoints WHERE rowid IN (
+                    SELECT rowid FROM (
+                        SELECT rowid, ROW_NUMBER() OVER (
+                            PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+                        ) AS rank FROM checkpoints
+                    ) WHERE rank > ?
+                )
+                """,
+                (keep_last,),
+            ).rowcount
+
+        # Threads from least to most recently used (checkpoint ids are time-ordered).
+        protect = set(protect)
+        threads = [
+            (thread_id, checkpoint_time(latest))
+            for thread_id, latest in conn.execute(
+                "SELECT thread_id, MAX(checkpoint_id) FROM checkpoints GROUP BY thread_id ORDER BY 2"
+            )
+        ]
+        if max_age_days > 0:
+            cutoff = time.time() - max_age_days * 86400
+            expired = {thread_id for thread_id, used in threads if used < cutoff and thread_id not in protect}
+            _delete_threads(conn, [t for t, _ in threads if t in expired], stats, messages)
+            threads = [(t, used) for t, used in threads if t not in expired]
+
+        if max_bytes > 0 and len(threads) > 1:
+            sizes = dict(conn.execute(
+                "SELECT thread_id, SUM(LENGTH(checkpoint) + LENGTH(metadata)) FROM checkpoints GROUP BY thread_id"
+            ))
+            others = ["SELECT thread_id, SUM(LENGTH(value)) FROM writes GROUP BY thread_id"]
+            if messages:
+                others.append("SELECT thread_id, SUM(LENGTH(data)) FROM checkpoint_messages GROUP BY thread_id")
+            for query in others:
+                for thread_id, size in conn.execute(query):
+                    sizes[thread_id] = (sizes.get(thread_id) or 0) + (size or 0)
+            total = sum(size or 0 for size in sizes.values())
+            evicted = []
+            for thread_id, _ in threads[:-1]:
+                if total <= max_bytes:
+                    break
+                if thread_id in protect:
+                    continue
+                total -= sizes.get(thread_id) or 0
+                evicted.append(thread_id)
+            _delete_threads(conn, evicted, stats, messages)
+
+        # Writes are only read alongside their checkpoint; without it they are dead weight.
+        stats.writes += conn.execute(
+            """
+            DELETE FROM writes WHERE NOT EXISTS (
+                SELECT 1 FROM checkpoints c WHERE c.thread_id = writes.thread_id
+                AND c.checkpoint_ns = writes.checkpoint_ns AND c.checkpoint_id = writes.checkpoint_id
+            )
+            """
+        ).rowcount
+    return stats
+
+
+def compact(conn: sqlite3.Connection, full: bool = False):
+    """
+    Returns free pages to the file system.
+
+    The first compaction switches the database to incremental auto-vacuum,
+    which takes one full VACUUM; after that only the pages freed by pruning
+    are released, which is much cheaper. `full` forces a VACUUM, which also
+    defragments the file.
+    """
+    (auto_vacuum,) = conn.execute("PRAGMA auto_vacuum").fetchone()
+    if full or auto_vacuum != 2:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    else:
+        # executescript steps the pragma to completion; execute() frees a single page.
+        conn.executescript("PRAGMA incremental_vacuum;")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def collect_garbage(
+    db_path: str | os.PathLike,
+    keep_last: int = 0,
+    max_age_days: float = 0,
+    max_bytes: int = 0,
+    vacuum: bool = True,
+    full: bool = False,
+    protect: Iterable[str] = (),
+) -> GCStats:
+    """Prunes the checkpoint database at `db_path` and, with `vacuum`, sweeps unreferenced messages and compacts it."""
+    db_path = str(db_path)
+    if not os.path.exists(db_path):
+        return GCStats()
+    size_before = _db_size(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        stats = prune(conn, keep_last=keep_last, max_age_days=max_age_days, max_bytes=max_bytes, protect=protect)
+        if vacuum:
+            # Finding unreferenced messages decodes every checkpoint, so it is left to explicit compaction.
+            stats.messages += sweep_messages(conn)
+            compact(conn, full=full)
+    finally:
+        conn.close()
+    stats.size_before, stats.size_after = size_before, _db_size(db_path)
+    return stats
@@ -0,0 +1,268 @@
+"""
+A SqliteSaver that stores each conversation message once.
+
+The stock saver serializes the whole message list into every checkpoint, so
+a thread of n steps re-serializes and stores O(n²) messages. DeltaSqliteSaver
+moves messages into a `checkpoint_messages` table, content-addressed per
+thread: a checkpoint keeps only the 16-byte hashes of its messages, and each
+step writes just the messages that are new or changed since the last one.
+On load, the hashes are resolved back into the full list. Checkpoints stay
+independent of each other (no chains of deltas), so pruning any of them
+never breaks another.
+
+All blobs (checkpoints, messages and pending writes) are msgpack compressed
+with zlib. Rows written by the stock saver still load unchanged.
+
+The async methods run the synchronous ones on a worker thread, which is
+what AsyncSqliteSaver does through aiosqlite, so the same saver serves
+both `invoke` and `ainvoke`/`astream`. A write already handed to a thread
+completes even if the awaiting task is cancelled.
+"""
+import zlib
+import asyncio
+import struct
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from .tracing import TRACER
+
+COMPRESSED_PREFIX = "zlib+"
+COMPRESSION_LEVEL = 6
+MIN_COMPRESS_BYTES = 256
+MESSAGE_CACHE_SIZE = 8192
+_REFS_KEY = "__forge_message_refs__"
+
+
+def _pack(serde, obj: Any) -> tuple[str, bytes]:
+    type_, data = serde.dumps_typed(obj)
+    if len(data) < MIN_COMPRESS_BYTES:
+        return type_, data
+    return COMPRESSED_PREFIX + type_, zlib.compress(data, COMPRESSION_LEVEL)
+
+
+def _unpack(serde, type_: str, data: bytes) -> Any:
+    if type_.startswith(COMPRESSED_PREFIX):
+        type_, data = type_[len(COMPRESSED_PREFIX):], zlib.decompress(data)
+    return serde.loads_typed((type_, data))
+
+
+class _CompressingSerializer:
+    """Wraps the saver's serializer: compresses blobs and resolves message references on load."""
+
+    def __init__(self, inner, saver: "DeltaSqliteSaver"):
+        self.inner = inner
+        self.saver = saver
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        return _pack(self.inner, obj)
+
+    def loads_typed(self, data: tuple[str, bytes]) -> Any:
+        obj = _unpack(self.inner, *data)
+        values = obj.get("channel_values") if isinstance(obj, dict) else None
+        refs = values.get("messages") if isinstance(values, dict) else None
+        if isinstance(refs, dict) and _REFS_KEY in refs:
+            values["messages"] = self.saver._load_messages(refs[_REFS_KEY])
+        return obj
+
+
+class DeltaSqliteSaver(SqliteSaver):
+    """
+    SqliteSaver with content-addressed messages and compressed blobs.
+
+    Which messages are new is decided by object identity: LangGraph carries
+    unchanged messages over from step to step, so a message already stored
+    under its id is not serialized again. A message replaced under the same
+    id (a stubbed tool output, for example) is a new object and is stored anew.
+    Garbage collection, run on another connection, may delete rows the cache
+    believes stored, so after another connection commits (SQLite's
+    data_version changes) the next put of each thread checks its cached rows
+    against the table and writes missing ones again. Messages are never
+    mutated once in the state, so decoded messages are kept by hash and
+    shared between loads instead of being decoded again.
+    """
+
+    def __init__(self, conn, *, serde=None):
+        super().__init__(conn, serde=serde)
+        self.message_serde = self.serde
+        self.serde = _CompressingSerializer(self.message_serde, self)
+        # (thread id, message id) -> (message object, hash), to skip re-serializing in put(),
+        # and hash -> message object, to skip decoding again on load.
+        self._stored: OrderedDict[tuple[str, str], tuple[Any, bytes]] = OrderedDict()
+        self._decoded: OrderedDict[bytes, Any] = OrderedDict()
+        # thread id -> the database's data_version when its cached rows were last checked.
+        self._checked: dict[str, int] = {}
+        self._cache_lock = threading.Lock()
+
+    def setup(self) -> None:
+        if self.is_setup:
+            return
+        super().setup()
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS checkpoint_messages (
+                hash BLOB, thread_id TEXT, type TEXT, data BLOB, PRIMARY KEY (hash, thread_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS checkpoint_messages_thread ON checkpoint_messages (thread_id);
+            """
+        )
+
+    def _cache(self, cache: OrderedDict, key, value):
+        with self._cache_lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > MESSAGE_CACHE_SIZE:
+                cache.popitem(last=False)
+
+    def _message_refs(self, thread_id: str, messages: list) -> tuple[list[bytes], list[tuple], dict[bytes, Any]]:
+        """
+        Returns the hashes of the messages, the rows of those not stored yet,
+        and, by hash, the messages the cache says are stored already.
+        """
+        refs, rows, cached = [], [], {}
+        for message in messages:
+            key = (thread_id, getattr(message, "id", None))
+            with self._cache_lock:
+                stored = self._stored.get(key)
+            if stored is not None and stored[0] is message:
+                refs.append(stored[1])
+                cached[stored[1]] = message
+                continue
+            type_, data = _pack(self.message_serde, message)
+            digest = hashlib.blake2b(type_.encode() + b"\0" + data, digest_size=16).digest()
+            refs.append(digest)
+            rows.append((digest, thread_id, type_, data))
+            if key[1] is not None:
+                self._cache(self._stored, key, (message, digest))
+            self._cache(self._decoded, digest, message)
+        return refs, rows, cached
+
+    def _missing_rows(self, cur, thread_id: str, cached: dict[bytes, Any]) -> list[tuple]:
+        """Rows for cached messages that are no longer in the table (deleted by gc or sweep_messages)."""
+        digests, present = list(cached), set()
+        for i in range(0, len(digests), 500):
+            batch = digests[i:i + 500]
+            present.update(
+                digest
+                for (digest,) in cur.execute(
+                    f"SELECT hash FROM checkpoint_messages WHERE thread_id = ? AND hash IN ({','.join('?' * len(batch))})",
+                    [thread_id, *batch],
+                )
+            )
+        rows = []
+        for digest in digests:
+            if digest not in present:
+                rows.append((digest, thread_id, *_pack(self.message_serde, cached[digest])))
+        return rows
+
+    def _load_messages(self, refs: list[bytes]) -> list:
+        """Resolves message hashes; called by the serializer with the saver's lock held."""
+        with self._cache_lock:
+            loaded = {digest: self._decoded[digest] for digest in refs if digest in self._decoded}
+        rows = {}
+        unique = [digest for digest in dict.fromkeys(refs) if digest not in loaded]
+        for i in range(0, len(unique), 500):
+            batch = unique[i:i + 500]
+            rows.update(
+                (digest, (type_, data))
+                for digest, type_, data in self.conn.execute(
+                    f"SELECT hash, type, data FROM checkpoint_messages WHERE hash IN ({','.join('?' * len(batch))})",
+                    batch,
+                )
+            )
+        missing = [digest.hex() for digest in unique if digest not in rows]
+        if missing:
+            raise ValueError(f"Checkpoint references {len(missing)} missing message(s), e.g. {missing[0]}.")
+        loaded.update(self._decode_all(rows))
+        for digest in rows:
+            self._cache(self._decoded, digest, loaded[digest])
+        return [loaded[digest] for digest in refs]
+
+    def _decode_all(self, rows: dict[bytes, tuple[str, bytes]]) -> dict[bytes, Any]:
+        """Decodes message rows, msgpack ones as a single array to pay the per-call overhead once."""
+        decoded, packed = {}, []
+        for digest, (type_, data) in rows.items():
+            if type_.startswith(COMPRESSED_PREFIX):
+                type_, data = type_[len(COMPRESSED_PREFIX):], zlib.decompress(data)
+            if type_ == "msgpack":
+                packed.append((digest, data))
+            else:
+                decoded[digest] = self.message_serde.loads_typed((type_, data))
+        if packed:
+            header = b"\xdd" + struct.pack(">I", len(packed))  # msgpack array32
+            values = self.message_serde.loads_typed(("msgpack", header + b"".join(data for _, data in packed)))
+            decoded.update(zip((digest for digest, _ in packed), values))
+        return decoded
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        with TRACER.span("checkpoint", "put", config) as span:
+            values = checkpoint.get("channel_values") or {}
+            messages = values.get("messages")
+            if isinstance(messages, list):
+                thread_id = str(config["configurable"]["thread_id"])
+                refs, rows, cached = self._message_refs(thread_id, messages)
+                if rows or cached:
+                    with self.cursor() as cur:
+                        version = cur.execute("PRAGMA data_version").fetchone()[0]
+                        if cached and self._checked.get(thread_id) != version:
+                            rows += self._missing_rows(cur, thread_id, cached)
+                        self._checked[thread_id] = version
+                        if rows:
+                            cur.executemany("INSERT OR IGNORE INTO checkpoint_messages VALUES (?, ?, ?, ?)", rows)
+                checkpoint = {**checkpoint, "channel_values": {**values, "messages": {_REFS_KEY: refs}}}
+                span.update(new_messages=len(rows), message_bytes=sum(len(row[3]) for row in rows))
+            return super().put(config, checkpoint, metadata, new_versions)
+
+    def get_tuple(self, config):
+        with TRACER.span("checkpoint", "get", config):
+            return super().get_tuple(config)
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        with TRACER.span("checkpoint", "put_writes", config, writes=len(writes)):
+            return super().put_writes(config, writes, task_id, task_path)
+
+    async def aget_tuple(self, config):
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        rows = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for row in rows:
+            yield row
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id):
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+    async def aget_delta_channel_history(self, *, config, channels):
+        return await asyncio.to_thread(lambda: self.get_delta_channel_history(config=config, channels=channels))
+
+
+def sweep_messages(conn, serde=None) -> int:
+    """Deletes messages no remaining checkpoint refers to; returns how many were deleted."""
+    tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if "checkpoint_messages" not in tables:
+        return 0
+    serde = serde or JsonPlusSerializer()
+    referenced = set()
+    # Without a checkpoints table (cleared by an older clear-memory) no message is referenced.
+    checkpoints = conn.execute("SELECT thread_id, type, checkpoint FROM checkpoints") if "checkpoints" in tables else ()
+    for thread_id, type_, data in checkpoints:
+        obj = _unpack(serde, type_, data)
+        refs = (obj.get("channel_values") or {}).get("messages")
+        if isinstance(refs, dict) and _REFS_KEY in refs:
+            referenced.update((digest, thread_id) for digest in refs[_REFS_KEY])
+    orphans = [
+        key for key in conn.execute("SELECT hash, thread_id FROM checkpoint_messages") if key not in referenced
+    ]
+    with conn:
+        conn.executemany("DELETE FROM checkpoint_messages WHERE hash = ? AND thread_id = ?", orphans)
+    return len(orphans)
@@ -0,0 +1,404 @@
+import os
+import re
+import json
+import mmap
+import time
+import bisect
+import struct
+import fnmatch
+import threading
+from array import array
+from typing import NamedTuple
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+from ..config.config import ForgeConfig
+from .project_index import ProjectIndex
+
+SEARCH_MAX_FILE_BYTES = 1_000_000
+SEARCH_DELTA_MAX_FILES = 500
+SEARCH_SNIPPET_LEN = 200
+BINARY_SNIFF_BYTES = 8192
+
+_MAGIC = b"FSI1"
+_DEFINITION_LINE = re.compile(
+    r"^\s*(?:async\s+def|def|class|function|func|fn|const|let|var|type|interface|struct|enum)\b"
+)
+
+
+class SearchMatch(NamedTuple):
+    path: str
+    line: int
+    text: str
+    is_definition: bool
+
+
+class SearchResult(NamedTuple):
+    matches: list[SearchMatch]
+    total_matches: int
+    files_matched: int
+    candidates: int
+    files_indexed: int
+    complete: bool
+    elapsed: float
+
+
+def _file_trigrams(data: bytes) -> set[tuple[int, int, int]]:
+    """Returns the distinct trigrams of a file as tuples of 3 lowercased bytes."""
+    data = data.lower()
+    return set(zip(data, data[1:], data[2:]))
+
+
+def _pack(trigram: tuple[int, int, int]) -> int:
+    a, b, c = trigram
+    return (a << 16) | (b << 8) | c
+
+
+def _text_trigrams(text: str) -> set[int]:
+    data = text.encode("utf-8").lower()
+    return {(a << 16) | (b << 8) | c for a, b, c in zip(data, data[1:], data[2:])}
+
+
+def _required_literals(parsed) -> list[str]:
+    """
+    Collects literal runs that every match of a parsed regex must contain.
+
+    Anything that is not a plain literal (classes, optional repeats,
+    alternations, ...) ends the current run; it is always safe to find fewer
+    literals than a perfect analysis would, never more.
+    """
+    runs, current = [], []
+
+    def flush():
+        if current:
+            runs.append("".join(current))
+            current.clear()
+
+    for op, arg in parsed:
+        if op is sre_parse.LITERAL:
+            current.append(chr(arg))
+        elif op is sre_parse.AT:
+            continue  # anchors consume no characters
+        elif op is sre_parse.SUBPATTERN:
+            flush()
+            runs.extend(_required_literals(arg[-1]))
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            flush()
+            low, _, item = arg
+            if low >= 1:
+                runs.extend(_required_literals(item))
+        else:
+            flush()
+    flush()
+    return runs
+
+
+def query_trigrams(pattern: str, regex: bool) -> set[int]:
+    """Returns the trigrams any file matching the query must contain (empty: no filtering possible)."""
+    if not regex:
+        return _text_trigrams(pattern)
+    trigrams = set()
+    for run in _required_literals(sre_parse.parse(pattern)):
+        trigrams |= _text_trigrams(run)
+    return trigrams
+
+
+class CodeSearchIndex:
+    """
+    A persistent trigram index over the project's text files, for search_code.
+
+    The index has two parts in .forge/: a binary base segment (sorted
+    trigrams, offsets and file-id posting lists) that is memory-mapped
+    rather than parsed, and a small JSON delta holding the trigrams of files
+    added or modified since the base was built. Refreshing compares file
+    sizes and mtimes from the ProjectIndex, re-reads only changed files into
+    the delta, and rebuilds the base once the delta grows large.
+
+    A query intersects the posting lists of its trigrams to find candidate
+    files, then confirms matches by running the real pattern over them.
+    """
+    VERSION = 1
+
+    def __init__(self, root_path: str = ".", index_dir: str | os.PathLike | None = None):
+        self.root = os.path.abspath(root_path)
+        index_dir = index_dir if index_dir is not None else ForgeConfig.CONFIG_DIR
+        self.base_path = os.path.join(index_dir, "search.idx")
+        self.delta_path = os.path.join(index_dir, "search_delta.json")
+        self.project = ProjectIndex(root_path, cache_path=os.path.join(index_dir, "index.json"))
+        self.lock = threading.Lock()
+
+        self._mmap = None
+        self._files: list[list] = []           # base file id -> [path, size, mtime_ns, binary]
+        self._base_ids: dict[str, int] = {}
+        self._keys = self._offsets = self._postings = None
+        self._delta: dict[str, list] = {}      # path -> [size, mtime_ns, binary, trigrams]
+        self._stale: set[int] = set()          # base ids whose file changed or disappeared
+        self._delta_sets: dict[str, tuple[list, set]] = {}
+        self._built = None
+        self._load()
+
+    # --- persistence -------------------------------------------------------
+
+    def _close_base(self):
+        self._keys = self._offsets = self._postings = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._files, self._base_ids = [], {}
+
+    def _load(self):
+        try:
+            with open(self.base_path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return
+        try:
+            if mm[:4] != _MAGIC:
+                raise ValueError("bad magic")
+            (meta_len,) = struct.unpack_from("<I", mm, 4)
+            meta = json.loads(mm[8:8 + meta_len])
+            if meta.get("version") != self.VERSION or meta.get("root") != self.root:
+                raise ValueError("index of another version or project")
+            start = (8 + meta_len + 3) & ~3
+            view = memoryview(mm)
+            n, total = meta["trigrams"], meta["postings"]
+            self._keys = view[start:start + 4 * n].cast("I")
+            self._offsets = view[start + 4 * n:start + 8 * n + 4].cast("I")
+            self._postings = view[start + 8 * n + 4:start + 8 * n + 4 + 4 * total].cast("I")
+        except (ValueError, KeyError, struct.error):
+            mm.close()
+            return
+        self._mmap = mm
+        self._built = meta["built"]
+        self._files = meta["files"]
+        self._base_ids = {entry[0]: i for i, entry in enumerate(self._files)}
+
+        try:
+            with open(self.delta_path, "r", encoding="utf-8") as f:
+                delta = json.load(f)
+            if delta.get("base") == meta["built"]:
+                self._delta = delta["files"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _save_delta(self, built: float):
+        if not os.path.isdir(os.path.dirname(os.path.abspath(self.delta_path))):
+            return
+        tmp_path = f"{self.delta_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"base": built, "files": self._delta}, f, separators=(",", ":"))
+            os.replace(tmp_path, self.delta_path)
+        except OSError:
+            pass
+
+    def _read(self, rel_path: str) -> tuple[bool, set[tuple[int, int, int]]]:
+        """Returns (is_binary, trigrams) for a file; unreadable files count as binary."""
+        try:
+            with open(os.path.join(self.root, rel_path), "rb") as f:
+                data = f.read(SEARCH_MAX_FILE_BYTES + 1)
+        except OSError:
+            return True, set()
+        if b"\0" in data[:BINARY_SNIFF_BYTES]:
+            return True, set()
+        return False, _file_trigrams(data)
+
+    def _build_base(self, files: dict[str, tuple[int, int]]):
+        """Indexes every file from scratch and writes a new base segment."""
+        # Keyed by byte tuples while collecting; packed into ints once per distinct trigram.
+        postings: dict[tuple[int, int, int], array] = {}
+        entries = []
+        for file_id, (rel_path, (size, mtime_ns)) in enumerate(sorted(files.items())):
+            binary, trigrams = self._read(rel_path)
+            entries.append([rel_path, size, mtime_ns, binary])
+            for t in trigrams:
+                ids = postings.get(t)
+                if ids is None:
+                    ids = postings[t] = array("I")
+                ids.append(file_id)
+
+        keys, offsets, flat = array("I"), array("I", [0]), array("I")
+        for t in sorted(postings):
+            keys.append(_pack(t))
+            flat.extend(postings[t])
+            offsets.append(len(flat))
+        built = time.time()
+        meta = json.dumps({
+            "version": self.VERSION, "root": self.root, "built": built,
+            "files": entries, "trigrams": len(keys), "postings": len(flat),
+        }, separators=(",", ":")).encode("utf-8")
+
+        self._close_base()
+        self._delta = {}
+        if os.path.isdir(os.path.dirname(os.path.abspath(self.base_path))):
+            tmp_path = f"{self.base_path}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(_MAGIC + struct.pack("<I", len(meta)) + meta)
+                    f.write(b"\0" * (-(8 + len(meta)) % 4))
+                    for part in (keys, offsets, flat):
+                        part.tofile(f)
+                os.replace(tmp_path, self.base_path)
+                self._save_delta(built)
+            except OSError:
+                pass
+            self._load()
+        if self._mmap is None:
+            # No .forge directory (or it is not writable): keep the index in memory only.
+            self._files = entries
+            self._base_ids = {entry[0]: i for i, entry in enumerate(entries)}
+            self._keys, self._offsets, self._postings = keys, offsets, flat
+
+    # --- refresh & query -----------------------------------------------------
+
+    def refresh(self):
+        """Brings the index up to date with the project's files."""
+        self.project.refresh()
+        files = {
+            path: (size, mtime_ns)
+            for path, size, mtime_ns in self.project.iter_files(restat=True)
+            if size <= SEARCH_MAX_FILE_BYTES
+        }
+        if self._keys is None:
+            self._build_base(files)
+            self._stale = set()
+            return
+
+        stale, changed = set(), False
+        for file_id, (path, size, mtime_ns, _) in enumerate(self._files):
+            if files.get(path) != (size, mtime_ns):
+                stale.add(file_id)
+        for path in list(self._delta):
+            if path not in files or files[path] != tuple(self._delta[path][:2]):
+                del self._delta[path]
+                changed = True
+        for path, (size, mtime_ns) in files.items():
+            base_id = self._base_ids.get(path)
+            if (base_id is not None and base_id not in stale) or path in self._delta:
+                continue
+            binary, trigrams = self._read(path)
+            self._delta[path] = [size, mtime_ns, binary, sorted(map(_pack, trigrams))]
+            changed = True
+
+        if len(self._delta) > max(SEARCH_DELTA_MAX_FILES, len(self._files) // 10):
+            self._build_base(files)
+            self._stale = set()
+            return
+        self._stale = stale
+        if changed and self._mmap is not None:
+            self._save_delta(self._built)
+
+    def _posting(self, trigram: int):
+        i = bisect.bisect_left(self._keys, trigram)
+        if i == len(self._keys) or self._keys[i] != trigram:
+            return ()
+        return self._postings[self._offsets[i]:self._offsets[i + 1]]
+
+    def candidates(self, trigrams: set[int]) -> list[str]:
+        """Returns the indexed text files that contain all the given trigrams."""
+        if trigrams:
+            lists = sorted((self._posting(t) for t in trigrams), key=len)
+            ids = set(lists[0])
+            for ids_list in lists[1:]:
+                if not ids:
+                    break
+                ids.intersection_update(ids_list)
+        else:
+            ids = set(range(len(self._files)))
+        paths = [self._files[i][0] for i in ids - self._stale if not self._files[i][3]]
+        for path, (_, _, binary, delta_trigrams) in self._delta.items():
+            if binary:
+                continue
+            if trigrams:
+                cached = self._delta_sets.get(path)
+                if cached is None or cached[0] is not delta_trigrams:
+                    cached = self._delta_sets[path] = (delta_trigrams, set(delta_trigrams))
+                if not trigrams <= cached[1]:
+                    continue
+            paths.append(path)
+        return sorted(paths)
+
+    def search(
+        self,
+        pattern: str,
+        regex: bool = False,
+        case_sensitive: bool = True,
+        path_glob: str | None = None,
+        max_results: int = 50,
+    ) -> SearchResult:
+        """
+        Finds lines matching a literal or regex pattern, definitions first.
+
+        Raises:
+            re.error: The pattern is not a valid regular expression.
+        """
+        start = time.perf_counter()
+        compiled = re.compile(pattern if regex else re.escape(pattern), 0 if case_sensitive else re.IGNORECASE)
+        with self.lock:
+            self.refresh()
+            # The index folds ASCII case only, so non-ASCII case-insensitive queries can't be filtered.
+            trigrams = query_trigrams(pattern, regex) if case_sensitive or pattern.isascii() else set()
+            paths = self.candidates(trigrams)
+            files_indexed = len(self._files) - len(self._stale) + len(self._delta)
+        if path_glob:
+            paths = [p for p in paths if fnmatch.fnmatch(p, path_glob) or fnmatch.fnmatch(os.path.basename(p), path_glob)]
+
+        # Confirm matches; stop early once there are plenty to rank.
+        per_file, total, complete = [], 0, True
+        for path in paths:
+            if total >= max_results * 4:
+                complete = False
+                break
+            try:
+                with open(os.path.join(self.root, path), "r", encoding="utf-8", errors="replace") as f:
+                    text = f.read()
+            except OSError:
+                continue
+            matches, line_no, pos, last_line = [], 1, 0, 0
+            for m in compiled.finditer(text):
+                line_no += text.count("\n", pos, m.start())
+                pos = m.start()
+                if line_no == last_line:
+                    continue
+                last_line = line_no
+                line_start = text.rfind("\n", 0, pos) + 1
+                line_end = text.find("\n", pos)
+                line = text[line_start:line_end if line_end != -1 else len(text)]
+                matches.append(SearchMatch(path, line_no, line.strip()[:SEARCH_SNIPPET_LEN], bool(_DEFINITION_LINE.match(line))))
+            if matches:
+                per_file.append(matches)
+                total += len(matches)
+
+        def score(matches: list[SearchMatch]) -> tuple:
+            definitions = sum(m.is_definition for m in matches)
+            return (-definitions, -min(len(matches), 5), matches[0].path.count("/"), matches[0].path)
+
+        ranked = []
+        for matches in sorted(per_file, key=score):
+            ranked.extend(sorted(matches, key=lambda m: (not m.is_definition, m.line)))
+        return SearchResult(
+            matches=ranked[:max_results],
+            total_matches=total,
+            files_matched=len(per_file),
+            candidates=len(paths),
+            files_indexed=files_indexed,
+            complete=complete,
+            elapsed=time.perf_counter() - start,
+        )
+
+
+_INDEXES: dict[str, CodeSearchIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_search_index(root_path: str = ".") -> CodeSearchIndex:
+    """Returns the process-wide CodeSearchIndex for a project root, loading it on first use."""
+    root = os.path.abspath(root_path)
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(root)
+        if index is None:
+            index = _INDEXES[root] = CodeSearchIndex(root)
+        return index
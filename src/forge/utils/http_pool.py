@@ -0,0 +1,396 @@
+"""
+Shared HTTP connections, timeouts, retries and concurrency limits for model providers.
+
+Every chat model of a provider (the main model and the router model, in
+every thread and batch task) sends its requests through one
+`ProviderPool`, which:
+
+- keeps a pool of keep-alive connections instead of one client per model;
+- retries timeouts, dropped connections and retryable statuses (408, 409,
+  429, 5xx, 529) with jittered exponential backoff, waiting as long as the
+  server's Retry-After asks instead when it sends one;
+- lets at most `max_concurrency` requests run at once, process-wide; a
+  response holds its slot until its body (or stream) is closed;
+- on a throttled response (429, 503 or 529) with Retry-After, pauses the
+  whole provider for that long, so concurrent requests wait instead of
+  hitting the limit in turn.
+
+The SDKs' own retries are turned off in favor of these (see
+`provider_client_kwargs`).
+"""
+import time
+import types
+import random
+import asyncio
+import logging
+import functools
+import importlib
+import threading
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+from .tracing import TRACER
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504, 529}
+# Statuses that mean "slow down" rather than "something broke".
+THROTTLE_STATUSES = {429, 503, 529}
+
+
+@dataclass
+class HttpOptions:
+    timeout_s: float = 120.0
+    connect_timeout_s: float = 10.0
+    max_connections: int = 20
+    max_keepalive: int = 10
+    keepalive_s: float = 60.0
+    max_retries: int = 4
+    backoff_base_s: float = 0.5
+    backoff_max_s: float = 30.0
+    max_concurrency: int = 8
+
+    @classmethod
+    def from_config(cls, cfg) -> "HttpOptions":
+        return cls(
+            timeout_s=cfg.http_timeout_s,
+            connect_timeout_s=cfg.http_connect_timeout_s,
+            max_connections=cfg.http_max_connections,
+            max_keepalive=cfg.http_max_keepalive,
+            keepalive_s=cfg.http_keepalive_s,
+            max_retries=cfg.http_max_retries,
+            backoff_base_s=cfg.http_backoff_base_s,
+            backoff_max_s=cfg.http_backoff_max_s,
+            max_concurrency=cfg.provider_max_concurrency,
+        )
+
+
+class ConcurrencyLimiter:
+    """
+    A counting semaphore shared by threads and event loops, which can also
+    be paused: `pause(seconds)` holds back every acquire until it expires.
+    """
+
+    def __init__(self, limit: int = 0):
+        self.limit = limit
+        self.active = 0
+        self.paused_until = 0.0
+        self._cond = threading.Condition()
+
+    def _try_acquire(self) -> float:
+        """Takes a slot and returns 0, or returns how long to wait before trying again."""
+        with self._cond:
+            wait = self.paused_until - time.monotonic()
+            if wait > 0:
+                return wait
+            if self.limit <= 0 or self.active < self.limit:
+                self.active += 1
+                return 0.0
+            return -1.0
+
+    def acquire(self):
+        with self._cond:
+            while (wait := self._try_acquire()) != 0:
+                self._cond.wait(wait if wait > 0 else None)
+
+    async def aacquire(self):
+        # Polling, so that a cancelled task never leaves a slot taken by a waiting thread.
+        delay = 0.005
+        while (wait := self._try_acquire()) != 0:
+            await asyncio.sleep(wait if wait > 0 else delay)
+            delay = min(delay * 2, 0.1)
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+    def pause(self, seconds: float):
+        with self._cond:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+def retry_after(response: httpx.Response) -> float | None:
+    """Seconds the server asks to wait, from retry-after-ms or Retry-After (seconds or an HTTP date)."""
+    value = response.headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = response.headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class _ReleasingStream:
+    """A response body that gives back its limiter slot once closed."""
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        yield from self._stream
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    def _done(self):
+        release, self._release = self._release, None
+        if release is not None:
+            release()
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            self._done()
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._done()
+
+
+class _RetryingTransport:
+    """
+    The sync and async httpx transport of a ProviderPool: the pool's
+    retries and concurrency limit around a pooled HTTPTransport. Built for
+    a given httpx module by `ProviderPool.transport`.
+    """
+
+    http = httpx  # the httpx module of the SDK this transport serves
+    stream_class = _ReleasingStream
+
+    def __init__(self, pool: "ProviderPool"):
+        self.pool = pool
+        self.retry_errors = (self.http.TimeoutException, self.http.NetworkError, self.http.RemoteProtocolError)
+        self._sync = self.http.HTTPTransport(limits=pool.limits(self.http))
+        self._async = None
+
+    def _async_transport(self):
+        # Created on first async use, so sync-only processes never build it.
+        if self._async is None:
+            self._async = self.http.AsyncHTTPTransport(limits=self.pool.limits(self.http))
+        return self._async
+
+    def _should_retry(self, attempt: int, response) -> bool:
+        if attempt > self.pool.options.max_retries:
+            return False
+        if response is None:
+            return True
+        if response.headers.get("x-should-retry") in ("true", "false"):
+            return response.headers["x-should-retry"] == "true"
+        return response.status_code in RETRY_STATUSES
+
+    def handle_request(self, request):
+        request.read()  # the body is sent again on retry
+        limiter = self.pool.limiter
+        attempt = 0
+        while True:
+            attempt += 1
+            limiter.acquire()
+            response = error = None
+            try:
+                response = self._sync.handle_request(request)
+            except self.retry_errors as e:
+                limiter.release()
+                if not self._should_retry(attempt, None):
+                    raise
+                error = e
+            except BaseException:
+                limiter.release()
+                raise
+            if response is not None:
+                if not self._should_retry(attempt, response):
+                    response.stream = self.stream_class(response.stream, limiter.release)
+                    return response
+                response.close()
+                limiter.release()
+            time.sleep(self.pool.backoff(request, attempt, response, error))
+
+    async def handle_async_request(self, request):
+        await request.aread()
+        transport = self._async_transport()
+        limiter = self.pool.limiter
+        attempt = 0
+        while True:
+            attempt += 1
+            await limiter.aacquire()
+            response = error = None
+            try:
+                response = await transport.handle_async_request(request)
+            except self.retry_errors as e:
+                limiter.release()
+                if not self._should_retry(attempt, None):
+                    raise
+                error = e
+            except BaseException:
+                limiter.release()
+                raise
+            if response is not None:
+                if not self._should_retry(attempt, response):
+                    response.stream = self.stream_class(response.stream, limiter.release)
+                    return response
+                await response.aclose()
+                limiter.release()
+            await asyncio.sleep(self.pool.backoff(request, attempt, response, error))
+
+    def close(self):
+        self._sync.close()
+
+    async def aclose(self):
+        self._sync.close()
+        if self._async is not None:
+            await self._async.aclose()
+
+
+@functools.cache
+def _transport_class(http) -> type:
+    """_RetryingTransport for an httpx module: SDKs check that transports and streams come from their own module."""
+    stream_class = type("_ReleasingStream", (_ReleasingStream, http.SyncByteStream, http.AsyncByteStream), {})
+    return type(
+        "RetryingTransport",
+        (_RetryingTransport, http.BaseTransport, http.AsyncBaseTransport),
+        {"http": http, "stream_class": stream_class},
+    )
+
+
+def sdk_httpx(client_class) -> types.ModuleType:
+    """The httpx module (httpx, or a fork such as httpx2) an SDK's DefaultHttpxClient is built on."""
+    for cls in client_class.__mro__:
+        root = cls.__module__.partition(".")[0]
+        if root.startswith("httpx"):
+            return importlib.import_module(root)
+    return httpx
+
+
+class ProviderPool:
+    """The connection pools, retry policy and concurrency limit of one provider."""
+
+    def __init__(self, provider: str, options: HttpOptions):
+        self.provider = provider
+        self.options = options
+        self.limiter = ConcurrencyLimiter(options.max_concurrency)
+        self.retries = 0
+        self._transports = {}
+        self._lock = threading.Lock()
+
+    def limits(self, http):
+        options = self.options
+        return http.Limits(
+            max_connections=options.max_connections or None,
+            max_keepalive_connections=options.max_keepalive,
+            keepalive_expiry=options.keepalive_s,
+        )
+
+    def timeout(self, http):
+        return http.Timeout(self.options.timeout_s, connect=self.options.connect_timeout_s)
+
+    def transport(self, http=httpx):
+        """The pool's transport (sync and async) for an httpx module, shared by every client of the provider."""
+        with self._lock:
+            if http not in self._transports:
+                self._transports[http] = _transport_class(http)(self)
+            return self._transports[http]
+
+    def client(self, http=httpx, **kwargs):
+        return http.Client(transport=self.transport(http), timeout=self.timeout(http), **kwargs)
+
+    def async_client(self, http=httpx, **kwargs):
+        return http.AsyncClient(transport=self.transport(http), timeout=self.timeout(http), **kwargs)
+
+    def backoff(self, request, attempt: int, response, error) -> float:
+        """
+        Seconds to wait before retry `attempt` (1-based): the server's
+        Retry-After if it sends a reasonable one, else full-jitter
+        exponential backoff. The retry is logged and traced.
+        """
+        options = self.options
+        asked = retry_after(response) if response is not None else None
+        if asked is not None and asked <= options.backoff_max_s * 2:
+            if response.status_code in THROTTLE_STATUSES:
+                self.limiter.pause(asked)
+            delay = asked + random.uniform(0, 0.1 * max(asked, 1.0))
+        else:
+            delay = random.uniform(0, min(options.backoff_max_s, options.backoff_base_s * 2 ** (attempt - 1)))
+
+        self.retries += 1
+        reason = f"HTTP {response.status_code}" if response is not None else type(error).__name__
+        logger.warning("%s: retry %d in %.1fs after %s (%s)", self.provider, attempt, delay, reason, request.url.path)
+        TRACER.record(
+            "retry", self.provider, time.time(), delay, attempt=attempt,
+            status=response.status_code if response is not None else None,
+            error=type(error).__name__ if error is not None else None,
+        )
+        return delay
+
+
+_POOLS: dict[str, ProviderPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_provider_pool(provider: str, options: HttpOptions) -> ProviderPool:
+    """Returns the process-wide pool of a provider; it is rebuilt if `options` changed."""
+    with _POOLS_LOCK:
+        pool = _POOLS.get(provider)
+        if pool is None or pool.options != options:
+            pool = _POOLS[provider] = ProviderPool(provider, options)
+        return pool
+
+
+def provider_client_kwargs(style: str | None, pool: ProviderPool) -> dict:
+    """
+    Chat model constructor arguments that send a provider's requests through
+    `pool`, by the client style of its provider spec. Unknown styles
+    (third-party providers) get nothing and keep their SDK's defaults.
+    """
+    timeout_s = pool.options.timeout_s
+    if style == "openai":
+        import openai
+
+        http = sdk_httpx(openai.DefaultHttpxClient)
+        return {
+            "http_client": pool.client(http),
+            "http_async_client": pool.async_client(http),
+            "timeout": timeout_s,
+            "max_retries": 0,
+        }
+    if style == "gemini":
+        # google-genai builds both its sync and async clients from client_args; the transport serves both.
+        return {"client_args": {"transport": pool.transport(httpx)}, "timeout": timeout_s, "max_retries": 0}
+    if style == "anthropic":
+        return {"default_request_timeout": timeout_s, "max_retries": 0}
+    return {}
+
+
+def attach_clients(llm, style: str | None, pool: ProviderPool):
+    """
+    Installs pooled clients on a model whose constructor can't take them.
+
+    ChatAnthropic builds its SDK clients lazily from its own settings, so
+    they are built here first, the same way but on `pool`.
+    """
+    if style != "anthropic":
+        return
+    import anthropic
+
+    http = sdk_httpx(anthropic.DefaultHttpxClient)
+    params = {**llm._client_params, "max_retries": 0}
+    llm.__dict__["_client"] = anthropic.Client(**params, http_client=pool.client(http, base_url=params["base_url"]))
+    llm.__dict__["_async_client"] = anthropic.AsyncClient(
+        **params, http_client=pool.async_client(http, base_url=params["base_url"])
+    )
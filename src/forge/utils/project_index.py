@@ -0,0 +1,313 @@
+import os
+import re
+import json
+import fnmatch
+from typing import Iterator, NamedTuple, Pattern
+
+from ..config.config import ForgeConfig
+
+IGNORE_DIRS = {
+    # Forge's own state
+    ".forge",
+
+    # Python
+    "__pycache__", ".mypy_cache", ".pytest_cache", ".ruff_cache",
+    "venv", ".venv", "env", ".env", ".tox", ".coverage",
+
+    # Node / JS
+    "node_modules", "bower_components", ".npm", ".yarn",
+
+    # Java / JVM
+    "target", "build", ".gradle", ".idea",
+
+    # C / C++ / Rust / Go
+    "cmake-build-debug", "cmake-build-release", "out", "bin", "obj",
+    "cargo-target", "target", ".vs",
+
+    # Data / logs
+    "logs", "log", "tmp", "temp",
+
+    # Git / VCS
+    ".git", ".github", ".gitlab", ".svn", ".hg",
+
+    # Editors / IDEs
+    ".vscode", ".idea", ".DS_Store", "Thumbs.db"
+}
+
+IGNORE_FILES = {
+    # Metadata & system
+    ".gitignore", ".gitattributes", ".dockerignore",
+    ".DS_Store", "Thumbs.db",
+
+    # Build artifacts
+    "*.pyc", "*.pyo", "*.class", "*.o", "*.obj", "*.exe",
+    "*.dll", "*.so", "*.dylib",
+
+    # Lock files
+    "package-lock.json", "yarn.lock", "pnpm-lock.yaml",
+    "poetry.lock", "Pipfile.lock",
+
+    # Coverage / reports
+    "coverage.xml", "coverage.json", "lcov.info",
+
+    # Logs
+    "*.log"
+}
+
+# Exact names are checked with a set lookup; glob patterns are compiled once into a single regex.
+_IGNORE_FILE_NAMES = {p for p in IGNORE_FILES if not any(c in p for c in "*?[")}
+_IGNORE_FILE_GLOBS = re.compile(
+    "|".join(fnmatch.translate(p) for p in sorted(IGNORE_FILES - _IGNORE_FILE_NAMES))
+)
+
+
+class _IgnoreRule(NamedTuple):
+    base: str          # directory (relative to the root) holding the .gitignore
+    regex: Pattern
+    negate: bool
+    dir_only: bool
+
+
+def _translate_gitignore(pattern: str) -> Pattern:
+    """Compiles a single .gitignore pattern into a regex matched against '/'-separated paths."""
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+    out, i = [], 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 1:]:
+            end = pattern.index("]", i + 1)
+            body = pattern[i + 1:end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            out.append(f"[{body}]")
+            i = end + 1
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    prefix = "" if anchored else "(?:.*/)?"
+    return re.compile(prefix + "".join(out) + "(?:/.*)?$")
+
+
+def _parse_gitignore(path: str, base: str) -> list[_IgnoreRule]:
+    """Parses a .gitignore file into rules relative to `base`."""
+    rules = []
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return rules
+
+    for line in lines:
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        if negate or line.startswith("\\"):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if line:
+            rules.append(_IgnoreRule(base, _translate_gitignore(line), negate, dir_only))
+    return rules
+
+
+def _is_ignored(rel_path: str, is_dir: bool, rules: list[_IgnoreRule]) -> bool:
+    """Applies gitignore rules in order; the last matching rule wins."""
+    ignored = False
+    for rule in rules:
+        if rule.dir_only and not is_dir:
+            continue
+        sub_path = rel_path[len(rule.base) + 1:] if rule.base else rel_path
+        if rule.regex.match(sub_path):
+            ignored = not rule.negate
+    return ignored
+
+
+def _join(rel_dir: str, name: str) -> str:
+    return f"{rel_dir}/{name}" if rel_dir else name
+
+
+class ProjectIndex:
+    """
+    A persistent index of the project's files, stored in .forge/index.json.
+
+    Each directory is stored with its mtime and its filtered listing, and each
+    file with its size and mtime. A refresh re-stats every indexed directory
+    but only re-lists the ones whose mtime (or .gitignore) changed, so keeping
+    the index current costs one stat per directory rather than a full walk.
+    """
+    VERSION = 1
+
+    def __init__(self, root_path: str = ".", cache_path: str | os.PathLike | None = None):
+        self.root = os.path.abspath(root_path)
+        self.cache_path = cache_path if cache_path is not None else ForgeConfig.CONFIG_DIR / "index.json"
+        self._dirs: dict[str, dict] = {}
+        self._gitignore_cache: dict[str, tuple[list, list[_IgnoreRule]]] = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == self.VERSION and data.get("root") == self.root:
+            self._dirs = data.get("dirs", {})
+
+    def _save(self):
+        if not os.path.isdir(os.path.dirname(os.path.abspath(self.cache_path))):
+            return
+        tmp_path = f"{self.cache_path}.tmp"
+        try:
+            # json.dumps encodes in C; json.dump to a file streams through the pure-Python encoder.
+            data = json.dumps({"version": self.VERSION, "root": self.root, "dirs": self._dirs}, separators=(",", ":"))
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            pass
+
+    def _gitignore_rules(self, rel_dir: str, signature: list | None) -> list[_IgnoreRule]:
+        if signature is None:
+            return []
+        cached = self._gitignore_cache.get(rel_dir)
+        if cached is None or cached[0] != signature:
+            path = os.path.join(self.root, rel_dir, ".gitignore")
+            cached = (signature, _parse_gitignore(path, rel_dir))
+            self._gitignore_cache[rel_dir] = cached
+        return cached[1]
+
+    def _scan_dir(self, rel_dir: str, mtime_ns: int, gitignore_sig: list | None, rules: list[_IgnoreRule]) -> dict:
+        dirs, files = [], {}
+        try:
+            with os.scandir(os.path.join(self.root, rel_dir)) as it:
+                for entry in it:
+                    rel_path = _join(rel_dir, entry.name)
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if is_dir:
+                        if entry.name not in IGNORE_DIRS and not _is_ignored(rel_path, True, rules):
+                            dirs.append(entry.name)
+                        continue
+                    if entry.name in _IGNORE_FILE_NAMES or _IGNORE_FILE_GLOBS.match(entry.name):
+                        continue
+                    if _is_ignored(rel_path, False, rules):
+                        continue
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    files[entry.name] = [st.st_size, st.st_mtime_ns]
+        except OSError:
+            pass
+        dirs.sort()
+        return {
+            "mtime_ns": mtime_ns,
+            "gitignore": gitignore_sig,
+            "dirs": dirs,
+            "files": dict(sorted(files.items())),
+        }
+
+    def refresh(self) -> bool:
+        """
+        Brings the index up to date with the filesystem and persists it.
+
+        Returns:
+            True if any directory listing changed since the last refresh.
+        """
+        changed = False
+        seen = set()
+        # Each stack entry: (relative dir, inherited gitignore rules, force re-listing)
+        stack = [("", [], False)]
+        while stack:
+            rel_dir, inherited, force = stack.pop()
+            abs_dir = os.path.join(self.root, rel_dir)
+            try:
+                mtime_ns = os.stat(abs_dir).st_mtime_ns
+            except OSError:
+                continue
+            try:
+                st = os.stat(os.path.join(abs_dir, ".gitignore"))
+                gitignore_sig = [st.st_size, st.st_mtime_ns]
+            except OSError:
+                gitignore_sig = None
+
+            seen.add(rel_dir)
+            rules = inherited + self._gitignore_rules(rel_dir, gitignore_sig)
+            cached = self._dirs.get(rel_dir)
+            if cached is not None and cached.get("gitignore") != gitignore_sig:
+                # The ignore rules of this whole subtree may have changed.
+                force = True
+            if force or cached is None or cached["mtime_ns"] != mtime_ns:
+                record = self._scan_dir(rel_dir, mtime_ns, gitignore_sig, rules)
+                if cached is None or record["dirs"] != cached["dirs"] or record["files"].keys() != cached["files"].keys():
+                    changed = True
+                self._dirs[rel_dir] = record
+
+            for name in reversed(self._dirs[rel_dir]["dirs"]):
+                stack.append((_join(rel_dir, name), rules, force))
+
+        stale = self._dirs.keys() - seen
+        for rel_dir in stale:
+            del self._dirs[rel_dir]
+        changed = changed or bool(stale)
+        if changed:
+            self._save()
+        return changed
+
+    def iter_files(self, restat: bool = False) -> Iterator[tuple[str, int, int]]:
+        """
+        Yields (relative path, size, mtime_ns) for every indexed file, in sorted order.
+
+        Sizes and mtimes are those seen when the file's directory was last
+        listed. Editing a file in place does not change its directory's mtime,
+        so callers that need current stamps (content indexes) pass
+        restat=True to stat every file; files that vanished are skipped.
+        """
+        stack = [""]
+        while stack:
+            rel_dir = stack.pop()
+            record = self._dirs.get(rel_dir)
+            if record is None:
+                continue
+            for name, stamp in record["files"].items():
+                rel_path = _join(rel_dir, name)
+                if restat:
+                    try:
+                        st = os.stat(os.path.join(self.root, rel_path))
+                    except OSError:
+                        continue
+                    stamp[0], stamp[1] = st.st_size, st.st_mtime_ns
+                yield rel_path, stamp[0], stamp[1]
+            stack.extend(_join(rel_dir, name) for name in reversed(record["dirs"]))
+
+    def render_tree(self, max_depth: int = 3) -> str:
+        """Renders the indexed project as the tree string shown to the agent."""
+        tree_lines = []
+        stack = [("", 0)]
+        while stack:
+            rel_dir, depth = stack.pop()
+            record = self._dirs.get(rel_dir)
+            if record is None or depth >= max_depth:
+                continue
+            indent = "    " * depth
+            folder_name = os.path.basename(rel_dir) if rel_dir else (os.path.basename(self.root) or self.root)
+            tree_lines.append(f"{indent}📂 {folder_name}")
+            for name in record["files"]:
+                tree_lines.append(f"{indent}    📄 {name}")
+            stack.extend((_join(rel_dir, name), depth + 1) for name in reversed(record["dirs"]))
+        return "\n".join(tree_lines)
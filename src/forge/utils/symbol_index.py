@@ -0,0 +1,405 @@
+import os
+import ast
+import sqlite3
+import hashlib
+import threading
+import multiprocessing
+from typing import Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from ..config.config import ForgeConfig
+from .project_index import ProjectIndex
+
+SYMBOL_MAX_FILE_BYTES = 2_000_000
+SYMBOL_PARALLEL_MIN_FILES = 32
+
+# Parsers take the source text and return {"symbols": [...], "refs": [...]}:
+#   symbol: {"name", "qualname", "kind", "line", "end_line", "signature"?, "target"?}
+#   ref:    {"name", "line", "kind"}  (kind: "call", "import" or "use")
+SymbolParser = Callable[[str], dict]
+LANGUAGE_PARSERS: dict[str, SymbolParser] = {}
+
+
+def register_language(extensions: list[str], parser: SymbolParser):
+    """Registers a symbol parser for file extensions (e.g. [".js", ".ts"])."""
+    for ext in extensions:
+        LANGUAGE_PARSERS[ext.lower()] = parser
+
+
+class _PythonSymbolVisitor(ast.NodeVisitor):
+    def __init__(self):
+        self.symbols, self.refs = [], []
+        self._scope: list[tuple[str, str]] = []  # (name, kind) of enclosing classes/functions
+        self._seen_refs = set()
+
+    def _qualname(self, name: str) -> str:
+        return ".".join([n for n, _ in self._scope] + [name])
+
+    def _ref(self, name: str, line: int, kind: str):
+        key = (name, line, kind)
+        if key not in self._seen_refs:
+            self._seen_refs.add(key)
+            self.refs.append({"name": name, "line": line, "kind": kind})
+
+    def _define(self, node, kind: str, **extra):
+        self.symbols.append({
+            "name": node.name,
+            "qualname": self._qualname(node.name),
+            "kind": kind,
+            "line": node.lineno,
+            "end_line": getattr(node, "end_lineno", node.lineno),
+            **extra,
+        })
+
+    def visit_ClassDef(self, node: ast.ClassDef):
+        bases = ", ".join(ast.unparse(b) for b in node.bases)
+        self._define(node, "class", signature=f"class {node.name}({bases})" if bases else f"class {node.name}")
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        for base in node.bases + [k.value for k in node.keywords]:
+            self.visit(base)
+        self._scope.append((node.name, "class"))
+        for child in node.body:
+            self.visit(child)
+        self._scope.pop()
+
+    def _visit_function(self, node):
+        in_class = bool(self._scope) and self._scope[-1][1] == "class"
+        prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+        returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+        self._define(node, "method" if in_class else "function",
+                     signature=f"{prefix} {node.name}({ast.unparse(node.args)}){returns}")
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        self.visit(node.args)
+        if node.returns:
+            self.visit(node.returns)
+        self._scope.append((node.name, "function"))
+        for child in node.body:
+            self.visit(child)
+        self._scope.pop()
+
+    visit_FunctionDef = _visit_function
+    visit_AsyncFunctionDef = _visit_function
+
+    def _visit_assign_targets(self, node, targets):
+        if not self._scope or self._scope[-1][1] == "class":
+            for target in targets:
+                if isinstance(target, ast.Name):
+                    self.symbols.append({
+                        "name": target.id,
+                        "qualname": self._qualname(target.id),
+                        "kind": "variable",
+                        "line": node.lineno,
+                        "end_line": getattr(node, "end_lineno", node.lineno),
+                    })
+        self.generic_visit(node)
+
+    def visit_Assign(self, node: ast.Assign):
+        self._visit_assign_targets(node, node.targets)
+
+    def visit_AnnAssign(self, node: ast.AnnAssign):
+        self._visit_assign_targets(node, [node.target])
+
+    def visit_Import(self, node: ast.Import):
+        for alias in node.names:
+            bound = alias.asname or alias.name.split(".")[0]
+            self.symbols.append({
+                "name": bound, "qualname": self._qualname(bound), "kind": "import",
+                "line": node.lineno, "end_line": node.lineno, "target": alias.name,
+            })
+            self._ref(alias.name.split(".")[-1], node.lineno, "import")
+
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        module = "." * node.level + (node.module or "")
+        for alias in node.names:
+            bound = alias.asname or alias.name
+            self.symbols.append({
+                "name": bound, "qualname": self._qualname(bound), "kind": "import",
+                "line": node.lineno, "end_line": node.lineno, "target": f"{module}.{alias.name}",
+            })
+            self._ref(alias.name, node.lineno, "import")
+
+    def visit_Call(self, node: ast.Call):
+        func = node.func
+        if isinstance(func, ast.Name):
+            self._ref(func.id, node.lineno, "call")
+        elif isinstance(func, ast.Attribute):
+            self._ref(func.attr, func.end_lineno or node.lineno, "call")
+            self.visit(func.value)
+        else:
+            self.visit(func)
+        for arg in node.args + [k.value for k in node.keywords]:
+            self.visit(arg)
+
+    def visit_Name(self, node: ast.Name):
+        if isinstance(node.ctx, ast.Load):
+            self._ref(node.id, node.lineno, "use")
+
+    def visit_Attribute(self, node: ast.Attribute):
+        if isinstance(node.ctx, ast.Load):
+            self._ref(node.attr, node.end_lineno or node.lineno, "use")
+        self.visit(node.value)
+
+
+def parse_python(source: str) -> dict:
+    """Extracts definitions, imports and references from Python source."""
+    visitor = _PythonSymbolVisitor()
+    visitor.visit(ast.parse(source))
+    return {"symbols": visitor.symbols, "refs": visitor.refs}
+
+
+register_language([".py", ".pyi"], parse_python)
+
+# Worker processes are spawned and import this module afresh, so they only
+# know these parsers; files of languages registered later are parsed in-process.
+_WORKER_LANGUAGES = frozenset(LANGUAGE_PARSERS)
+
+
+def _parse_source(ext: str, source: bytes) -> dict:
+    """Parses one file; runs in the worker processes, so it must stay a top-level function."""
+    try:
+        return LANGUAGE_PARSERS[ext](source.decode("utf-8", errors="replace"))
+    except Exception as e:  # a parser's failure on one file must not abort the refresh
+        return {"symbols": [], "refs": [], "error": f"{type(e).__name__}: {e}"}
+
+
+_REF_KINDS = {"call": "c", "import": "i", "use": "u"}
+_REF_KIND_NAMES = {v: k for k, v in _REF_KINDS.items()}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS parsed (id INTEGER PRIMARY KEY, hash TEXT UNIQUE, error TEXT);
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, parsed_id INTEGER);
+CREATE TABLE IF NOT EXISTS symbols (
+    parsed_id INTEGER, name TEXT, qualname TEXT, kind TEXT,
+    line INTEGER, end_line INTEGER, signature TEXT, target TEXT
+);
+CREATE TABLE IF NOT EXISTS refs (parsed_id INTEGER, name TEXT, lines TEXT);
+CREATE INDEX IF NOT EXISTS symbols_name ON symbols (name);
+CREATE INDEX IF NOT EXISTS symbols_parsed ON symbols (parsed_id);
+CREATE INDEX IF NOT EXISTS refs_name ON refs (name);
+CREATE INDEX IF NOT EXISTS refs_parsed ON refs (parsed_id);
+CREATE INDEX IF NOT EXISTS files_parsed ON files (parsed_id);
+"""
+
+
+def _symbol_from_row(row) -> dict:
+    name, qualname, kind, line, end_line, signature, target = row
+    symbol = {"name": name, "qualname": qualname, "kind": kind, "line": line, "end_line": end_line}
+    if signature:
+        symbol["signature"] = signature
+    if target:
+        symbol["target"] = target
+    return symbol
+
+
+class SymbolIndex:
+    """
+    A persistent index of definitions and references, stored in .forge/symbols.db.
+
+    Parse results are stored per content hash, and files map paths to
+    hashes. Files are tracked by size and mtime; a file whose stamp changed
+    is re-hashed and only re-parsed if its content is new, so touched or
+    checked-out-again files cost a read but no parse. Parsing many files at
+    once (the first build, a branch switch) is spread over a process pool.
+    Lookups are indexed queries, so nothing is loaded up front.
+    """
+    VERSION = 1
+
+    def __init__(self, root_path: str = ".", index_dir: str | os.PathLike | None = None):
+        self.root = os.path.abspath(root_path)
+        index_dir = index_dir if index_dir is not None else ForgeConfig.CONFIG_DIR
+        self.db_path = os.path.join(index_dir, "symbols.db")
+        self.project = ProjectIndex(root_path, cache_path=os.path.join(index_dir, "index.json"))
+        self.lock = threading.Lock()
+        self._conn = self._connect(os.path.isdir(index_dir))
+        self._files = {path: (size, mtime_ns, parsed_id) for path, size, mtime_ns, parsed_id in self._conn.execute(
+            "SELECT path, size, mtime_ns, parsed_id FROM files"
+        )}
+
+    def _connect(self, persistent: bool) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path if persistent else ":memory:", check_same_thread=False)
+        conn.executescript(_SCHEMA)
+        stored = dict(conn.execute("SELECT key, value FROM meta"))
+        expected = {"version": str(self.VERSION), "root": self.root}
+        if stored != expected:
+            with conn:
+                for table in ("meta", "files", "parsed", "symbols", "refs"):
+                    conn.execute(f"DELETE FROM {table}")
+                conn.executemany("INSERT INTO meta VALUES (?, ?)", expected.items())
+        return conn
+
+    def _parse_many(self, jobs: list[tuple[str, str, bytes]]) -> dict[str, dict]:
+        """Parses (content hash, extension, source) jobs, in a process pool when there are many."""
+        pooled = [job for job in jobs if job[1] in _WORKER_LANGUAGES]
+        results = {}
+        if len(pooled) >= SYMBOL_PARALLEL_MIN_FILES and (os.cpu_count() or 1) > 1:
+            try:
+                # Spawned, not forked: forking a process with running threads is unsafe.
+                with ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn")) as pool:
+                    parsed = pool.map(_parse_source, [j[1] for j in pooled], [j[2] for j in pooled], chunksize=16)
+                    results = {digest: result for (digest, _, _), result in zip(pooled, parsed)}
+            except (OSError, BrokenProcessPool):
+                results = {}  # no usable worker processes here: parse in-process
+        for digest, ext, source in jobs:
+            if digest not in results:
+                results[digest] = _parse_source(ext, source)
+        return results
+
+    def _store(self, digest: str, data: dict) -> int:
+        """Stores one parse result and returns its id. Symbols keep parser order via rowid."""
+        parsed_id = self._conn.execute(
+            "INSERT INTO parsed (hash, error) VALUES (?, ?)", (digest, data.get("error"))
+        ).lastrowid
+        self._conn.executemany(
+            "INSERT INTO symbols VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (parsed_id, sym["name"], sym["qualname"], sym["kind"], sym["line"], sym["end_line"],
+                 sym.get("signature"), sym.get("target"))
+                for sym in data["symbols"]
+            ],
+        )
+        lines: dict[str, list[str]] = {}
+        for ref in data["refs"]:
+            lines.setdefault(ref["name"], []).append(f"{_REF_KINDS[ref['kind']]}{ref['line']}")
+        self._conn.executemany(
+            "INSERT INTO refs VALUES (?, ?, ?)", [(parsed_id, name, ",".join(refs)) for name, refs in lines.items()]
+        )
+        return parsed_id
+
+    def refresh(self) -> bool:
+        """
+        Brings the index up to date with the project's files.
+
+        Returns:
+            True if any indexed file changed.
+        """
+        self.project.refresh()
+        current = {}
+        for path, size, mtime_ns in self.project.iter_files(restat=True):
+            ext = os.path.splitext(path)[1].lower()
+            if ext in LANGUAGE_PARSERS and size <= SYMBOL_MAX_FILE_BYTES:
+                current[path] = (size, mtime_ns, ext)
+
+        stamps, digests, jobs = {}, {}, {}
+        for path, (size, mtime_ns, ext) in current.items():
+            cached = self._files.get(path)
+            if cached is not None and cached[0] == size and cached[1] == mtime_ns:
+                continue
+            try:
+                with open(os.path.join(self.root, path), "rb") as f:
+                    source = f.read()
+            except OSError:
+                continue
+            digest = hashlib.sha1(source).hexdigest()
+            stamps[path], digests[path] = (size, mtime_ns), digest
+            if digest not in jobs:
+                jobs[digest] = (digest, ext, source)
+        removed = self._files.keys() - current.keys()
+        if not stamps and not removed:
+            return False
+
+        known = {}
+        for digest in jobs:
+            row = self._conn.execute("SELECT id FROM parsed WHERE hash = ?", (digest,)).fetchone()
+            if row:
+                known[digest] = row[0]
+        parsed = self._parse_many([job for digest, job in jobs.items() if digest not in known])
+
+        old_ids = {self._files[path][2] for path in removed}
+        old_ids.update(self._files[path][2] for path in stamps if path in self._files)
+        with self._conn:
+            for digest, data in parsed.items():
+                known[digest] = self._store(digest, data)
+            updates = {path: (*stamp, known[digests[path]]) for path, stamp in stamps.items()}
+            self._conn.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in removed])
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                [(path, *entry) for path, entry in updates.items()],
+            )
+            # Drop parse results that no file refers to any more.
+            orphans = [
+                (parsed_id,) for parsed_id in old_ids
+                if self._conn.execute("SELECT 1 FROM files WHERE parsed_id = ? LIMIT 1", (parsed_id,)).fetchone() is None
+            ]
+            for table, column in (("parsed", "id"), ("symbols", "parsed_id"), ("refs", "parsed_id")):
+                self._conn.executemany(f"DELETE FROM {table} WHERE {column} = ?", orphans)
+
+        changed = bool(removed) or any(self._files.get(path, (0, 0, None))[2] != entry[2] for path, entry in updates.items())
+        for path in removed:
+            del self._files[path]
+        self._files.update(updates)
+        return changed
+
+    def find_definitions(self, symbol: str, kind: str | None = None) -> list[tuple[str, dict]]:
+        """
+        Finds definitions by name ("save") or dotted qualified name ("ForgeConfig.save").
+
+        Imports are only returned when kind="import" is asked for explicitly.
+        """
+        name = symbol.rsplit(".", 1)[-1]
+        with self.lock:
+            self.refresh()
+            rows = self._conn.execute(
+                "SELECT f.path, s.name, s.qualname, s.kind, s.line, s.end_line, s.signature, s.target "
+                "FROM symbols s JOIN files f ON f.parsed_id = s.parsed_id WHERE s.name = ?",
+                (name,),
+            ).fetchall()
+        matches = []
+        for path, *row in rows:
+            sym = _symbol_from_row(row)
+            qualname = sym["qualname"]
+            if "." in symbol and qualname != symbol and not qualname.endswith("." + symbol):
+                continue
+            if (kind and sym["kind"] != kind) or (not kind and sym["kind"] == "import"):
+                continue
+            matches.append((path, sym))
+        return sorted(matches, key=lambda m: (m[1]["kind"] == "variable", m[0], m[1]["line"]))
+
+    def find_references(self, symbol: str) -> list[tuple[str, dict]]:
+        """Finds call sites, imports and other uses of a name (the last part of a dotted name)."""
+        name = symbol.rsplit(".", 1)[-1]
+        with self.lock:
+            self.refresh()
+            rows = self._conn.execute(
+                "SELECT f.path, r.lines FROM refs r JOIN files f ON f.parsed_id = r.parsed_id WHERE r.name = ?", (name,)
+            ).fetchall()
+        refs = [
+            (path, {"name": name, "line": int(ref[1:]), "kind": _REF_KIND_NAMES[ref[0]]})
+            for path, lines in rows
+            for ref in lines.split(",")
+        ]
+        return sorted(refs, key=lambda r: (r[0], r[1]["line"]))
+
+    def outline(self, rel_path: str) -> dict | None:
+        """Returns the symbols (and parse error, if any) of one file, or None if it is not indexed."""
+        rel_path = os.path.relpath(os.path.abspath(rel_path), self.root).replace(os.sep, "/")
+        with self.lock:
+            self.refresh()
+            entry = self._files.get(rel_path)
+            if entry is None:
+                return None
+            parsed_id = entry[2]
+            (error,) = self._conn.execute("SELECT error FROM parsed WHERE id = ?", (parsed_id,)).fetchone() or (None,)
+            rows = self._conn.execute(
+                "SELECT name, qualname, kind, line, end_line, signature, target FROM symbols "
+                "WHERE parsed_id = ? ORDER BY rowid",
+                (parsed_id,),
+            ).fetchall()
+        return {"symbols": [_symbol_from_row(row) for row in rows], "error": error}
+
+
+_INDEXES: dict[str, SymbolIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_symbol_index(root_path: str = ".") -> SymbolIndex:
+    """Returns the process-wide SymbolIndex for a project root, loading it on first use."""
+    root = os.path.abspath(root_path)
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(root)
+        if index is None:
+            index = _INDEXES[root] = SymbolIndex(root)
+        return index
@@ -0,0 +1,88 @@
+"""
+Line input shared by the REPL and the tools that ask for approval.
+
+A single daemon thread owns stdin and hands each line to the oldest caller
+waiting for one, so that the asynchronous REPL can wait for input without
+blocking its event loop, and a prompt abandoned by a cancelled turn never
+swallows the next line the user types. Lines typed while nobody is waiting
+(type-ahead during a turn) are kept for the next prompt.
+"""
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import Future, CancelledError
+
+from rich.console import Console
+
+
+class LineReader:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters: deque[Future] = deque()
+        self._lines: deque[str | None] = deque()  # None marks end of input
+        self._thread: threading.Thread | None = None
+
+    def _run(self):
+        while True:
+            try:
+                line = input()
+            except EOFError:
+                line = None
+            except Exception:  # a closed or unusable stdin behaves like end of input
+                line = None
+            with self._lock:
+                while self._waiters and not self._waiters[0].set_running_or_notify_cancel():
+                    self._waiters.popleft()  # abandoned by a cancelled caller
+                if self._waiters:
+                    waiter = self._waiters.popleft()
+                    if line is None:
+                        waiter.set_exception(EOFError())
+                    else:
+                        waiter.set_result(line)
+                else:
+                    self._lines.append(line)
+            if line is None:
+                return
+
+    def request(self) -> Future:
+        """Returns a future for the next line; it raises EOFError at end of input."""
+        future = Future()
+        with self._lock:
+            if self._lines:
+                line = self._lines[0]
+                if line is None:  # end of input is sticky
+                    future.set_exception(EOFError())
+                else:
+                    self._lines.popleft()
+                    future.set_result(line)
+                return future
+            self._waiters.append(future)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="forge-stdin", daemon=True)
+                self._thread.start()
+        return future
+
+    def cancel_pending(self):
+        """Cancels every caller waiting for a line; blocked `ask` calls return ""."""
+        with self._lock:
+            for waiter in self._waiters:
+                waiter.cancel()
+            self._waiters.clear()
+
+    def ask(self, prompt: str = "", console: Console | None = None, markup: bool = False) -> str:
+        """Prints the prompt and blocks for a line; returns "" if cancelled or at end of input."""
+        if prompt:
+            (console or Console()).print(prompt, end="", markup=markup, highlight=False)
+        try:
+            return self.request().result()
+        except (CancelledError, EOFError):
+            return ""
+
+    async def aask(self, prompt: str = "", console: Console | None = None, markup: bool = False) -> str:
+        """Prints the prompt and waits for a line without blocking the event loop; raises EOFError at end of input."""
+        if prompt:
+            (console or Console()).print(prompt, end="", markup=markup, highlight=False)
+        return await asyncio.wrap_future(self.request())
+
+
+TERMINAL = LineReader()
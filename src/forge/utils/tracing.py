@@ -0,0 +1,240 @@
+"""
+Lightweight tracing of where a turn spends its time.
+
+Instrumented code records spans: a kind ("turn", "llm", "prepare", "tool",
+"approval" or "checkpoint"), a name (the model, tool or checkpoint
+operation), the conversation thread, the start time and duration, and
+attributes such as token counts, argument and result sizes, and cache
+hits. Spans are appended to .forge/traces.jsonl, one JSON object per line;
+the file is rotated to traces.jsonl.1 when it outgrows its size limit.
+With the optional `otel` extra installed, spans are also exported through
+OpenTelemetry (configured by the standard OTEL_* environment variables).
+
+`forge stats` reads the file back through `load_spans` and `summarize`.
+"""
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Iterator
+
+
+def _thread_id(config) -> str | None:
+    thread_id = ((config or {}).get("configurable") or {}).get("thread_id")
+    return None if thread_id is None else str(thread_id)
+
+
+class Tracer:
+    """Writes spans to a JSONL file; does nothing until configured with a path."""
+
+    def __init__(self):
+        self.path: str | None = None
+        self.max_bytes = 0
+        self.exporters: list[Callable[[dict], None]] = []
+        self._lock = threading.Lock()
+        self._file = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None or bool(self.exporters)
+
+    def configure(self, path: str | os.PathLike | None, max_bytes: int = 0, otel: bool = False):
+        """(Re)targets the tracer; a None path disables the file, and `otel` adds the OpenTelemetry exporter."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self.path = str(path) if path is not None else None
+            self.max_bytes = max_bytes
+            self.exporters = [_otel_exporter()] if otel else []
+
+    def record(self, kind: str, name: str, start: float, duration: float, thread_id: str | None = None, **attrs):
+        """Records a finished span; `start` is a Unix time and `duration` is in seconds."""
+        if not self.enabled:
+            return
+        span = {
+            "ts": round(start, 6),
+            "kind": kind,
+            "name": name,
+            "thread_id": thread_id,
+            "ms": round(duration * 1000, 3),
+            **{k: v for k, v in attrs.items() if v is not None},
+        }
+        for export in self.exporters:
+            try:
+                export(span)
+            except Exception:
+                pass  # tracing must never break a turn
+        if self.path is None:
+            return
+        line = json.dumps(span, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            try:
+                if self._file is None:
+                    self._file = open(self.path, "a", encoding="utf-8")
+                elif self.max_bytes and self._file.tell() + len(line) > self.max_bytes:
+                    self._file.close()
+                    os.replace(self.path, self.path + ".1")
+                    self._file = open(self.path, "a", encoding="utf-8")
+                self._file.write(line)
+                self._file.flush()
+            except OSError:
+                self._file = None
+
+    @contextmanager
+    def span(self, kind: str, name: str, config=None, thread_id: str | None = None, **attrs) -> Iterator[dict]:
+        """
+        Times the enclosed block as a span. Yields a dict of attributes the
+        block can add to; an exception sets `status` to "error".
+        """
+        if not self.enabled:
+            yield attrs
+            return
+        start, started = time.time(), time.perf_counter()
+        try:
+            yield attrs
+        except BaseException as e:
+            attrs.setdefault("status", "cancelled" if not isinstance(e, Exception) else "error")
+            raise
+        finally:
+            self.record(kind, name, start, time.perf_counter() - started, thread_id or _thread_id(config), **attrs)
+
+
+TRACER = Tracer()
+
+
+def _otel_exporter() -> Callable[[dict], None]:
+    """Re-emits each span as an OpenTelemetry span with its original timestamps."""
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    except ImportError:
+        raise ImportError(
+            "Exporting traces to OpenTelemetry requires 'opentelemetry-sdk'. Install it with `pip install forge-ai[otel]`."
+        ) from None
+
+    # Respect a provider the host application set up; otherwise export over OTLP/HTTP.
+    if not isinstance(trace.get_tracer_provider(), TracerProvider):
+        provider = TracerProvider()
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        trace.set_tracer_provider(provider)
+    tracer = trace.get_tracer("forge")
+
+    def export(span: dict):
+        start_ns = int(span["ts"] * 1e9)
+        attributes = {
+            f"forge.{key}": value
+            for key, value in span.items()
+            if key not in ("ts", "ms") and isinstance(value, (str, bool, int, float))
+        }
+        otel_span = tracer.start_span(f"{span['kind']} {span['name']}", start_time=start_ns, attributes=attributes)
+        otel_span.end(end_time=start_ns + int(span["ms"] * 1e6))
+
+    return export
+
+
+def load_spans(path: str | os.PathLike) -> Iterator[dict]:
+    """Reads spans from a trace file and its rotated predecessor, oldest first, skipping unreadable lines."""
+    for candidate in (f"{path}.1", str(path)):
+        if not os.path.exists(candidate):
+            continue
+        with open(candidate, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    span = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(span, dict) and "kind" in span:
+                    yield span
+
+
+def percentile(values: list[float], q: float) -> float:
+    """The nearest-rank percentile (q in 0-100) of `values`; 0 for no values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = int(-(-len(ordered) * q // 100))
+    return ordered[min(len(ordered) - 1, max(0, rank - 1))]
+
+
+def _latency(durations: list[float]) -> dict[str, Any]:
+    return {
+        "count": len(durations),
+        "p50_ms": round(percentile(durations, 50), 1),
+        "p95_ms": round(percentile(durations, 95), 1),
+        "total_s": round(sum(durations) / 1000, 2),
+    }
+
+
+def summarize(spans: Iterable[dict]) -> dict[str, dict[str, dict[str, Any]]]:
+    """
+    Aggregates spans into latency percentiles and token counts by span kind,
+    by conversation thread (turn latency and model tokens), by tool
+    (latency, cache hits, result size, and time spent waiting for approval),
+    and for model routing (router replies kept and discarded, and what the
+    discarded ones cost).
+    """
+    by_kind: dict[str, list[float]] = {}
+    threads: dict[str, dict] = {}
+    tools: dict[str, dict] = {}
+    routing = {"router_kept": [], "router_discarded": [], "discarded_tokens": 0}
+    for span in spans:
+        kind, ms = span["kind"], span.get("ms", 0.0)
+        by_kind.setdefault(f"{kind} {span.get('name', '')}".strip() if kind in ("checkpoint", "llm") else kind, []).append(ms)
+        thread = threads.setdefault(
+            span.get("thread_id") or "-", {"turns": [], "llm": [], "input_tokens": 0, "output_tokens": 0, "cache_read": 0}
+        )
+        if kind == "turn":
+            thread["turns"].append(ms)
+        elif kind == "llm":
+            thread["llm"].append(ms)
+            for key in ("input_tokens", "output_tokens", "cache_read"):
+                thread[key] += span.get(key, 0) or 0
+            if span.get("route") == "router":
+                routing["router_discarded" if span.get("discarded") else "router_kept"].append(ms)
+                if span.get("discarded"):
+                    routing["discarded_tokens"] += (span.get("input_tokens") or 0) + (span.get("output_tokens") or 0)
+        elif kind in ("tool", "approval"):
+            tool = tools.setdefault(span["name"], {"calls": [], "approval_ms": 0.0, "cached": 0, "result_bytes": 0, "errors": 0})
+            if kind == "approval":
+                tool["approval_ms"] += ms
+                continue
+            tool["calls"].append(ms)
+            tool["cached"] += bool(span.get("cached"))
+            tool["errors"] += span.get("status") == "error"
+            tool["result_bytes"] += span.get("result_bytes", 0) or 0
+
+    return {
+        "kinds": {kind: _latency(durations) for kind, durations in sorted(by_kind.items())},
+        "threads": {
+            thread_id: {
+                "turns": _latency(t["turns"]),
+                "llm": _latency(t["llm"]),
+                "input_tokens": t["input_tokens"],
+                "output_tokens": t["output_tokens"],
+                "cache_read": t["cache_read"],
+            }
+            for thread_id, t in threads.items()
+            if t["turns"] or t["llm"]
+        },
+        "tools": {
+            name: {
+                **_latency(t["calls"]),
+                "cache_hits": t["cached"],
+                "errors": t["errors"],
+                # What the results cost in context, at the 4 bytes per token the history budget estimates with.
+                "result_tokens": t["result_bytes"] // 4,
+                "approval_wait_s": round(t["approval_ms"] / 1000, 2),
+            }
+            for name, t in sorted(tools.items())
+            if t["calls"]
+        },
+        "routing": {
+            "router_kept": _latency(routing["router_kept"]),
+            "router_discarded": _latency(routing["router_discarded"]),
+            "discarded_tokens": routing["discarded_tokens"],
+        } if routing["router_kept"] or routing["router_discarded"] else {},
+    }
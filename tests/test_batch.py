@@ -0,0 +1,54 @@
+import io
+import json
+import asyncio
+
+from langchain_core.messages import AIMessage
+
+from forge.agent.batch import BatchTask, TaskResult, read_tasks, run_batch
+
+
+def test_read_tasks_parses_lines_and_reports_bad_ones():
+    lines = ['{"prompt": "a", "id": "x"}', "", '"b"', '{"id": "y"}', "not json", '{"prompt": "c", "thread_id": "t"}']
+    items = list(read_tasks(lines, "run"))
+    assert items[0] == BatchTask("x", "a", "batch-run-x")
+    assert items[1] == BatchTask("3", "b", "batch-run-3")
+    assert isinstance(items[2], TaskResult) and items[2].status == "error" and items[2].id == "4"
+    assert isinstance(items[3], TaskResult) and items[3].error.startswith("line 5:")
+    assert items[4] == BatchTask("6", "c", "t")
+
+
+def test_read_tasks_rejects_duplicate_ids():
+    items = list(read_tasks(['{"prompt": "a", "id": "x"}', '{"prompt": "b", "id": "x"}'], "run"))
+    assert isinstance(items[0], BatchTask)
+    assert items[1].status == "error" and "duplicate id 'x'" in items[1].error
+
+
+class FakeGraph:
+    """Streams one AI reply per task, tracking how many tasks run on each thread at once."""
+
+    def __init__(self):
+        self.active: dict[str, int] = {}
+        self.overlaps = 0
+        self.order: list[str] = []
+
+    async def astream(self, inputs, config, stream_mode):
+        thread_id = config["configurable"]["thread_id"]
+        self.active[thread_id] = self.active.get(thread_id, 0) + 1
+        self.overlaps += self.active[thread_id] > 1
+        self.order.append(inputs["messages"][0].content)
+        await asyncio.sleep(0.01)
+        self.active[thread_id] -= 1
+        yield "updates", {"chat_node": {"messages": [AIMessage(content=f"done {inputs['messages'][0].content}")]}}
+
+
+def test_run_batch_serializes_tasks_that_share_a_thread():
+    graph = FakeGraph()
+    tasks = [BatchTask(str(i), f"p{i}", "shared" if i % 2 else f"own-{i}") for i in range(6)]
+    output = io.StringIO()
+    results = asyncio.run(run_batch(graph, tasks, output, concurrency=4))
+    assert graph.overlaps == 0
+    assert [p for p in graph.order if p in ("p1", "p3", "p5")] == ["p1", "p3", "p5"]
+    assert sorted(r.id for r in results) == [str(i) for i in range(6)]
+    assert all(r.status == "ok" and r.response == f"done p{r.id}" for r in results)
+    assert len(output.getvalue().splitlines()) == 6
+    assert json.loads(output.getvalue().splitlines()[0])["status"] == "ok"
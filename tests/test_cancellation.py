@@ -0,0 +1,87 @@
+import asyncio
+import threading
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.tools import tool
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import StateGraph, MessagesState, START, END
+
+from forge.agent.tool_runner import make_tool_node, with_cancel_event, CANCEL_EVENT
+from forge.agent.workflow import settle_cancelled_turn
+
+started = threading.Event()
+release = threading.Event()
+ran: list[str] = []
+
+
+@tool
+def slow_edit(path: str) -> str:
+    """Edits a file slowly."""
+    ran.append(f"slow_edit {path}")
+    started.set()
+    release.wait(5)
+    return "edited"
+
+
+@tool
+def other_edit(path: str) -> str:
+    """Edits another file."""
+    ran.append(f"other_edit {path}")
+    return "edited"
+
+
+def build_graph():
+    def chat(state):
+        calls = [
+            {"name": "slow_edit", "args": {"path": "a.py"}, "id": "c1"},
+            {"name": "other_edit", "args": {"path": "b.py"}, "id": "c2"},
+        ]
+        return {"messages": [AIMessage(content="", tool_calls=calls)]}
+
+    graph = StateGraph(MessagesState)
+    graph.add_node("chat_node", chat)
+    graph.add_node("tools", make_tool_node([slow_edit, other_edit], parallel_safe=set()))
+    graph.add_edge(START, "chat_node")
+    graph.add_edge("chat_node", "tools")
+    graph.add_edge("tools", END)
+    return graph.compile(checkpointer=InMemorySaver())
+
+
+def test_cancelled_turn_stops_further_calls_and_answers_pending_ones():
+    graph = build_graph()
+    config = with_cancel_event({"configurable": {"thread_id": "t"}})
+    started.clear(), release.clear(), ran.clear()
+
+    async def run():
+        turn = asyncio.create_task(graph.ainvoke({"messages": [HumanMessage(content="edit")]}, config))
+        await asyncio.to_thread(started.wait, 5)
+        turn.cancel()
+        await asyncio.gather(turn, return_exceptions=True)
+        await settle_cancelled_turn(graph, config)
+        release.set()
+        await asyncio.sleep(0.2)  # let the abandoned tools node finish its running call
+        return await graph.aget_state(config)
+
+    state = asyncio.run(run())
+    assert config["configurable"][CANCEL_EVENT].is_set()
+    assert ran == ["slow_edit a.py"]
+    results = state.values["messages"][-2:]
+    assert all(isinstance(m, ToolMessage) and m.status == "error" for m in results)
+    assert [m.tool_call_id for m in results] == ["c1", "c2"]
+    assert "effects are unknown" in results[0].content
+
+
+def test_settling_a_turn_without_pending_calls_changes_nothing():
+    graph = build_graph()
+    config = with_cancel_event({"configurable": {"thread_id": "t"}})
+    started.set(), release.set(), ran.clear()
+
+    async def run():
+        await graph.ainvoke({"messages": [HumanMessage(content="edit")]}, config)
+        before = await graph.aget_state(config)
+        await settle_cancelled_turn(graph, config)
+        return before, await graph.aget_state(config)
+
+    before, after = asyncio.run(run())
+    assert after.values["messages"] == before.values["messages"]
+    assert ran == ["slow_edit a.py", "other_edit b.py"]
@@ -0,0 +1,96 @@
+import time
+import uuid
+import sqlite3
+
+import pytest
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from forge.utils.checkpoint_gc import prune, checkpoint_time, _UUID_EPOCH_OFFSET
+
+
+def checkpoint_id(at: float, seq: int = 0) -> str:
+    """A version 6 UUID for Unix time `at`, like LangGraph's checkpoint ids."""
+    ticks = int(at * 1e7) + _UUID_EPOCH_OFFSET
+    value = (ticks >> 28) << 96 | ((ticks >> 12) & 0xFFFF) << 80 | 0x6 << 76 | (ticks & 0xFFF) << 64
+    return str(uuid.UUID(int=value | 0x8 << 60 | seq))
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    SqliteSaver(conn).setup()
+    yield conn
+    conn.close()
+
+
+def add_checkpoints(conn, thread_id: str, times: list[float], size: int = 10):
+    with conn:
+        for seq, at in enumerate(times):
+            cid = checkpoint_id(at, seq)
+            conn.execute(
+                "INSERT INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, type, checkpoint, metadata) "
+                "VALUES (?, '', ?, 'msgpack', ?, ?)",
+                (thread_id, cid, b"x" * size, b"{}"),
+            )
+            conn.execute(
+                "INSERT INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value) "
+                "VALUES (?, '', ?, 't', 0, 'messages', 'msgpack', ?)",
+                (thread_id, cid, b"w"),
+            )
+
+
+def threads(conn) -> dict[str, int]:
+    return dict(conn.execute("SELECT thread_id, COUNT(*) FROM checkpoints GROUP BY thread_id"))
+
+
+def test_checkpoint_time_reads_the_uuid6_timestamp():
+    at = time.time() - 3600
+    assert checkpoint_time(checkpoint_id(at)) == pytest.approx(at, abs=1e-3)
+
+
+def test_keep_last_prunes_old_checkpoints_and_their_writes(conn):
+    now = time.time()
+    add_checkpoints(conn, "a", [now - 30, now - 20, now - 10])
+    add_checkpoints(conn, "b", [now - 5])
+    stats = prune(conn, keep_last=1)
+    assert threads(conn) == {"a": 1, "b": 1}
+    assert stats.checkpoints == 2 and stats.writes == 2
+    (latest,) = conn.execute("SELECT checkpoint_id FROM checkpoints WHERE thread_id = 'a'").fetchone()
+    assert checkpoint_time(latest) == pytest.approx(now - 10, abs=1e-3)
+    assert conn.execute("SELECT COUNT(*) FROM writes").fetchone() == (2,)
+
+
+def test_max_age_deletes_idle_threads_except_protected(conn):
+    now = time.time()
+    add_checkpoints(conn, "old", [now - 10 * 86400])
+    add_checkpoints(conn, "resumed", [now - 9 * 86400])
+    add_checkpoints(conn, "fresh", [now - 60])
+    stats = prune(conn, max_age_days=7, protect=["resumed"])
+    assert set(threads(conn)) == {"resumed", "fresh"}
+    assert stats.threads == 1
+
+
+def test_max_bytes_evicts_least_recently_used_threads(conn):
+    now = time.time()
+    add_checkpoints(conn, "oldest", [now - 300], size=1000)
+    add_checkpoints(conn, "older", [now - 200], size=1000)
+    add_checkpoints(conn, "latest", [now - 100], size=1000)
+    prune(conn, max_bytes=2500)
+    assert set(threads(conn)) == {"older", "latest"}
+
+
+def test_max_bytes_skips_protected_threads_and_keeps_the_latest(conn):
+    now = time.time()
+    add_checkpoints(conn, "resumed", [now - 300], size=1000)
+    add_checkpoints(conn, "other", [now - 200], size=1000)
+    add_checkpoints(conn, "latest", [now - 100], size=1000)
+    prune(conn, max_bytes=1, protect=["resumed"])
+    assert set(threads(conn)) == {"resumed", "latest"}
+
+
+def test_disabled_policies_delete_nothing(conn):
+    now = time.time()
+    add_checkpoints(conn, "a", [now - 100 * 86400, now - 99 * 86400])
+    stats = prune(conn)
+    assert threads(conn) == {"a": 2}
+    assert (stats.checkpoints, stats.writes, stats.threads) == (0, 0, 0)
@@ -0,0 +1,98 @@
+import sqlite3
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import StateGraph, MessagesState, START, END
+
+from forge.config.config import ForgeConfig
+from forge.utils.checkpoint_gc import collect_garbage
+from forge.utils.checkpointer import DeltaSqliteSaver, sweep_messages
+
+
+def build_graph(saver):
+    def reply(state):
+        return {"messages": [AIMessage(content=f"reply {len(state['messages'])}")]}
+
+    graph = StateGraph(MessagesState)
+    graph.add_node("reply", reply)
+    graph.add_edge(START, "reply")
+    graph.add_edge("reply", END)
+    return graph.compile(checkpointer=saver)
+
+
+def open_saver(path):
+    return DeltaSqliteSaver(sqlite3.connect(path, check_same_thread=False))
+
+
+def chat(saver, thread_id, *texts):
+    graph = build_graph(saver)
+    config = {"configurable": {"thread_id": thread_id}}
+    for text in texts:
+        graph.invoke({"messages": [HumanMessage(content=text)]}, config)
+    return config
+
+
+def message_rows(path) -> int:
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM checkpoint_messages").fetchone()[0]
+
+
+def test_put_get_round_trip_stores_each_message_once(tmp_path):
+    path = tmp_path / "memory.db"
+    long_text = "x" * 2000  # compressed
+    config = chat(open_saver(path), "t", "hi", long_text)
+    # A fresh saver has nothing cached, so it decodes from the table.
+    messages = open_saver(path).get_tuple(config).checkpoint["channel_values"]["messages"]
+    assert [m.content for m in messages] == ["hi", "reply 1", long_text, "reply 3"]
+    assert [type(m) for m in messages] == [HumanMessage, AIMessage, HumanMessage, AIMessage]
+    assert message_rows(path) == 4
+
+
+def test_messages_deleted_by_gc_are_written_again(tmp_path):
+    path = tmp_path / "memory.db"
+    saver = open_saver(path)
+    config = chat(saver, "t", "hi")
+    with sqlite3.connect(path) as other:
+        other.execute("DELETE FROM checkpoint_messages")
+    chat(saver, "t", "again")
+    messages = open_saver(path).get_tuple(config).checkpoint["channel_values"]["messages"]
+    assert [m.content for m in messages] == ["hi", "reply 1", "again", "reply 3"]
+
+
+def test_gc_sweeps_messages_of_deleted_threads(tmp_path):
+    path = tmp_path / "memory.db"
+    saver = open_saver(path)
+    chat(saver, "a", "hi")
+    chat(saver, "b", "hello")
+    with sqlite3.connect(path) as conn:
+        conn.execute("DELETE FROM checkpoints WHERE thread_id = 'a'")
+    stats = collect_garbage(path)
+    assert stats.messages == 2
+    assert message_rows(path) == 2
+
+
+def test_clear_all_memory_drops_messages_and_gc_still_runs(tmp_path, monkeypatch):
+    path = tmp_path / "memory.db"
+    chat(open_saver(path), "t", "secret")
+    monkeypatch.setattr(ForgeConfig, "CONFIG_DB", path)
+    ForgeConfig.clear_all_memory()
+    with sqlite3.connect(path) as conn:
+        tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert not tables & {"checkpoints", "writes", "checkpoint_messages"}
+    assert collect_garbage(path).messages == 0
+
+
+def test_sweep_without_checkpoints_deletes_every_message(tmp_path):
+    path = tmp_path / "memory.db"
+    chat(open_saver(path), "t", "hi")
+    with sqlite3.connect(path) as conn:
+        conn.execute("DROP TABLE checkpoints")
+        assert sweep_messages(conn) == 2
+    assert message_rows(path) == 0
+
+
+def test_resumed_saver_keeps_history(tmp_path):
+    path = tmp_path / "memory.db"
+    chat(open_saver(path), "t", "one")
+    config = chat(open_saver(path), "t", "two")
+    messages = open_saver(path).get_tuple(config).checkpoint["channel_values"]["messages"]
+    assert [m.content for m in messages] == ["one", "reply 1", "two", "reply 3"]
@@ -0,0 +1,64 @@
+import pytest
+
+from forge.tools.tool_utils import _locate_edits, _apply_edits, _apply_unified_patch
+
+SOURCE = "def a():\n    return 1\n\n\ndef b():\n    return 2\n"
+
+
+def test_locate_edits_returns_sorted_spans():
+    spans = _locate_edits(SOURCE, [
+        {"search": "return 2", "replace": "return 20"},
+        {"search": "return 1", "replace": "return 10"},
+    ])
+    assert [SOURCE[start:end] for start, end, _ in spans] == ["return 1", "return 2"]
+
+
+@pytest.mark.parametrize("edit, message", [
+    ({"search": "", "replace": "x"}, "must not be empty"),
+    ({"search": "return 3", "replace": "x"}, "not found"),
+    ({"search": "    return", "replace": "x"}, "matches 2 locations"),
+])
+def test_locate_edits_rejects_empty_stale_and_ambiguous_searches(edit, message):
+    with pytest.raises(ValueError, match=message):
+        _locate_edits(SOURCE, [edit])
+
+
+def test_locate_edits_rejects_overlapping_edits():
+    with pytest.raises(ValueError, match="overlap"):
+        _locate_edits(SOURCE, [
+            {"search": "def a():\n    return 1", "replace": "x"},
+            {"search": "return 1\n\n", "replace": "y"},
+        ])
+
+
+def test_apply_edits_returns_content_and_a_patch_that_reproduces_it():
+    spans = _locate_edits(SOURCE, [{"search": "return 2", "replace": "return 20"}])
+    new_content, diff = _apply_edits(SOURCE, spans, filename="m.py")
+    assert new_content == SOURCE.replace("return 2", "return 20")
+    assert "-    return 2\n+    return 20\n" in diff
+    assert _apply_unified_patch(SOURCE, diff) == new_content
+
+
+def test_apply_unified_patch_at_stated_and_shifted_lines():
+    patch = "@@ -5,2 +5,2 @@\n def b():\n-    return 2\n+    return 20\n"
+    assert _apply_unified_patch(SOURCE, patch) == SOURCE.replace("return 2", "return 20")
+    # The same hunk still applies after lines were added above it.
+    shifted = "import os\n\n" + SOURCE
+    assert _apply_unified_patch(shifted, patch) == shifted.replace("return 2", "return 20")
+
+
+def test_apply_unified_patch_inserts_into_an_empty_file():
+    assert _apply_unified_patch("", "--- /dev/null\n+++ b/new.py\n@@ -0,0 +1,2 @@\n+x = 1\n+y = 2\n") == "x = 1\ny = 2\n"
+
+
+def test_apply_unified_patch_rejects_stale_and_ambiguous_hunks():
+    with pytest.raises(ValueError, match="does not match"):
+        _apply_unified_patch(SOURCE, "@@ -2,1 +2,1 @@\n-    return 3\n+    return 4\n")
+    with pytest.raises(ValueError, match="matches 2 locations"):
+        _apply_unified_patch(SOURCE, "@@ -9,1 +9,1 @@\n-\n+# gap\n")
+
+
+def test_apply_unified_patch_rejects_stray_lines_inside_a_hunk():
+    patch = "@@ -1,4 +1,4 @@\n a\n-b\n+B\noops\n c\n-d\n+D\n"
+    with pytest.raises(ValueError, match="line 5 .* is not context"):
+        _apply_unified_patch("a\nb\nc\nd\n", patch)
@@ -0,0 +1,173 @@
+import time
+import asyncio
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from forge.utils.http_pool import HttpOptions, ProviderPool, ConcurrencyLimiter, retry_after
+
+
+class StubServer:
+    """A local HTTP server answering from a script of (status, headers) replies, then 200s."""
+
+    def __init__(self):
+        self.script: list[tuple[int, dict]] = []
+        self.requests = 0
+        self.delay = 0.0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("content-length", 0)))
+                with stub._lock:
+                    stub.requests += 1
+                    stub.active += 1
+                    stub.max_active = max(stub.max_active, stub.active)
+                    status, headers = stub.script.pop(0) if stub.script else (200, {})
+                time.sleep(stub.delay)
+                body = b'{"ok": true}'
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("content-length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with stub._lock:
+                    stub.active -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1/chat"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubServer()
+    yield server
+    server.close()
+
+
+def make_pool(**options) -> ProviderPool:
+    defaults = {"max_retries": 3, "backoff_base_s": 0.01, "backoff_max_s": 2.0, "timeout_s": 5.0}
+    return ProviderPool("stub", HttpOptions(**{**defaults, **options}))
+
+
+def test_retries_retryable_statuses(stub):
+    stub.script = [(503, {}), (429, {}), (200, {})]
+    pool = make_pool()
+    with pool.client() as client:
+        response = client.post(stub.url, json={"q": 1})
+    assert response.status_code == 200
+    assert stub.requests == 3
+    assert pool.retries == 2
+    assert pool.limiter.active == 0
+
+
+def test_gives_up_after_max_retries(stub):
+    stub.script = [(500, {})] * 5
+    pool = make_pool(max_retries=2)
+    with pool.client() as client:
+        response = client.post(stub.url, json={})
+    assert response.status_code == 500
+    assert stub.requests == 3
+
+
+def test_does_not_retry_client_errors_or_when_told_not_to(stub):
+    stub.script = [(400, {}), (503, {"x-should-retry": "false"})]
+    pool = make_pool()
+    with pool.client() as client:
+        assert client.post(stub.url, json={}).status_code == 400
+        assert client.post(stub.url, json={}).status_code == 503
+    assert stub.requests == 2
+    assert pool.retries == 0
+
+
+def test_waits_as_long_as_retry_after_asks(stub):
+    stub.script = [(429, {"retry-after": "1"})]
+    pool = make_pool()
+    start = time.monotonic()
+    with pool.client() as client:
+        response = client.post(stub.url, json={})
+    assert response.status_code == 200
+    assert time.monotonic() - start >= 1.0
+    # A throttled response pauses the whole provider, not just the request that got it.
+    assert pool.limiter.paused_until > 0
+
+
+def test_retry_after_formats():
+    def parse(headers):
+        return retry_after(httpx.Response(429, headers=headers))
+
+    assert parse({"retry-after-ms": "1500"}) == 1.5
+    assert parse({"retry-after": "7"}) == 7.0
+    assert 25 <= parse({"retry-after": formatdate(time.time() + 30, usegmt=True)}) <= 30
+    assert parse({"retry-after": "soon"}) is None
+    assert parse({}) is None
+
+
+def test_retries_connection_errors():
+    pool = make_pool(max_retries=2, connect_timeout_s=0.5)
+    with pool.client() as client, pytest.raises(httpx.ConnectError):
+        client.post("http://127.0.0.1:9/v1/chat", json={})
+    assert pool.retries == 2
+    assert pool.limiter.active == 0
+
+
+def test_limits_concurrent_requests(stub):
+    stub.delay = 0.2
+    pool = make_pool(max_concurrency=2)
+    with pool.client() as client:
+        threads = [threading.Thread(target=client.post, args=(stub.url,), kwargs={"json": {}}) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert stub.requests == 6
+    assert stub.max_active == 2
+    assert pool.limiter.active == 0
+
+
+def test_limits_concurrent_async_requests(stub):
+    stub.delay = 0.2
+    pool = make_pool(max_concurrency=2)
+
+    async def run():
+        async with pool.async_client() as client:
+            responses = await asyncio.gather(*(client.post(stub.url, json={}) for _ in range(6)))
+        return [r.status_code for r in responses]
+
+    assert asyncio.run(run()) == [200] * 6
+    assert stub.max_active == 2
+    assert pool.limiter.active == 0
+
+
+def test_streamed_response_holds_its_slot_until_closed(stub):
+    pool = make_pool(max_concurrency=1)
+    with pool.client() as client:
+        with client.stream("POST", stub.url, json={}) as response:
+            assert response.status_code == 200
+            assert pool.limiter.active == 1
+            response.read()
+        assert pool.limiter.active == 0
+
+
+def test_paused_limiter_holds_back_acquires():
+    limiter = ConcurrencyLimiter(limit=0)
+    limiter.pause(0.3)
+    start = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - start >= 0.25
+    limiter.release()
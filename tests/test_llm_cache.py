@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from forge.agent.llm_cache import LLMResponseCache, LLMCacheMiss, model_id
+
+PROMPT = [SystemMessage(content="You are terse."), HumanMessage(content="What is 2 + 2?")]
+
+
+def fake_model(*replies: str) -> GenericFakeChatModel:
+    return GenericFakeChatModel(messages=iter([AIMessage(content=reply) for reply in replies]))
+
+
+def test_record_then_replay_serves_the_recorded_response(tmp_path):
+    path = tmp_path / "llm_cache.db"
+    recorder = LLMResponseCache("record", max_bytes=0, path=path)
+    model = fake_model("4", "four")
+    recorded = recorder.wrap(model, model_id(model))
+    assert recorded.invoke(PROMPT).content == "4"
+    # Recording always calls the model, and keeps the latest response.
+    assert recorded.invoke(PROMPT).content == "four"
+
+    replayer = LLMResponseCache("replay", max_bytes=0, path=path)
+    offline = fake_model()  # would raise StopIteration if it were ever called
+    replayed = replayer.wrap(offline, model_id(model))
+    response = replayed.invoke(PROMPT)
+    assert response.content == "four"
+    assert response.response_metadata["forge_cache"] == "hit"
+    assert response.id is None
+
+
+def test_replay_of_an_unrecorded_prompt_is_an_error(tmp_path):
+    replayer = LLMResponseCache("replay", max_bytes=0, path=tmp_path / "llm_cache.db")
+    model = fake_model("4")
+    with pytest.raises(LLMCacheMiss, match="No recorded response"):
+        replayer.wrap(model, model_id(model)).invoke(PROMPT)
+
+
+def test_cache_mode_serves_repeats_and_keys_on_the_prompt(tmp_path):
+    cache = LLMResponseCache("cache", max_bytes=1 << 20, path=tmp_path / "llm_cache.db")
+    model = fake_model("4", "6")
+    cached = cache.wrap(model, model_id(model))
+    assert cached.invoke(PROMPT).content == "4"
+    assert cached.invoke(PROMPT).content == "4"
+    assert cached.invoke(PROMPT[:1] + [HumanMessage(content="What is 3 + 3?")]).content == "6"
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_async_calls_share_the_cache(tmp_path):
+    cache = LLMResponseCache("cache", max_bytes=1 << 20, path=tmp_path / "llm_cache.db")
+    model = fake_model("4")
+    cached = cache.wrap(model, model_id(model))
+
+    async def run():
+        first = await cached.ainvoke(PROMPT)
+        second = await cached.ainvoke(PROMPT)
+        return first.content, second.content
+
+    assert asyncio.run(run()) == ("4", "4")
+    assert cache.hits == 1
+
+
+def test_recorded_entries_survive_eviction(tmp_path):
+    path = tmp_path / "llm_cache.db"
+    model = fake_model("recorded", "cached")
+    LLMResponseCache("record", max_bytes=0, path=path).wrap(model, model_id(model)).invoke(PROMPT)
+    cache = LLMResponseCache("cache", max_bytes=0, ttl_s=1e-9, path=path)
+    cache.wrap(model, model_id(model)).invoke([HumanMessage(content="other")])
+    keys = [row[0] for row in cache._conn.execute("SELECT key FROM responses")]
+    assert keys == [cache.key(model_id(model), PROMPT, {})]
+
+
+def test_invalid_mode_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="Invalid LLM cache mode"):
+        LLMResponseCache("off", max_bytes=0, path=tmp_path / "llm_cache.db")
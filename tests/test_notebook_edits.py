@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from forge.tools.tool_utils import _apply_cell_edits, _notebook_style, _dump_notebook
+
+
+def make_notebook():
+    return {
+        "cells": [
+            {"cell_type": "markdown", "id": "intro", "metadata": {}, "source": ["# Title"]},
+            {
+                "cell_type": "code", "id": "load", "metadata": {"tags": ["setup"]}, "execution_count": 1,
+                "source": ["import pandas as pd"], "outputs": [{"output_type": "stream", "name": "stdout", "text": ["ok"]}],
+            },
+            {"cell_type": "code", "id": "plot", "metadata": {}, "execution_count": 2, "source": ["df.plot()"], "outputs": []},
+        ],
+        "metadata": {},
+        "nbformat": 4,
+        "nbformat_minor": 5,
+    }
+
+
+def sources(cells):
+    return ["".join(cell["source"]) if isinstance(cell["source"], list) else cell["source"] for cell in cells]
+
+
+def test_replace_keeps_id_and_metadata_and_clears_outputs():
+    cells = _apply_cell_edits(make_notebook(), [{"action": "replace", "cell_id": "load", "source": "import numpy as np"}])
+    load = cells[1]
+    assert sources(cells) == ["# Title", "import numpy as np", "df.plot()"]
+    assert load["id"] == "load"
+    assert load["metadata"] == {"tags": ["setup"]}
+    assert load["outputs"] == [] and load["execution_count"] is None
+
+
+def test_unchanged_replace_keeps_the_cell_as_is():
+    notebook = make_notebook()
+    cells = _apply_cell_edits(notebook, [{"action": "replace", "cell_id": "load", "source": "import pandas as pd"}])
+    assert cells == notebook["cells"]
+
+
+def test_edits_target_cells_as_they_were_before_any_edit():
+    cells = _apply_cell_edits(make_notebook(), [
+        {"action": "delete", "index": 0},
+        {"action": "insert", "index": 2, "source": "df = load()"},
+        {"action": "replace", "index": 2, "source": "df.plot(kind='bar')"},
+        {"action": "insert", "source": "print('done')", "cell_type": "code"},
+    ])
+    assert sources(cells) == ["import pandas as pd", "df = load()", "df.plot(kind='bar')", "print('done')"]
+    inserted = cells[1]
+    assert inserted["cell_type"] == "code" and inserted["id"] not in ("intro", "load", "plot")
+
+
+@pytest.mark.parametrize("edit, message", [
+    ({"action": "replace", "cell_id": "missing", "source": "x"}, "no cell with id"),
+    ({"action": "delete", "index": 3}, "out of range"),
+    ({"action": "replace", "index": 0}, "needs a source"),
+    ({"action": "delete"}, "needs a cell_id or index"),
+    ({"action": "insert", "source": "x", "cell_type": "sql"}, "cell_type must be one of"),
+    ({"action": "move", "index": 0}, "action must be"),
+])
+def test_invalid_edits_raise(edit, message):
+    with pytest.raises(ValueError, match=message):
+        _apply_cell_edits(make_notebook(), [edit])
+
+
+def test_two_edits_of_one_cell_are_rejected():
+    with pytest.raises(ValueError, match="already changed"):
+        _apply_cell_edits(make_notebook(), [{"action": "delete", "index": 1}, {"action": "delete", "cell_id": "load"}])
+
+
+@pytest.mark.parametrize("indent, sort_keys", [(1, True), (2, False), (4, True)])
+def test_notebook_style_round_trips(indent, sort_keys):
+    text = json.dumps(make_notebook(), indent=indent, sort_keys=sort_keys, ensure_ascii=False) + "\n"
+    style = _notebook_style(json.loads(text), text)
+    assert style == {"indent": indent, "sort_keys": sort_keys}
+    assert _dump_notebook(json.loads(text), style) == text
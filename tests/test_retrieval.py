@@ -0,0 +1,47 @@
+from langchain_core.messages import AIMessage, HumanMessage
+
+from forge.agent.retrieval import Retriever
+from forge.utils.bm25_index import BM25Index
+
+
+def make_retriever(tmp_path, max_tokens=1000):
+    project = tmp_path / "project"
+    project.mkdir()
+    (project / "billing.py").write_text("def compute_invoice_total(items):\n    return sum(item.price for item in items)\n")
+    (project / "shipping.py").write_text("def shipping_label(address):\n    return address.upper()\n")
+    index = BM25Index(str(project), index_dir=tmp_path / "index")
+    return Retriever(index, top_k=4, max_tokens=max_tokens, token_counter=lambda m: len(m.content) // 4)
+
+
+def test_augments_the_latest_user_message_once(tmp_path):
+    retriever = make_retriever(tmp_path)
+    question = HumanMessage(content="How is the invoice total computed?", id="q")
+    history, augmented = retriever.augment([question])
+    assert augmented is not None and augmented.id == "q"
+    assert "billing.py" in augmented.content and "shipping.py" not in augmented.content
+    assert history == [augmented]
+    # Stored in the state, the augmented message is left alone on later calls.
+    again, stored = retriever.augment([augmented, AIMessage(content="Let me look.")])
+    assert stored is None and again[0] is augmented
+
+
+def test_pending_until_the_context_is_stored(tmp_path):
+    retriever = make_retriever(tmp_path)
+    question = HumanMessage(content="How is the invoice total computed?", id="q")
+    assert retriever.pending([question])
+    _, augmented = retriever.augment([question])
+    assert not retriever.pending([augmented, AIMessage(content="Let me look.")])
+    assert not retriever.pending([])
+
+
+def test_nothing_relevant_leaves_the_message_unchanged(tmp_path):
+    retriever = make_retriever(tmp_path)
+    question = HumanMessage(content="zzz qqq", id="q")
+    assert retriever.augment([question]) == ([question], None)
+    assert not retriever.pending([question])
+
+
+def test_chunks_over_the_budget_are_left_out(tmp_path):
+    retriever = make_retriever(tmp_path, max_tokens=5)
+    question = HumanMessage(content="How is the invoice total computed?", id="q")
+    assert retriever.augment([question]) == ([question], None)
@@ -0,0 +1,62 @@
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from forge.agent.prompt_cache import cache_usage
+from forge.agent.routing import ANSWER, ROUTER, ModelRouter, Route, discard, mark
+from forge.utils.tracing import summarize
+
+READ_ONLY = {"read_file", "search_code"}
+
+
+def call(name: str, call_id: str) -> AIMessage:
+    return AIMessage(content="", tool_calls=[{"name": name, "args": {}, "id": call_id}])
+
+
+def result(call_id: str) -> ToolMessage:
+    return ToolMessage(content="...", tool_call_id=call_id)
+
+
+def test_routes_by_the_last_step():
+    router = ModelRouter(READ_ONLY)
+    question = HumanMessage(content="Fix the bug")
+    assert router.route([question]).role == ANSWER
+    assert router.route([question, call("read_file", "1"), result("1")]).role == ROUTER
+    edit = router.route([question, call("propose_changes", "1"), result("1")])
+    assert edit.role == ANSWER and "propose_changes" in edit.reason
+
+
+def test_router_step_limit_counts_only_the_current_turn():
+    router = ModelRouter(READ_ONLY, max_router_steps=2)
+    routed = [mark(call("read_file", str(i)), Route(ROUTER, "")) for i in range(2)]
+    earlier = [HumanMessage(content="Earlier"), routed[0], result("0"), routed[1], result("1"), AIMessage(content="Done")]
+    now = [HumanMessage(content="Now"), call("search_code", "2"), result("2")]
+    assert router.route(earlier + now).role == ROUTER
+    limited = router.route(earlier[:-1])
+    assert limited.role == ANSWER and "limit" in limited.reason
+
+
+def test_router_replies_stand_only_when_they_read():
+    router = ModelRouter(READ_ONLY)
+    assert router.accepts(call("read_file", "1"))
+    assert not router.accepts(AIMessage(content="The answer"))
+    assert router.rejection_reason(call("execute_code", "1")) == "router called execute_code"
+
+
+def test_discarded_router_usage_is_counted():
+    usage = {"input_tokens": 100, "output_tokens": 10, "total_tokens": 110}
+    discarded = AIMessage(content="Hasty answer", usage_metadata=usage)
+    answer = discard(AIMessage(content="Answer", usage_metadata={**usage, "input_tokens": 120, "total_tokens": 130}), [discarded])
+    assert cache_usage([answer]) == {"input": 220, "output": 20, "cache_read": 0, "cache_write": 0}
+    assert discard(AIMessage(content="Answer"), []).response_metadata == {}
+
+
+def test_stats_report_kept_and_discarded_router_steps():
+    spans = [
+        {"kind": "llm", "name": "fast", "thread_id": "a", "ms": 100, "route": "router", "input_tokens": 50, "output_tokens": 5},
+        {"kind": "llm", "name": "fast", "thread_id": "a", "ms": 300, "route": "router", "discarded": True,
+         "input_tokens": 60, "output_tokens": 40},
+        {"kind": "llm", "name": "main", "thread_id": "a", "ms": 900, "route": "answer", "input_tokens": 70},
+    ]
+    routing = summarize(spans)["routing"]
+    assert routing["router_kept"]["count"] == 1
+    assert routing["router_discarded"]["p50_ms"] == 300
+    assert routing["discarded_tokens"] == 100
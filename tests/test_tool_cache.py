@@ -0,0 +1,89 @@
+import os
+
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, ToolMessage
+
+from forge.agent.history import HistoryManager, DEDUP_MIN_CHARS
+from forge.agent.tool_cache import ToolResultCache
+
+
+def test_serves_repeated_calls_until_the_file_changes(tmp_path):
+    path = tmp_path / "a.py"
+    path.write_text("x = 1\n")
+    cache = ToolResultCache(max_bytes=1 << 20, cache_dir=tmp_path)
+    calls = []
+
+    def run():
+        calls.append(1)
+        return path.read_text()
+
+    args = {"file_path": str(path)}
+    assert cache.call("read_file", args, run) == ("x = 1\n", False)
+    assert cache.call("read_file", args, run) == ("x = 1\n", True)
+    assert cache.call("read_file", {**args, "start_line": 2}, run) == ("x = 1\n", False)
+    path.write_text("x = 22\n")
+    os.utime(path, ns=(1, 1))
+    assert cache.call("read_file", args, run) == ("x = 22\n", False)
+    assert len(calls) == 3
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_errors_and_missing_files_are_not_cached(tmp_path):
+    path = tmp_path / "a.py"
+    path.write_text("x = 1\n")
+    cache = ToolResultCache(max_bytes=1 << 20, cache_dir=tmp_path)
+    args = {"file_path": str(path)}
+    cache.call("read_file", args, lambda: "[ToolError: boom]")
+    assert cache.call("read_file", args, lambda: "ok") == ("ok", False)
+    missing = {"file_path": str(tmp_path / "missing.py")}
+    cache.call("read_file", missing, lambda: "text")
+    assert cache.call("read_file", missing, lambda: "other") == ("other", False)
+
+
+def test_outputs_are_stored_once_and_evicted_least_recently_used(tmp_path):
+    cache = ToolResultCache(max_bytes=250, cache_dir=tmp_path)
+    for name in "abc":
+        (tmp_path / name).write_text(name)
+    key = {name: cache.key("read_file", {"file_path": str(tmp_path / name)}) for name in "abc"}
+    cache.put(key["a"], "same" * 25)
+    cache.put(key["b"], "same" * 25)
+    assert cache._conn.execute("SELECT COUNT(*) FROM blobs").fetchone() == (1,)
+    cache.put(key["c"], "other" * 40)
+    # 300 bytes in two blobs: both "same" entries go before their blob is freed.
+    assert cache.get(key["a"]) is None and cache.get(key["b"]) is None
+    assert cache.get(key["c"]) == "other" * 40
+
+
+def read(call_id: str, content: str, msg_id: str) -> list:
+    return [
+        AIMessage(content="", tool_calls=[{"name": "read_file", "args": {}, "id": call_id}], id=f"ai-{msg_id}"),
+        ToolMessage(content=content, tool_call_id=call_id, name="read_file", id=msg_id),
+    ]
+
+
+def make_history(**options) -> HistoryManager:
+    defaults = {"max_tokens": 100_000, "keep_turns": 2, "tool_output_max_tokens": 100_000, "summary_max_tokens": 10}
+    return HistoryManager(None, token_counter=lambda m: len(str(m.content)), **{**defaults, **options})
+
+
+def test_repeated_tool_output_is_replaced_by_a_reference():
+    text = "line\n" * DEDUP_MIN_CHARS
+    messages = [HumanMessage(content="q1", id="h1"), *read("c1", text, "t1"), HumanMessage(content="q2", id="h2"), *read("c2", text, "t2")]
+    history, update = make_history().prepare(messages, "")
+    (reference,) = update["messages"]
+    assert reference.id == "t1" and "tool call c2" in reference.content
+    assert history[2] is reference and history[-1].content == text
+
+
+def test_references_survive_summarizing_older_turns():
+    text = "line\n" * DEDUP_MIN_CHARS
+    messages = [
+        HumanMessage(content="q1", id="h1"), *read("c1", text, "t1"),
+        HumanMessage(content="q2", id="h2"), *read("c2", text, "t2"),
+        HumanMessage(content="q3", id="h3"), *read("c3", text, "t3"),
+    ]
+    history, update = make_history(max_tokens=len(text) + 60).prepare(messages, "")
+    removed = {m.id for m in update["messages"] if isinstance(m, RemoveMessage)}
+    kept = [m for m in update["messages"] if not isinstance(m, RemoveMessage)]
+    assert removed == {"h1", "ai-t1", "t1"}
+    assert [m.id for m in kept] == ["t2"] and "tool call c3" in kept[0].content
+    assert [m.id for m in history] == ["h2", "ai-t2", "t2", "h3", "ai-t3", "t3"]
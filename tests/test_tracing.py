@@ -0,0 +1,76 @@
+import pytest
+
+from forge.utils.tracing import Tracer, load_spans, percentile, summarize
+
+CONFIG = {"configurable": {"thread_id": 7}}
+
+
+def test_spans_are_written_with_their_attributes(tmp_path):
+    tracer = Tracer()
+    tracer.configure(tmp_path / "traces.jsonl")
+    with tracer.span("tool", "read_file", CONFIG, args_bytes=10) as span:
+        span.update(result_bytes=200, cached=None)
+    (recorded,) = load_spans(tmp_path / "traces.jsonl")
+    assert recorded["kind"] == "tool" and recorded["name"] == "read_file"
+    assert recorded["thread_id"] == "7"
+    assert recorded["args_bytes"] == 10 and recorded["result_bytes"] == 200
+    assert "cached" not in recorded and recorded["ms"] >= 0
+
+
+def test_failed_and_cancelled_blocks_are_marked(tmp_path):
+    tracer = Tracer()
+    tracer.configure(tmp_path / "traces.jsonl")
+    with pytest.raises(ValueError):
+        with tracer.span("tool", "bad"):
+            raise ValueError("boom")
+    with pytest.raises(KeyboardInterrupt):
+        with tracer.span("turn", "chat"):
+            raise KeyboardInterrupt
+    assert [span["status"] for span in load_spans(tmp_path / "traces.jsonl")] == ["error", "cancelled"]
+
+
+def test_unconfigured_tracer_writes_nothing(tmp_path):
+    tracer = Tracer()
+    with tracer.span("tool", "read_file", size=1) as span:
+        span.update(result_bytes=1)
+    assert not tracer.enabled
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_rotated_file_is_read_back_oldest_first(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer()
+    tracer.configure(path, max_bytes=300)
+    for i in range(10):
+        tracer.record("tool", f"t{i}", start=float(i), duration=0.001)
+    assert (tmp_path / "traces.jsonl.1").exists()
+    names = [span["name"] for span in load_spans(path)]
+    assert names == sorted(names) and names[-1] == "t9" and len(names) < 10
+    path.write_text(path.read_text() + "not json\n")
+    assert [span["name"] for span in load_spans(path)] == names
+
+
+def test_percentile_is_nearest_rank():
+    assert percentile([], 50) == 0.0
+    assert percentile([3, 1, 2], 50) == 2
+    assert percentile(list(range(1, 101)), 95) == 95
+
+
+def test_summarize_groups_by_thread_and_tool():
+    spans = [
+        {"kind": "turn", "name": "chat", "thread_id": "a", "ms": 100},
+        {"kind": "llm", "name": "model", "thread_id": "a", "ms": 80, "input_tokens": 50, "output_tokens": 5, "cache_read": 40},
+        {"kind": "tool", "name": "read_file", "thread_id": "a", "ms": 4, "cached": True, "result_bytes": 400},
+        {"kind": "tool", "name": "read_file", "thread_id": "a", "ms": 6, "status": "error", "result_bytes": 40},
+        {"kind": "approval", "name": "propose_changes", "thread_id": "a", "ms": 1500},
+        {"kind": "tool", "name": "propose_changes", "thread_id": "a", "ms": 1600},
+        {"kind": "checkpoint", "name": "put", "thread_id": "a", "ms": 2},
+    ]
+    stats = summarize(spans)
+    assert set(stats["kinds"]) == {"turn", "llm model", "tool", "approval", "checkpoint put"}
+    thread = stats["threads"]["a"]
+    assert thread["turns"]["count"] == 1 and (thread["input_tokens"], thread["cache_read"]) == (50, 40)
+    read = stats["tools"]["read_file"]
+    assert (read["count"], read["cache_hits"], read["errors"], read["result_tokens"]) == (2, 1, 1, 110)
+    assert stats["tools"]["propose_changes"]["approval_wait_s"] == 1.5
+    assert stats["routing"] == {}